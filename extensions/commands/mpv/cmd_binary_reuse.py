@@ -0,0 +1,69 @@
+import json
+import os
+from collections import defaultdict
+
+from conan.api.output import ConanOutput, cli_out_write
+from conan.cli.args import add_common_install_arguments, add_lockfile_args
+from conan.cli.command import conan_command
+
+from mpv.cmd_plan import matrix_profile
+
+
+def _binary_reuse_text(result):
+    cli_out_write(f"{len(result['profiles'])} profiles, binaries needed without and with the "
+                  f"recipes' package_id() rules")
+    cli_out_write(f"{'package':<48} {'before':>8} {'after':>8}")
+    for package in result["packages"]:
+        cli_out_write(f"{package['reference']:<48} {package['before']:>8} {package['after']:>8}")
+    cli_out_write(f"{'total':<48} {result['before']:>8} {result['after']:>8}")
+
+
+def _binary_reuse_json(result):
+    cli_out_write(json.dumps(result, indent=4))
+
+
+@conan_command(group="mpv", formatters={"text": _binary_reuse_text, "json": _binary_reuse_json})
+def binary_reuse(conan_api, parser, *args):
+    """
+    Count the distinct binaries a profile matrix needs for a reference, without building. 'before'
+    uses the package ids as computed from settings and options alone, 'after' applies the
+    recipes' package_id() rules, e.g. 'conan mpv:binary-reuse libmpv/0.39.0 -m gcc13.1 -m gcc13.2'.
+    Dependencies keep their final package ids in both columns.
+    """
+    parser.add_argument("reference", help="Reference to resolve, e.g. libmpv/0.39.0")
+    parser.add_argument("-m", "--matrix", action="append", required=True,
+                        help="Host profile of one matrix entry, applied on top of -pr/-s/-o/-c. "
+                             "Repeat for every entry")
+    add_common_install_arguments(parser)
+    add_lockfile_args(parser)
+    args = parser.parse_args(*args)
+
+    cwd = os.getcwd()
+    remotes = conan_api.remotes.list(args.remote) if not args.no_remote else []
+    lockfile = conan_api.lockfile.get_lockfile(lockfile=args.lockfile, cwd=cwd,
+                                               partial=args.lockfile_partial)
+    _, profile_build = conan_api.profiles.get_profiles_from_args(args)
+
+    before, after = defaultdict(set), defaultdict(set)
+    for entry in args.matrix:
+        ConanOutput().title(f"Computing package ids for {entry}")
+        profile_host = matrix_profile(conan_api, args, entry)
+        deps_graph = conan_api.graph.load_graph_requires([args.reference], None, profile_host,
+                                                         profile_build, lockfile, remotes, args.update)
+        deps_graph.report_graph_error()
+        conan_api.graph.analyze_binaries(deps_graph, None, remotes, update=args.update,
+                                         lockfile=lockfile)
+        for node in deps_graph.nodes[1:]:
+            reference = str(node.ref) if node.context == "host" else f"{node.ref} (build)"
+            before[reference].add(node.conanfile.original_info.package_id())
+            after[reference].add(node.package_id)
+
+    packages = [{"reference": reference, "before": len(before[reference]), "after": len(after[reference])}
+                for reference in sorted(before)]
+    return {
+        "reference": args.reference,
+        "profiles": args.matrix,
+        "packages": packages,
+        "before": sum(package["before"] for package in packages),
+        "after": sum(package["after"] for package in packages),
+    }
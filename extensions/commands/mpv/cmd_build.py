@@ -0,0 +1,405 @@
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from conan.api.output import ConanOutput, cli_out_write
+from conan.cli.args import add_common_install_arguments, add_lockfile_args
+from conan.cli.command import conan_command
+from conan.errors import ConanException
+
+from mpv.cmd_plan import build_order, collect_binaries, context_arguments, critical_paths, matrix_profile
+
+# Assumed cost of a package without telemetry, in CPU seconds
+_DEFAULT_COST = 300
+# Only the most recent builds of a package are used for its estimate
+_TELEMETRY_SAMPLES = 5
+# Build tools that run every job they start as a child process, one token each
+_JOB_CLIENTS = ("make", "gmake", "ninja", "cargo", "cargo-cbuild")
+# First versions that take tokens from a jobserver on a named pipe, older make stops on it
+_FIFO_CLIENTS = {"make": (4, 4), "ninja": (1, 13)}
+
+
+def _minimum_version(tool):
+    return ".".join(map(str, _FIFO_CLIENTS[tool]))
+
+
+def _check_jobserver_clients():
+    """ make and ninja of the PATH, used by the recipes that do not take them as tool requirements.
+    """
+    for tool, minimum in _FIFO_CLIENTS.items():
+        if not shutil.which(tool):
+            continue
+        output = subprocess.run([tool, "--version"], capture_output=True, text=True).stdout
+        version = re.search(r"(\d+)\.(\d+)", output)
+        if version and tuple(map(int, version.groups())) < minimum:
+            raise ConanException(f"--jobserver needs {tool} >= {_minimum_version(tool)}, "
+                                 f"found {version.group(0)}")
+
+
+def _check_tool_requirement_clients(deps_graph, entry):
+    """ make and ninja the graph takes as tool requirements, Meson builds with the ninja of the
+    meson package. An older one ignores the fifo and, as the recipes pass no -j under the
+    jobserver, runs a job per CPU in every concurrent build.
+    """
+    for node in deps_graph.nodes[1:]:
+        if node.ref.name in _FIFO_CLIENTS and node.binary != "Skip" \
+                and node.ref.version < _minimum_version(node.ref.name):
+            raise ConanException(f"--jobserver needs {node.ref.name} >= {_minimum_version(node.ref.name)}, "
+                                 f"{entry} builds with {node.ref}")
+
+
+class _CpuShares:
+    """ Splits the CPUs between the jobs, each one gets its share as tools.build:jobs.
+    """
+
+    def __init__(self, cpus):
+        self.free = cpus
+
+    def acquire(self, waiting):
+        if self.free == 0:
+            return None
+        cpus = max(1, self.free // waiting)
+        self.free -= cpus
+        return cpus
+
+    def release(self, cpus):
+        self.free += cpus
+
+    def close(self):
+        pass
+
+
+class _JobServer:
+    """ GNU make 4.4 jobserver, a named pipe with one token per CPU. The scheduler takes a token
+    for every job it starts, which is the implicit slot of the job's build tool, and the tools
+    take one more for every further process they run in parallel.
+    """
+
+    def __init__(self, cpus):
+        if not hasattr(os, "mkfifo"):
+            raise ConanException("--jobserver needs named pipes, it is not available on Windows")
+        _check_jobserver_clients()
+        self._folder = tempfile.mkdtemp(prefix="mpv-jobserver-")
+        path = os.path.join(self._folder, "fifo")
+        os.mkfifo(path)
+        self._fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+        os.write(self._fd, b"+" * cpus)
+        self.makeflags = f"-j{cpus} --jobserver-auth=fifo:{path}"
+
+    def acquire(self, waiting):
+        try:
+            os.read(self._fd, 1)
+        except BlockingIOError:
+            return None
+        # tools.build:jobs=0 makes the Conan build helpers run the tools without -j
+        return 0
+
+    def release(self, cpus):
+        os.write(self._fd, b"+")
+
+    def close(self):
+        os.close(self._fd)
+        shutil.rmtree(self._folder, ignore_errors=True)
+
+
+def _running_jobs(root):
+    """ Processes started by make, ninja or cargo below 'root' that are not themselves one of
+    them, read from /proc.
+    """
+    names, children = {}, defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The name is between parentheses and can contain spaces
+        names[int(entry)] = stat[stat.index("(") + 1:stat.rindex(")")]
+        children[int(stat[stat.rindex(")") + 2:].split()[1])].append(int(entry))
+    count, pending = 0, [root]
+    while pending:
+        pid = pending.pop()
+        for child in children[pid]:
+            if names.get(pid) in _JOB_CLIENTS and names.get(child) not in _JOB_CLIENTS:
+                count += 1
+            pending.append(child)
+    return count
+
+
+class _JobSampler(threading.Thread):
+    """ Highest number of build jobs seen running at the same time.
+    """
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        if not os.path.isdir("/proc"):
+            raise ConanException("--check-jobs reads the running processes from /proc, only on Linux")
+        self._interval = interval
+        self._done = threading.Event()
+        self.peak = 0
+
+    def run(self):
+        while not self._done.wait(self._interval):
+            self.peak = max(self.peak, _running_jobs(os.getpid()))
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _load_telemetry(path):
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_telemetry(path, records):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2)
+
+
+def _estimate_cost(telemetry, reference):
+    """ CPU seconds of the last successful builds of the same version, else of any version of
+    the package, else a default.
+    """
+    name_version = reference.split("#")[0]
+    name = name_version.split("/")[0]
+    for matches in (lambda r: r["reference"] == name_version,
+                    lambda r: r["reference"].split("/")[0] == name):
+        samples = [r["cpu_seconds"] for r in telemetry if r["status"] == "ok" and matches(r)]
+        if samples:
+            return statistics.median(samples[-_TELEMETRY_SAMPLES:])
+    return _DEFAULT_COST
+
+
+def _job_command(job, common, cpus):
+    requires = "--tool-requires" if job["context"] == "build" else "--requires"
+    return [sys.executable, "-m", "conans.conan", "install", f"{requires}={job['reference']}",
+            f"--build={job['reference'].split('#')[0]}", *common, "-pr:h", job["profiles"][0],
+            "-c:a", f"tools.build:jobs={cpus}"]
+
+
+def _wait(process):
+    """ (exit code, CPU seconds of the process and everything it ran) once it ended, else None.
+    The CPU time is only known where the platform reports it.
+    """
+    if not hasattr(os, "wait4"):
+        return None if process.poll() is None else (process.returncode, None)
+    pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+    if pid == 0:
+        return None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, usage.ru_utime + usage.ru_stime
+
+
+def _download(conan_api, deps_graph):
+    # Concurrent installs must only write their own package, so fetch everything else first
+    for node in deps_graph.nodes[1:]:
+        if node.binary in ("Download", "Update"):
+            conan_api.download.package(node.pref, node.remote)
+
+
+def _fetch_sources(conan_api, deps_graph, remotes):
+    """ Runs source() of every package the graph builds, one at a time. The source folder of a
+    recipe revision is shared by all its package ids, concurrent installs would race creating it.
+    """
+    for node in deps_graph.nodes[1:]:
+        if node.binary == "Build":
+            node.conanfile.conf.define("tools.build:download_source", True)
+    conan_api.install.install_sources(deps_graph, remotes)
+
+
+def _run(jobs, paths, budget, start):
+    """ Starts ready jobs longest chain first while the budget has CPUs left for them, never two
+    of the same recipe revision at once as they share its folders in the cache.
+    """
+    pending = {key: set(job["requires"]) for key, job in jobs.items()}
+    running, results = {}, {}
+    while pending or running:
+        if not any(result["status"] == "failed" for result in results.values()):
+            ready, busy = [], {jobs[key]["reference"] for key in running}
+            for key in sorted((key for key, requires in pending.items() if not requires),
+                              key=lambda key: (-paths[key], key)):
+                if jobs[key]["reference"] not in busy:
+                    ready.append(key)
+                    busy.add(jobs[key]["reference"])
+            for index, key in enumerate(ready):
+                cpus = budget.acquire(len(ready) - index)
+                if cpus is None:
+                    break
+                running[key] = (start(key, cpus), cpus, time.monotonic())
+                del pending[key]
+        elif not running:
+            break
+
+        time.sleep(0.5)
+        for key, (process, cpus, started) in list(running.items()):
+            ended = _wait(process)
+            if ended is None:
+                continue
+            del running[key]
+            budget.release(cpus)
+            returncode, cpu_seconds = ended
+            seconds = time.monotonic() - started
+            status = "ok" if returncode == 0 else "failed"
+            results[key] = {"status": status, "cpus": cpus, "seconds": seconds,
+                            "cpu_seconds": seconds * max(1, cpus) if cpu_seconds is None else cpu_seconds}
+            if status == "ok":
+                for requires in pending.values():
+                    requires.discard(key)
+    for key in pending:
+        results[key] = {"status": "not started", "cpus": 0, "seconds": 0, "cpu_seconds": 0}
+    return results
+
+
+def _build_text(result):
+    cli_out_write(f"{result['reference']}: {len(result['jobs'])} builds in {result['seconds']:.0f} s "
+                  f"with {result['cpus']} CPUs" + (", shared jobserver" if result["jobserver"] else ""))
+    if result["peak_jobs"] is not None:
+        cli_out_write(f"  at most {result['peak_jobs']} jobs ran at the same time")
+    for job in result["jobs"]:
+        cpus = "jobserver" if result["jobserver"] else f"{job['cpus']} CPUs"
+        cli_out_write(f"  {job['status']:<12} {job['reference'].split('#')[0]}:{job['package_id']} "
+                      f"{job['seconds']:>8.0f} s on {cpus}, {job['cpu_seconds']:.0f} CPU s, estimated "
+                      f"{job['estimated_cpu_seconds']:.0f} CPU s, log {job['log']}")
+
+
+def _build_json(result):
+    cli_out_write(json.dumps(result, indent=4))
+
+
+@conan_command(group="mpv", formatters={"text": _build_text, "json": _build_json})
+def build(conan_api, parser, *args):
+    """
+    Build the missing binaries of a graph for a list of profiles, running independent packages
+    concurrently within a CPU budget. Packages on the longest chain, estimated from the build
+    times recorded by previous runs, start first, e.g.
+    'conan mpv:build libmpv/0.39.0 -m linux-gcc13 -m linux-clang17 --cpus 64 --jobserver'.
+    """
+    parser.add_argument("reference", help="Reference to build, e.g. libmpv/0.39.0")
+    parser.add_argument("-m", "--matrix", action="append", required=True,
+                        help="Host profile of one matrix entry, applied on top of -pr/-s/-o/-c. "
+                             "Repeat for every entry")
+    parser.add_argument("--cpus", type=int, default=os.cpu_count(),
+                        help="CPUs shared by all concurrent builds, defaults to all of them")
+    parser.add_argument("--telemetry", help="JSON file with the build times of previous runs, "
+                                            "defaults to mpv-build-telemetry.json in the Conan home")
+    parser.add_argument("--logs", default="mpv-build-logs", help="Folder for the output of every build")
+    parser.add_argument("--jobserver", action="store_true",
+                        help="Share the CPUs through a GNU make jobserver instead of a fixed number "
+                             "of jobs per build, so that idle builds leave their CPUs to the busy ones. "
+                             "Needs make >= 4.4 and ninja >= 1.13, both in PATH and as tool requirements "
+                             "like the ninja of meson, and cargo on the builders")
+    parser.add_argument("--check-jobs", action="store_true",
+                        help="Watch the processes run by make, ninja and cargo and fail if more than "
+                             "--cpus of them run at the same time. Linux only")
+    add_common_install_arguments(parser)
+    add_lockfile_args(parser)
+    args = parser.parse_args(*args)
+
+    cpus = max(1, args.cpus)
+    budget = _JobServer(cpus) if args.jobserver else _CpuShares(cpus)
+    sampler = _JobSampler() if args.check_jobs else None
+    try:
+        return _build(conan_api, args, budget, sampler)
+    finally:
+        budget.close()
+
+
+def _build(conan_api, args, budget, sampler):
+    cwd = os.getcwd()
+    remotes = conan_api.remotes.list(args.remote) if not args.no_remote else []
+    lockfile = conan_api.lockfile.get_lockfile(lockfile=args.lockfile, cwd=cwd,
+                                               partial=args.lockfile_partial)
+    _, profile_build = conan_api.profiles.get_profiles_from_args(args)
+    telemetry_path = args.telemetry or os.path.join(conan_api.home_folder, "mpv-build-telemetry.json")
+    telemetry = _load_telemetry(telemetry_path)
+
+    binaries = {}
+    for entry in args.matrix:
+        ConanOutput().title(f"Computing package ids for {entry}")
+        profile_host = matrix_profile(conan_api, args, entry)
+        deps_graph = conan_api.graph.load_graph_requires([args.reference], None, profile_host,
+                                                         profile_build, lockfile, remotes, args.update)
+        deps_graph.report_graph_error()
+        conan_api.graph.analyze_binaries(deps_graph, ["missing"], remotes, update=args.update,
+                                         lockfile=lockfile)
+        if args.jobserver:
+            _check_tool_requirement_clients(deps_graph, entry)
+        collect_binaries(deps_graph, entry, set(), binaries)
+        _download(conan_api, deps_graph)
+        _fetch_sources(conan_api, deps_graph, remotes)
+
+    invalid = [key for key, binary in binaries.items() if binary["source"] == "invalid"]
+    if invalid:
+        raise ConanException("Invalid configurations, see 'conan mpv:plan': " + ", ".join(invalid))
+    jobs = {key: binary for key, binary in binaries.items() if binary["source"] == "build"}
+    for job in jobs.values():
+        job["requires"] &= jobs.keys()
+    costs = {key: _estimate_cost(telemetry, job["reference"]) for key, job in jobs.items()}
+    paths = critical_paths(jobs, cost=costs.get)
+    order, _ = build_order(jobs, paths)
+
+    os.makedirs(args.logs, exist_ok=True)
+    common = context_arguments(conan_api, args)
+    logs = {key: os.path.join(args.logs, f"{job['reference'].split('/')[0]}-{job['package_id'][:8]}.log")
+            for key, job in jobs.items()}
+
+    env = dict(os.environ)
+    if args.jobserver:
+        env["MAKEFLAGS"] = budget.makeflags
+
+    def start(key, cpus):
+        ConanOutput().info(f"Building {key}" + (f" with {cpus} CPUs" if cpus else ""))
+        with open(logs[key], "w") as log:
+            return subprocess.Popen(_job_command(jobs[key], common, cpus), stdout=log,
+                                    stderr=subprocess.STDOUT, cwd=cwd, env=env)
+
+    started = time.monotonic()
+    if sampler:
+        sampler.start()
+    try:
+        results = _run(jobs, paths, budget, start)
+    finally:
+        if sampler:
+            sampler.stop()
+    seconds = time.monotonic() - started
+
+    for key, job_result in results.items():
+        if job_result["status"] in ("ok", "failed"):
+            telemetry.append({"reference": jobs[key]["reference"].split("#")[0],
+                              "package_id": jobs[key]["package_id"],
+                              "time": time.time(), **job_result})
+    _save_telemetry(telemetry_path, telemetry)
+
+    result = {
+        "reference": args.reference,
+        "cpus": args.cpus,
+        "jobserver": args.jobserver,
+        "peak_jobs": sampler.peak if sampler else None,
+        "seconds": seconds,
+        "jobs": [{"reference": jobs[key]["reference"], "package_id": jobs[key]["package_id"],
+                  "estimated_cpu_seconds": costs[key], "log": logs[key], **results[key]}
+                 for key in order],
+    }
+    failed = [key for key in order if results[key]["status"] == "failed"]
+    oversubscribed = sampler is not None and sampler.peak > args.cpus
+    if failed or oversubscribed:
+        _build_text(result) if args.format != "json" else _build_json(result)
+    if failed:
+        raise ConanException(f"{len(failed)} builds failed, see their logs")
+    if oversubscribed:
+        raise ConanException(f"{sampler.peak} jobs ran at the same time, more than the {args.cpus} CPUs")
+    return result
@@ -0,0 +1,125 @@
+import configparser
+import json
+import os
+import re
+import subprocess
+import tempfile
+
+from conan.api.output import ConanOutput, cli_out_write
+from conan.cli.command import conan_command
+from conan.errors import ConanException
+
+# "Run-time dependency zlib found: YES 1.3.1", "Dependency zlib for host machine found: YES 1.3.1
+# (overridden)", "Dependency libass found: NO"
+_DEPENDENCY_LINE = re.compile(r"^(?:Run-time d|D)ependency (\S+)(?: for (host|build) machine)?"
+                              r"(?: from subproject \S+)? found: (YES|NO)(?: ([^\s(]\S*))?( \(overridden\))?",
+                              re.M)
+
+
+def _dependencies(build_folder):
+    """ (name, machine) -> version, "" when not found, of every dependency lookup Meson logged
+    while configuring 'build_folder', and the names it took from overrides.
+    """
+    with open(os.path.join(build_folder, "meson-logs", "meson-log.txt"), errors="replace") as f:
+        log = f.read()
+    result, overridden = {}, set()
+    for name, machine, found, version, override in _DEPENDENCY_LINE.findall(log):
+        key = (name, machine or "host")
+        if found == "YES":
+            result[key] = version or result.get(key) or "unknown"
+        else:
+            result.setdefault(key, "")
+        if override:
+            overridden.add(name)
+    return result, overridden
+
+
+def _setup_arguments(build_folder):
+    """ Options and machine files 'meson setup' was called with for 'build_folder'.
+    """
+    cmd_line = configparser.ConfigParser(interpolation=None)
+    cmd_line.read(os.path.join(build_folder, "meson-private", "cmd_line.txt"))
+    arguments = [f"-D{key}={value}" for key, value in cmd_line["options"].items()]
+    machine_files = {}
+    for kind in ("native_file", "cross_file"):
+        value = cmd_line["properties"].get(kind) if cmd_line.has_section("properties") else None
+        # Python style list of paths
+        machine_files[kind] = json.loads(value.replace("'", '"')) if value else []
+    return arguments, machine_files
+
+
+def _check_text(result):
+    cli_out_write(f"{result['build_folder']}: {len(result['overridden'])} dependencies from the machine "
+                  f"file, {len(result['dependencies'])} lookups compared")
+    for difference in result["differences"]:
+        cli_out_write(f"  {difference['name']} ({difference['machine']}): "
+                      f"{difference['machine_file'] or 'not found'} with the machine file, "
+                      f"{difference['pkg_config'] or 'not found'} with pkg-config")
+    if not result["differences"]:
+        cli_out_write("  same dependencies and versions as with pkg-config")
+
+
+def _check_json(result):
+    cli_out_write(json.dumps(result, indent=4))
+
+
+@conan_command(group="mpv", formatters={"text": _check_text, "json": _check_json})
+def check_meson_deps(conan_api, parser, *args):
+    """
+    Check that a Meson build folder configured with 'user.mpv:meson_dependency_overrides' finds
+    the same dependencies as pkg-config would. Configures the sources again in a temporary folder
+    with the overrides disabled and compares the dependency lookups of both, e.g.
+    'conan mpv:check-meson-deps ~/.conan2/p/b/libmp1234/b/build-release'.
+    """
+    parser.add_argument("build_folder", help="Folder 'meson setup' configured, the build folder of the recipe")
+    parser.add_argument("--meson", default="meson", help="Meson executable, defaults to the one in PATH")
+    args = parser.parse_args(*args)
+
+    build_folder = os.path.abspath(args.build_folder)
+    info_file = os.path.join(build_folder, "meson-info", "meson-info.json")
+    if not os.path.isfile(info_file):
+        raise ConanException(f"{build_folder} is not a configured Meson build folder")
+    with open(info_file) as f:
+        source_folder = json.load(f)["directories"]["source"]
+    arguments, machine_files = _setup_arguments(build_folder)
+    configured, overridden = _dependencies(build_folder)
+    if not overridden:
+        raise ConanException(f"{build_folder} was configured without dependency overrides, "
+                             f"set 'user.mpv:meson_dependency_overrides=True'")
+
+    with tempfile.TemporaryDirectory(prefix="mpv-meson-deps-") as folder:
+        # Later machine files win, this one empties the list of overridden dependencies
+        reset = os.path.join(folder, "no-overrides.ini")
+        with open(reset, "w") as f:
+            f.write("[properties]\nconan_dependencies = []\n")
+        kind = "cross_file" if machine_files["cross_file"] else "native_file"
+        machine_files[kind].append(reset)
+        command = [args.meson, "setup", os.path.join(folder, "build"), source_folder, *arguments]
+        for file_kind, paths in machine_files.items():
+            for path in paths:
+                command.append(f"--{file_kind.replace('_', '-')}={path}")
+        ConanOutput().info("Configuring with pkg-config: " + " ".join(command))
+        process = subprocess.run(command, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise ConanException(f"meson setup failed without the overrides:\n{process.stdout}{process.stderr}")
+        reference, _ = _dependencies(os.path.join(folder, "build"))
+
+    differences = [{"name": name, "machine": machine, "machine_file": configured.get((name, machine)),
+                    "pkg_config": reference.get((name, machine))}
+                   for name, machine in sorted(configured.keys() | reference.keys())
+                   if configured.get((name, machine)) != reference.get((name, machine))]
+    result = {
+        "build_folder": build_folder,
+        "overridden": sorted(overridden),
+        "dependencies": [{"name": name, "machine": machine, "version": version}
+                         for (name, machine), version in sorted(configured.items())],
+        "differences": differences,
+    }
+    if differences:
+        # Still print the report, the exit code is what CI looks at
+        if args.format == "json":
+            _check_json(result)
+        else:
+            _check_text(result)
+        raise ConanException(f"{len(differences)} dependencies differ from pkg-config")
+    return result
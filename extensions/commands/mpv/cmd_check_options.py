@@ -0,0 +1,98 @@
+import fnmatch
+import importlib.util
+import json
+import os
+
+from conan.api.output import cli_out_write
+from conan.cli.args import add_profiles_args
+from conan.cli.command import conan_command
+from conan.errors import ConanException
+
+
+def _load_recipe_class(path):
+    """ The libmpv ConanFile class, imported as a plain module without loading a graph.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, "conanfile.py")
+    if not os.path.isfile(path):
+        raise ConanException(f"Recipe not found: {path}")
+    spec = importlib.util.spec_from_file_location("libmpv_conanfile", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    recipe = next((value for value in vars(module).values()
+                   if isinstance(value, type) and hasattr(value, "_features")), None)
+    if recipe is None:
+        raise ConanException(f"{path} has no option table, is it the libmpv recipe?")
+    return recipe
+
+
+def _profile_options(profile, name):
+    """ option -> value assigned by the profile and command line to the package 'name'.
+    """
+    result = {}
+    for line in profile.options.dumps().splitlines():
+        pattern, _, assignment = line.rpartition(":")
+        option, _, value = assignment.partition("=")
+        if not pattern or fnmatch.fnmatch(name, pattern.split("/")[0]):
+            result[option] = value
+    return result
+
+
+def _check(recipe, os_name, options):
+    problems = []
+    for option, value in sorted(options.items()):
+        if option not in recipe.options:
+            problems.append(f"{option}: unknown option")
+            continue
+        allowed = [str(allowed) for allowed in recipe.options[option]]
+        if value not in allowed and "ANY" not in allowed:
+            problems.append(f"{option}: invalid value '{value}', possible values are {allowed}")
+        feature = recipe._features.get(option)
+        if feature and feature.platforms and os_name not in feature.platforms:
+            problems.append(f"{option}: not available on {os_name}, "
+                            f"only on {', '.join(feature.platforms)}")
+    # Only conflicts between explicit values, the recipe defaults are not evaluated here
+    for option, needs in sorted(getattr(recipe, "_option_rules", {}).items()):
+        if options.get(option) == "True":
+            disabled = [need for need in needs if options.get(need) == "False"]
+            if disabled:
+                problems.append(f"{option}: requires {', '.join(disabled)}")
+    return problems
+
+
+def _check_text(result):
+    cli_out_write(f"{result['recipe']} ({result['os']}): {len(result['options'])} options checked")
+    for problem in result["problems"]:
+        cli_out_write(f"  {problem}")
+    if not result["problems"]:
+        cli_out_write("  no problems found")
+
+
+def _check_json(result):
+    cli_out_write(json.dumps(result, indent=4))
+
+
+@conan_command(group="mpv", formatters={"text": _check_text, "json": _check_json})
+def check_options(conan_api, parser, *args):
+    """
+    Check the libmpv options of a profile against the recipe's option table without computing
+    a graph, e.g. 'conan mpv:check-options recipes/libmpv/all -pr linux -o libmpv/*:vaapi=True'.
+    """
+    parser.add_argument("path", help="Folder of the libmpv recipe or its conanfile.py")
+    add_profiles_args(parser)
+    args = parser.parse_args(*args)
+
+    recipe = _load_recipe_class(args.path)
+    profile_host, _ = conan_api.profiles.get_profiles_from_args(args)
+    os_name = profile_host.settings.get("os")
+    options = _profile_options(profile_host, recipe.name)
+    problems = _check(recipe, os_name, options)
+    result = {"recipe": recipe.name, "os": os_name, "options": options, "problems": problems}
+    if problems:
+        # Still print the report, the exit code is what CI looks at
+        if args.format == "json":
+            _check_json(result)
+        else:
+            _check_text(result)
+        raise ConanException(f"{len(problems)} invalid libmpv options")
+    return result
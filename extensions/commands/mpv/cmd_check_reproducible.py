@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+
+from conan.api.model import RecipeReference
+from conan.api.output import ConanOutput, cli_out_write
+from conan.cli.args import add_common_install_arguments, add_lockfile_args
+from conan.cli.command import conan_command
+from conan.cli.printers import print_profiles
+from conan.cli.printers.graph import print_graph_packages
+from conan.errors import ConanException
+
+# Written by Conan itself, with the time of packaging
+_METADATA_FILES = ("conanmanifest.txt", "conaninfo.txt")
+
+
+def _hash_package(package_folder):
+    """ relative path -> sha256 of every packaged file, symlinks are hashed by their target.
+    """
+    hashes = {}
+    for root, _, files in os.walk(package_folder):
+        for filename in files:
+            path = os.path.join(root, filename)
+            relative = os.path.relpath(path, package_folder).replace("\\", "/")
+            if relative in _METADATA_FILES:
+                continue
+            if os.path.islink(path):
+                hashes[relative] = "-> " + os.readlink(path)
+                continue
+            sha256 = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha256.update(chunk)
+            hashes[relative] = sha256.hexdigest()
+    return hashes
+
+
+def _compare(first, second):
+    return {
+        "different": sorted(path for path in first.keys() & second.keys() if first[path] != second[path]),
+        "only_first": sorted(first.keys() - second.keys()),
+        "only_second": sorted(second.keys() - first.keys()),
+    }
+
+
+def _reproducible_text(result):
+    cli_out_write(f"{result['reference']}:{result['package_id']}: {result['files']} files compared")
+    for key, label in (("different", "differs"), ("only_first", "only in the first build"),
+                       ("only_second", "only in the second build")):
+        for path in result[key]:
+            cli_out_write(f"  {path}: {label}")
+    if result["reproducible"]:
+        cli_out_write("  both builds are byte-identical")
+
+
+def _reproducible_json(result):
+    cli_out_write(json.dumps(result, indent=4))
+
+
+@conan_command(group="mpv", formatters={"text": _reproducible_text, "json": _reproducible_json})
+def check_reproducible(conan_api, parser, *args):
+    """
+    Build a package twice with '*:reproducible=True' and compare the packaged files. Every
+    build runs in a new folder of the cache, so paths that leak into the binaries show up as
+    differences, e.g. 'conan mpv:check-reproducible libmpv/0.39.0 -pr linux -b missing'.
+    """
+    parser.add_argument("reference", help="Reference to build, e.g. libplacebo/7.349.0")
+    add_common_install_arguments(parser)
+    add_lockfile_args(parser)
+    args = parser.parse_args(*args)
+
+    # Patterns are ignored by the packages that have no such option
+    args.options_host = (args.options_host or []) + ["*:reproducible=True"]
+    reference = RecipeReference.loads(args.reference)
+    cwd = os.getcwd()
+    remotes = conan_api.remotes.list(args.remote) if not args.no_remote else []
+    lockfile = conan_api.lockfile.get_lockfile(lockfile=args.lockfile, cwd=cwd,
+                                               partial=args.lockfile_partial)
+    profile_host, profile_build = conan_api.profiles.get_profiles_from_args(args)
+    print_profiles(profile_host, profile_build)
+
+    builds = []
+    for attempt in (1, 2):
+        ConanOutput().title(f"Build {attempt} of {reference.name}")
+        deps_graph = conan_api.graph.load_graph_requires([args.reference], None, profile_host,
+                                                         profile_build, lockfile, remotes, args.update)
+        deps_graph.report_graph_error()
+        # Always rebuild the package under test, the dependencies only when --build says so
+        conan_api.graph.analyze_binaries(deps_graph, (args.build or []) + [f"{reference.name}/*"],
+                                         remotes, update=args.update, lockfile=lockfile)
+        print_graph_packages(deps_graph)
+        conan_api.install.install_binaries(deps_graph=deps_graph, remotes=remotes)
+        node = next(node for node in deps_graph.nodes[1:]
+                    if node.ref.name == reference.name and node.context == "host")
+        builds.append((node, _hash_package(node.conanfile.package_folder)))
+
+    (node, first), (_, second) = builds
+    comparison = _compare(first, second)
+    result = {
+        "reference": str(node.ref),
+        "package_id": node.package_id,
+        "files": len(first.keys() | second.keys()),
+        **comparison,
+        "reproducible": not any(comparison.values()),
+    }
+    if not result["reproducible"]:
+        # Still print the report, the exit code is what CI looks at
+        if args.format == "json":
+            _reproducible_json(result)
+        else:
+            _reproducible_text(result)
+        raise ConanException(f"{node.ref} is not reproducible")
+    return result
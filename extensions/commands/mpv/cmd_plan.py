@@ -0,0 +1,249 @@
+import json
+import os
+import shlex
+import tarfile
+
+from conan.api.model import PackagesList
+from conan.api.output import ConanOutput, cli_out_write
+from conan.cli.args import add_common_install_arguments, add_lockfile_args
+from conan.cli.command import conan_command
+from conan.errors import ConanException
+
+# Binary states of graph nodes that do not require anything to be built
+_AVAILABLE = {"Cache": "cache", "Download": "remote", "Update": "remote"}
+_NOT_NEEDED = ("Skip", "Platform", "Editable", "EditableBuild")
+
+
+def _archived_packages(archives):
+    """ "ref#rrev:package_id" of every package stored in 'conan cache save' archives.
+    """
+    result = set()
+    for archive in archives:
+        if not os.path.isfile(archive):
+            raise ConanException(f"Archive not found: {archive}")
+        with tarfile.open(archive) as tgz:
+            try:
+                pkglist = json.loads(tgz.extractfile("pkglist.json").read())
+            except KeyError:
+                raise ConanException(f"{archive} was not created by 'conan cache save'")
+        package_list = PackagesList.deserialize(pkglist)
+        for ref, ref_bundle in package_list.refs().items():
+            for pref in package_list.prefs(ref, ref_bundle):
+                result.add(f"{ref.repr_notime()}:{pref.package_id}")
+    return result
+
+
+def _job_key(node):
+    return f"{node.ref.repr_notime()}:{node.package_id}"
+
+
+def collect_binaries(deps_graph, profile, archived, binaries):
+    """ Adds every binary of the graph to 'binaries', keyed by reference and package id, so that
+    profiles resolving to the same binary share one entry.
+    """
+    for node in deps_graph.nodes[1:]:
+        if node.binary in _NOT_NEEDED:
+            continue
+        key = _job_key(node)
+        binary = binaries.setdefault(key, {
+            "reference": node.ref.repr_notime(),
+            "package_id": node.package_id,
+            "context": node.context,
+            "profiles": [],
+            "requires": set(),
+        })
+        if profile not in binary["profiles"]:
+            binary["profiles"].append(profile)
+        if node.binary in _AVAILABLE:
+            binary["source"] = _AVAILABLE[node.binary]
+        elif key in archived:
+            binary["source"] = "archive"
+        elif node.binary == "Invalid":
+            binary["source"] = "invalid"
+            binary["reason"] = str(node.conanfile.info.invalid or node.conanfile.info.cant_build)
+        else:
+            binary["source"] = "build"
+        # A package can only be built once everything it links or runs at build time exists
+        for transitive in node.transitive_deps.values():
+            if transitive.node.binary not in _NOT_NEEDED:
+                binary["requires"].add(_job_key(transitive.node))
+
+
+def critical_paths(jobs, cost):
+    """ For every job, the cost of the longest chain of jobs that cannot start before it ends,
+    the job included.
+    """
+    dependents = {key: [] for key in jobs}
+    for key, job in jobs.items():
+        for dependency in job["requires"]:
+            dependents[dependency].append(key)
+    paths = {}
+
+    def visit(key):
+        if key not in paths:
+            paths[key] = cost(key) + max((visit(dependent) for dependent in dependents[key]), default=0)
+        return paths[key]
+
+    for key in jobs:
+        visit(key)
+    return paths
+
+
+def build_order(jobs, paths):
+    """ Topological order that always starts the ready job with the longest remaining chain.
+    """
+    pending = {key: set(job["requires"]) for key, job in jobs.items()}
+    levels, order = {}, []
+    while pending:
+        ready = [key for key, requires in pending.items() if not requires]
+        if not ready:
+            raise ConanException("Dependency cycle between " + ", ".join(sorted(pending)))
+        key = min(ready, key=lambda k: (-paths[k], k))
+        levels[key] = max((levels[dependency] + 1 for dependency in jobs[key]["requires"]), default=0)
+        order.append(key)
+        del pending[key]
+        for requires in pending.values():
+            requires.discard(key)
+    return order, levels
+
+
+def _host_profiles(conan_api, args):
+    """ Profiles every matrix entry is applied on top of, the -pr:h ones or the default profile
+    like get_profiles_from_args() does.
+    """
+    return args.profile_host or [conan_api.profiles.get_default_host()]
+
+
+def matrix_profile(conan_api, args, entry):
+    """ Host profile of one matrix entry, merged like get_profiles_from_args() merges the host
+    profile. The Conan argument parser adds -pr:a, -s:a, -o:a and -c:a to the arguments of
+    both contexts, so they are part of it too.
+    """
+    return conan_api.profiles.get_profile(_host_profiles(conan_api, args) + [entry], args.settings_host,
+                                          args.options_host, args.conf_host, cwd=os.getcwd())
+
+
+def context_arguments(conan_api, args):
+    """ Profile, settings, options and conf arguments of this invocation, per context, so that
+    every job resolves the same graph as the plan.
+    """
+    arguments = []
+    for context in ("host", "build"):
+        for flag, name in (("pr", "profile"), ("s", "settings"), ("o", "options"), ("c", "conf")):
+            values = getattr(args, f"{name}_{context}", None) or []
+            if name == "profile" and context == "host":
+                # Explicit, a -pr:h matrix entry alone would replace the default profile
+                values = _host_profiles(conan_api, args)
+            for value in values:
+                arguments.extend([f"-{flag}:{context[0]}", value])
+    if args.no_remote:
+        arguments.append("-nr")
+    for remote in args.remote or []:
+        arguments.extend(["-r", remote])
+    if args.lockfile:
+        arguments.extend(["-l", args.lockfile])
+    if args.lockfile_partial:
+        arguments.append("--lockfile-partial")
+    return arguments
+
+
+def _install_command(job, common):
+    requires = "--tool-requires" if job["context"] == "build" else "--requires"
+    name = job["reference"].split("#")[0]
+    # The matrix entry goes last, it is applied on top of the -pr:h profiles like in the plan
+    return shlex.join(["conan", "install", f"{requires}={job['reference']}", f"--build={name}",
+                       *common, "-pr:h", job["profiles"][0]])
+
+
+def _plan_text(result):
+    summary = result["summary"]
+    cli_out_write(f"{result['reference']} for {len(result['profiles'])} profiles: "
+                  f"{summary['binaries']} distinct binaries")
+    cli_out_write(f"  available: {summary['cache']} in cache, {summary['remote']} in remotes, "
+                  f"{summary['archive']} in archives")
+    cli_out_write(f"  to build: {summary['build']}, invalid: {summary['invalid']}")
+    for binary in result["invalid"]:
+        cli_out_write(f"  invalid {binary['reference']}:{binary['package_id']} "
+                      f"({', '.join(binary['profiles'])}): {binary['reason']}")
+    if not result["plan"]:
+        cli_out_write("Nothing to build")
+        return
+    cli_out_write(f"Build plan, critical path of {result['critical_path']} builds:")
+    for step, job in enumerate(result["plan"], start=1):
+        cli_out_write(f"{step:>4}. [level {job['level']}, chain {job['critical_path']}] "
+                      f"{job['reference']}:{job['package_id']}")
+        cli_out_write(f"        {job['command']}")
+
+
+def _plan_json(result):
+    cli_out_write(json.dumps(result, indent=4))
+
+
+@conan_command(group="mpv", formatters={"text": _plan_text, "json": _plan_json})
+def plan(conan_api, parser, *args):
+    """
+    Compute the package ids of a graph for a list of profiles without building, report which
+    binaries already exist in the cache, the remotes or 'conan cache save' archives, and print
+    the remaining builds in dependency order, longest chain first, e.g.
+    'conan mpv:plan libmpv/0.39.0 -m linux-gcc13 -m linux-clang17 --archive binaries.tgz'.
+    """
+    parser.add_argument("reference", help="Reference to plan, e.g. libmpv/0.39.0")
+    parser.add_argument("-m", "--matrix", action="append", required=True,
+                        help="Host profile of one matrix entry, applied on top of -pr/-s/-o/-c. "
+                             "Repeat for every entry")
+    parser.add_argument("--archive", action="append", default=[],
+                        help="Archive created by 'conan cache save' whose packages count as "
+                             "available. Can be repeated")
+    add_common_install_arguments(parser)
+    add_lockfile_args(parser)
+    args = parser.parse_args(*args)
+
+    cwd = os.getcwd()
+    remotes = conan_api.remotes.list(args.remote) if not args.no_remote else []
+    lockfile = conan_api.lockfile.get_lockfile(lockfile=args.lockfile, cwd=cwd,
+                                               partial=args.lockfile_partial)
+    _, profile_build = conan_api.profiles.get_profiles_from_args(args)
+    archived = _archived_packages(args.archive)
+
+    binaries = {}
+    for entry in args.matrix:
+        ConanOutput().title(f"Computing package ids for {entry}")
+        profile_host = matrix_profile(conan_api, args, entry)
+        deps_graph = conan_api.graph.load_graph_requires([args.reference], None, profile_host,
+                                                         profile_build, lockfile, remotes, args.update)
+        deps_graph.report_graph_error()
+        # "missing" so that compatible binaries are looked up like a real install would
+        conan_api.graph.analyze_binaries(deps_graph, ["missing"], remotes, update=args.update,
+                                         lockfile=lockfile)
+        collect_binaries(deps_graph, entry, archived, binaries)
+
+    jobs = {key: binary for key, binary in binaries.items() if binary["source"] == "build"}
+    for job in jobs.values():
+        job["requires"] &= jobs.keys()
+    paths = critical_paths(jobs, cost=lambda key: 1)
+    order, levels = build_order(jobs, paths)
+    common = context_arguments(conan_api, args)
+
+    sources = [binary["source"] for binary in binaries.values()]
+    return {
+        "reference": args.reference,
+        "profiles": args.matrix,
+        "summary": {
+            "binaries": len(binaries),
+            **{source: sources.count(source)
+               for source in ("cache", "remote", "archive", "build", "invalid")},
+        },
+        "invalid": [{key: binary[key] for key in ("reference", "package_id", "profiles", "reason")}
+                    for binary in binaries.values() if binary["source"] == "invalid"],
+        "critical_path": max(paths.values(), default=0),
+        "plan": [{
+            "reference": jobs[key]["reference"],
+            "package_id": jobs[key]["package_id"],
+            "context": jobs[key]["context"],
+            "profiles": jobs[key]["profiles"],
+            "requires": sorted(jobs[key]["requires"]),
+            "level": levels[key],
+            "critical_path": paths[key],
+            "command": _install_command(jobs[key], common),
+        } for key in order],
+    }
@@ -0,0 +1,256 @@
+import glob
+import json
+import os
+import platform
+import statistics
+import struct
+import subprocess
+import sys
+
+from conan.api.output import ConanOutput, cli_out_write
+from conan.cli.args import add_common_install_arguments, add_lockfile_args
+from conan.cli.command import conan_command
+from conan.cli.printers import print_profiles
+from conan.cli.printers.graph import print_graph_basic, print_graph_packages
+from conan.errors import ConanException
+
+_STATIC_SUFFIXES = (".a", ".lib")
+_SHARED_SUFFIXES = (".so", ".dylib", ".dll")
+
+_PT_LOAD = 1
+_PT_DYNAMIC = 2
+_DT_NULL = 0
+_DT_NEEDED = 1
+_DT_STRTAB = 5
+
+# Runs in a fresh interpreter so that every sample pays the full dynamic loading cost
+_TIMING_SCRIPT = """
+import ctypes, json, sys, time
+t0 = time.perf_counter()
+lib = ctypes.CDLL(sys.argv[1])
+t1 = time.perf_counter()
+lib.mpv_create.restype = ctypes.c_void_p
+lib.mpv_initialize.argtypes = [ctypes.c_void_p]
+lib.mpv_terminate_destroy.argtypes = [ctypes.c_void_p]
+handle = lib.mpv_create()
+t2 = time.perf_counter()
+rc = lib.mpv_initialize(handle)
+t3 = time.perf_counter()
+lib.mpv_terminate_destroy(handle)
+print(json.dumps({"dlopen": t1 - t0, "mpv_create": t2 - t1, "mpv_initialize": t3 - t2, "rc": rc}))
+"""
+
+
+def _is_shared_library(filename):
+    return filename.endswith(_SHARED_SUFFIXES) or ".so." in filename
+
+
+def _binary_sizes(package_folder):
+    static, shared = 0, 0
+    for root, _, files in os.walk(package_folder):
+        for filename in files:
+            path = os.path.join(root, filename)
+            if os.path.islink(path):
+                continue
+            if filename.endswith(_STATIC_SUFFIXES):
+                static += os.path.getsize(path)
+            elif _is_shared_library(filename):
+                shared += os.path.getsize(path)
+    return static, shared
+
+
+def _elf_needed(path):
+    """ DT_NEEDED entries of an ELF shared object, or None if the file is not ELF.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != b"\x7fELF":
+        return None
+    is_64 = data[4] == 2
+    endian = "<" if data[5] == 1 else ">"
+    if is_64:
+        phoff, = struct.unpack_from(endian + "Q", data, 0x20)
+        phentsize, phnum = struct.unpack_from(endian + "HH", data, 0x36)
+        phdr_format, dyn_format = endian + "IIQQQQQQ", endian + "qQ"
+    else:
+        phoff, = struct.unpack_from(endian + "I", data, 0x1C)
+        phentsize, phnum = struct.unpack_from(endian + "HH", data, 0x2A)
+        phdr_format, dyn_format = endian + "IIIIIIII", endian + "iI"
+
+    loads, dynamic = [], None
+    for i in range(phnum):
+        fields = struct.unpack_from(phdr_format, data, phoff + i * phentsize)
+        if is_64:
+            p_type, _, p_offset, p_vaddr, _, p_filesz, _, _ = fields
+        else:
+            p_type, p_offset, p_vaddr, _, p_filesz, _, _, _ = fields
+        if p_type == _PT_LOAD:
+            loads.append((p_vaddr, p_offset, p_filesz))
+        elif p_type == _PT_DYNAMIC:
+            dynamic = (p_offset, p_filesz)
+    if dynamic is None:
+        return []
+
+    needed, strtab = [], None
+    entry_size = struct.calcsize(dyn_format)
+    for offset in range(dynamic[0], dynamic[0] + dynamic[1], entry_size):
+        tag, value = struct.unpack_from(dyn_format, data, offset)
+        if tag == _DT_NULL:
+            break
+        if tag == _DT_NEEDED:
+            needed.append(value)
+        elif tag == _DT_STRTAB:
+            strtab = next((value - vaddr + off for vaddr, off, size in loads
+                           if vaddr <= value < vaddr + size), None)
+    if strtab is None:
+        return []
+    return [data[strtab + n:data.index(b"\0", strtab + n)].decode() for n in needed]
+
+
+def _needed_closure(library, libdirs):
+    """ Follows DT_NEEDED through the packages' library folders. Libraries that are not part
+    of the graph (libc, system libraries) are counted but not followed.
+    """
+    direct = _elf_needed(library)
+    if direct is None:
+        return None, None
+    seen, pending = set(), list(direct)
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        for libdir in libdirs:
+            candidate = os.path.join(libdir, name)
+            if os.path.isfile(candidate):
+                pending.extend(_elf_needed(candidate) or [])
+                break
+    return len(direct), len(seen)
+
+
+def _find_libmpv(node):
+    cpp_info = node.conanfile.cpp_info.aggregated_components()
+    patterns = ["libmpv.so*", "libmpv.dylib", "libmpv*.dll", "mpv*.dll"]
+    for folder in cpp_info.libdirs + cpp_info.bindirs:
+        for pattern in patterns:
+            matches = sorted(glob.glob(os.path.join(folder, pattern)), key=len)
+            if matches:
+                return matches[0]
+    return None
+
+
+def _library_path_env(libdirs, bindirs):
+    env = dict(os.environ)
+    system = platform.system()
+    if system == "Windows":
+        var, dirs = "PATH", bindirs
+    elif system == "Darwin":
+        var, dirs = "DYLD_LIBRARY_PATH", libdirs
+    else:
+        var, dirs = "LD_LIBRARY_PATH", libdirs
+    env[var] = os.pathsep.join(dirs + ([env[var]] if env.get(var) else []))
+    return env
+
+
+def _measure_startup(library, env, runs):
+    samples = []
+    for _ in range(runs):
+        try:
+            output = subprocess.check_output([sys.executable, "-c", _TIMING_SCRIPT, library], env=env,
+                                             stderr=subprocess.PIPE, text=True)
+        except subprocess.CalledProcessError as e:
+            raise ConanException(f"Timing the startup of {library} failed with exit code "
+                                 f"{e.returncode}:\n{e.stderr.strip()}")
+        samples.append(json.loads(output))
+    if any(sample["rc"] < 0 for sample in samples):
+        ConanOutput().warning("mpv_initialize() returned an error, timings may be incomplete")
+    return {key: statistics.median(sample[key] for sample in samples) * 1000
+            for key in ("dlopen", "mpv_create", "mpv_initialize")}
+
+
+def _report_text(result):
+    cli_out_write(f"Report for {result['reference']}")
+    cli_out_write(f"{'package':<48} {'static KiB':>12} {'shared KiB':>12}")
+    for package in result["packages"]:
+        cli_out_write(f"{package['reference']:<48} {package['static_size'] / 1024:>12.0f} "
+                      f"{package['shared_size'] / 1024:>12.0f}")
+    cli_out_write(f"{'total (' + str(len(result['packages'])) + ' host packages)':<48} "
+                  f"{result['static_size'] / 1024:>12.0f} {result['shared_size'] / 1024:>12.0f}")
+    cli_out_write(f"build-context packages: {result['build_packages']}")
+    if result["needed_direct"] is not None:
+        cli_out_write(f"DT_NEEDED: {result['needed_direct']} direct, "
+                      f"{result['needed_transitive']} including transitive")
+    timing = result["startup_ms"]
+    if timing:
+        cli_out_write(f"dlopen: {timing['dlopen']:.2f} ms, mpv_create: {timing['mpv_create']:.2f} ms, "
+                      f"mpv_initialize: {timing['mpv_initialize']:.2f} ms (median)")
+    else:
+        cli_out_write("startup: not measured (static libmpv or --runs=0)")
+
+
+def _report_json(result):
+    cli_out_write(json.dumps(result, indent=4))
+
+
+@conan_command(group="mpv", formatters={"text": _report_text, "json": _report_json})
+def report(conan_api, parser, *args):
+    """
+    Report the dependency closure, binary sizes, DT_NEEDED entries and startup time of a
+    libmpv build for the given profile and options. Missing binaries are built according
+    to --build, e.g. 'conan mpv:report libmpv/0.39.0 -o libmpv/*:headless=True -b missing'.
+    """
+    parser.add_argument("reference", help="libmpv reference, e.g. libmpv/0.39.0")
+    parser.add_argument("--runs", type=int, default=10,
+                        help="Number of processes used to measure dlopen/mpv_create/mpv_initialize "
+                             "(shared builds only, 0 to skip)")
+    add_common_install_arguments(parser)
+    add_lockfile_args(parser)
+    args = parser.parse_args(*args)
+
+    cwd = os.getcwd()
+    remotes = conan_api.remotes.list(args.remote) if not args.no_remote else []
+    lockfile = conan_api.lockfile.get_lockfile(lockfile=args.lockfile, cwd=cwd,
+                                               partial=args.lockfile_partial)
+    profile_host, profile_build = conan_api.profiles.get_profiles_from_args(args)
+    print_profiles(profile_host, profile_build)
+
+    deps_graph = conan_api.graph.load_graph_requires([args.reference], None, profile_host,
+                                                     profile_build, lockfile, remotes, args.update)
+    print_graph_basic(deps_graph)
+    deps_graph.report_graph_error()
+    conan_api.graph.analyze_binaries(deps_graph, args.build, remotes, update=args.update,
+                                     lockfile=lockfile)
+    print_graph_packages(deps_graph)
+    conan_api.install.install_binaries(deps_graph=deps_graph, remotes=remotes)
+
+    host_nodes = [node for node in deps_graph.nodes[1:] if node.context == "host"]
+    libmpv = next((node for node in host_nodes if node.ref.name == "libmpv"), None)
+    if libmpv is None:
+        raise ConanException(f"{args.reference} does not resolve to a libmpv package")
+
+    packages, libdirs, bindirs = [], [], []
+    for node in host_nodes:
+        static, shared = _binary_sizes(node.conanfile.package_folder) \
+            if node.conanfile.package_folder else (0, 0)
+        cpp_info = node.conanfile.cpp_info.aggregated_components()
+        libdirs.extend(cpp_info.libdirs)
+        bindirs.extend(cpp_info.bindirs)
+        packages.append({"reference": str(node.ref), "package_id": node.package_id,
+                         "static_size": static, "shared_size": shared})
+
+    library = _find_libmpv(libmpv)
+    needed_direct, needed_transitive = _needed_closure(library, libdirs) if library else (None, None)
+    startup = None
+    if library and args.runs > 0:
+        startup = _measure_startup(library, _library_path_env(libdirs, bindirs), args.runs)
+
+    return {
+        "reference": str(libmpv.ref),
+        "packages": packages,
+        "build_packages": len(deps_graph.nodes) - 1 - len(host_nodes),
+        "static_size": sum(package["static_size"] for package in packages),
+        "shared_size": sum(package["shared_size"] for package in packages),
+        "needed_direct": needed_direct,
+        "needed_transitive": needed_transitive,
+        "startup_ms": startup,
+    }
@@ -1,9 +1,8 @@
 from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
-from conan.tools.gnu import PkgConfig
 from conan.tools.system import package_manager
 
-required_conan_version = ">=1.50.0"
+required_conan_version = ">=2.0.8"
 
 
 class SysConfigEGLConan(ConanFile):
@@ -15,6 +14,7 @@ class SysConfigEGLConan(ConanFile):
     homepage = "https://www.khronos.org/egl"
     license = "MIT"
     package_type = "shared-library"
+    python_requires = "mpv-helpers/1.0"
     settings = "os", "arch", "compiler", "build_type"
 
     def layout(self):
@@ -30,29 +30,20 @@ class SysConfigEGLConan(ConanFile):
     def system_requirements(self):
         if self.settings.os not in ["Linux", "FreeBSD"]:
             return
-        dnf = package_manager.Dnf(self)
-        dnf.install(["mesa-libEGL-devel"], update=True, check=True)
-
-        yum = package_manager.Yum(self)
-        yum.install(["mesa-libEGL-devel"], update=True, check=True)
-
-        apt = package_manager.Apt(self)
-        apt.install_substitutes(["libegl-dev"], ["libegl1-mesa-dev"], update=True, check=True)
-
-        pacman = package_manager.PacMan(self)
-        pacman.install(["libglvnd"], update=True, check=True)
-
-        zypper = package_manager.Zypper(self)
-        zypper.install(["Mesa-libEGL-devel"], update=True, check=True)
-
-        pkg = package_manager.Pkg(self)
-        pkg.install(["libglvnd"], update=True, check=True)
+        helpers = self.python_requires["mpv-helpers"].module
+        helpers.install_system_packages(self, package_manager.Dnf(self), ["mesa-libEGL-devel"])
+        helpers.install_system_packages(self, package_manager.Yum(self), ["mesa-libEGL-devel"])
+        helpers.install_system_packages(self, package_manager.Apt(self), ["libegl-dev"], ["libegl1-mesa-dev"])
+        helpers.install_system_packages(self, package_manager.PacMan(self), ["libglvnd"])
+        helpers.install_system_packages(self, package_manager.Zypper(self), ["Mesa-libEGL-devel"])
+        helpers.install_system_packages(self, package_manager.Pkg(self), ["libglvnd"])
 
     def package_info(self):
-        pkg_config = PkgConfig(self, "egl")
         self.cpp_info.includedirs = []
         self.cpp_info.libdirs = []
         if self.settings.os in ["Linux", "FreeBSD"]:
-            pkg_config.fill_cpp_info(self.cpp_info, is_system=True)
+            helpers = self.python_requires["mpv-helpers"].module
+            info = helpers.pkg_config_info(self, "egl")
+            helpers.fill_cpp_info(self.cpp_info, info, is_system=True)
         else:
             self.cpp_info.system_libs = ["EGL"]
@@ -1,12 +1,14 @@
 from conan import ConanFile
+from conan.tools.apple import is_apple_os
 from conan.tools.cmake import CMake, cmake_layout, CMakeDeps, CMakeToolchain
+from conan.tools.env import Environment
 from conan.tools.files import apply_conandata_patches, collect_libs, copy, export_conandata_patches, get, rmdir
 from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
 from conan.errors import ConanInvalidConfiguration
 import os
 
-required_conan_version = ">=1.53.0"
+required_conan_version = ">=2.0.8"
 
 
 class LibarchiveConan(ConanFile):
@@ -17,7 +19,10 @@ class LibarchiveConan(ConanFile):
     homepage = "https://libarchive.org"
     topics = ("archive", "compression", "tar", "data-compressor", "file-compression")
     package_type = "library"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
+    no_copy_source = True
     options = {
         "shared": [True, False],
         "fPIC": [True, False],
@@ -39,6 +44,7 @@ class LibarchiveConan(ConanFile):
         "with_mbedtls": [True, False],
         "with_xattr": [True, False],
         "with_pcre2": [True, False],
+        "reproducible": [True, False],
     }
     default_options = {
         "shared": False,
@@ -61,6 +67,7 @@ class LibarchiveConan(ConanFile):
         "with_mbedtls": False,
         "with_xattr": False,
         "with_pcre2": False,
+        "reproducible": False,
     }
 
     def export_sources(self):
@@ -113,6 +120,11 @@ class LibarchiveConan(ConanFile):
         if self.options.get_safe("with_pcre2"):
             self.requires("pcre2/10.43")
 
+    def package_id(self):
+        # C library, only the compiler major version can matter for its ABI
+        if self.info.settings.compiler in ("gcc", "clang", "apple-clang"):
+            self.info.settings.compiler.version = str(Version(self.info.settings.compiler.version).major)
+
     def validate(self):
         if self.settings.os != "Windows" and self.options.with_cng:
             # TODO: add cng when available in CCI
@@ -122,6 +134,14 @@ class LibarchiveConan(ConanFile):
 
     def source(self):
         get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        apply_conandata_patches(self)
+
+    def build_requirements(self):
+        if self._linker:
+            # CMAKE_LINKER_TYPE is new in CMake 3.29
+            self.tool_requires("cmake/[>=3.29 <4]")
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
 
     def generate(self):
         cmake_deps = CMakeDeps(self)
@@ -163,10 +183,34 @@ class LibarchiveConan(ConanFile):
         # TODO: Remove after fixing https://github.com/conan-io/conan/issues/12012
         if is_msvc(self):
             tc.cache_variables["CMAKE_TRY_COMPILE_CONFIGURATION"] = str(self.settings.build_type)
+        if self.options.reproducible:
+            tc.extra_cflags.extend(self._reproducible_flags)
+            tc.extra_cxxflags.extend(self._reproducible_flags)
+            if is_msvc(self):
+                tc.extra_sharedlinkflags.append("/Brepro")
+                tc.cache_variables["CMAKE_STATIC_LINKER_FLAGS"] = "/Brepro"
+            elif not is_apple_os(self):
+                # Deterministic archives
+                for lang in ("C", "CXX"):
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_CREATE"] = "<CMAKE_AR> qcD <TARGET> <LINK_FLAGS> <OBJECTS>"
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_APPEND"] = "<CMAKE_AR> qD <TARGET> <LINK_FLAGS> <OBJECTS>"
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_FINISH"] = "<CMAKE_RANLIB> -D <TARGET>"
+        if self._linker:
+            tc.cache_variables["CMAKE_LINKER_TYPE"] = self._linker.upper()
         tc.generate()
 
+        if self.options.reproducible:
+            env = Environment()
+            env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                              check_type=int)))
+            if is_apple_os(self):
+                env.define("ZERO_AR_DATE", "1")
+            env.vars(self).save_script("conanbuild_reproducible")
+
     def build(self):
-        apply_conandata_patches(self)
+        if self._jobserver:
+            # Lets make or ninja under cmake --build take their tokens from the pool
+            self.conf.define("tools.build:jobs", 0)
         cmake = CMake(self)
         cmake.configure()
         cmake.build()
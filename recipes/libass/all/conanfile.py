@@ -1,14 +1,18 @@
 from conan import ConanFile
 from conan.tools.meson import Meson, MesonToolchain
 from conan.tools.gnu import PkgConfigDeps
-from conan.tools.files import get, copy, rm, rmdir
+from conan.tools.files import get, copy, load, rm, rmdir, save
+from conan.tools.env import Environment
+from conan.tools.env.virtualrunenv import runenv_from_cpp_info
 from conan.tools.scm import Version
 from conan.tools.layout import basic_layout
 from conan.tools.apple import is_apple_os
-from conan.errors import ConanInvalidConfiguration
+from conan.tools.microsoft import is_msvc
+from conan.errors import ConanException, ConanInvalidConfiguration
 import os
 
-required_conan_version = ">=2.0.0"
+required_conan_version = ">=2.2.0"
+
 
 class LibassConan(ConanFile):
     name = "libass"
@@ -18,7 +22,10 @@ class LibassConan(ConanFile):
     homepage = "https://github.com/libass/libass"
     url = "https://github.com/conan-io/conan-center-index"
     package_type = "library"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
+    no_copy_source = True
     
     options = {
         "shared": [True, False],
@@ -30,6 +37,11 @@ class LibassConan(ConanFile):
         "libunibreak": [True, False],
         "require_system_font_provider": [True, False],
         "large_tiles": [True, False],
+        "perf_profile": [True, False],
+        "fontconfig_cache": [True, False],
+        "reproducible": [True, False],
+        "split_dwarf": [True, False],
+        "compress_debug_sections": [None, "zlib", "zstd"],
     }
     
     default_options = {
@@ -38,11 +50,13 @@ class LibassConan(ConanFile):
         "libunibreak": False,
         "require_system_font_provider": True,
         "large_tiles": False,
+        "perf_profile": False,
+        "fontconfig_cache": False,
+        "reproducible": False,
+        "split_dwarf": False,
+        "compress_debug_sections": None,
     }
 
-    def source(self):
-        get(self, **self.conan_data["sources"][self.version], strip_root=True)
-
     def config_options(self):
         if self.options.require_system_font_provider:
             if self.settings.os == "Windows":
@@ -57,6 +71,11 @@ class LibassConan(ConanFile):
         if self.settings.arch not in ["x86", "x86_64", "armv8"]:
             self.options.rm_safe("asm")
 
+        # ELF only, MSVC and Apple toolchains keep debug info in PDB and dSYM files
+        if self.settings.os == "Windows" or is_apple_os(self):
+            del self.options.split_dwarf
+            del self.options.compress_debug_sections
+
     def configure(self):
         self.settings.rm_safe("compiler.cppstd")
         self.settings.rm_safe("compiler.libcxx")
@@ -72,16 +91,60 @@ class LibassConan(ConanFile):
                 if self.options.get_safe("fontconfig") == None:
                     self.options.fontconfig = True
 
+        if not self.options.get_safe("fontconfig"):
+            self.options.rm_safe("fontconfig_cache")
+        elif self.options.fontconfig_cache:
+            # Conan gives every recipe with a finalize() method a copy of the package per
+            # machine, consumers without the cache keep using the package folder itself
+            self.finalize = self._build_fontconfig_cache
+
         if self.settings.arch in ["x86", "x86_64", "armv8"]:
             if self.options.asm == None:
                 self.options.asm = True
 
 
+    @property
+    def _freetype_options(self):
+        if not self.options.perf_profile:
+            return {}
+        # libass only rasterizes outlines and PNG color glyphs, drop the rest
+        return {
+            "with_bzip2": False,
+            "with_brotli": False,
+            "with_error_strings": False,
+        }
+
+    @property
+    def _harfbuzz_options(self):
+        if not self.options.perf_profile:
+            return {}
+        # Shaping goes through hb-ft only, the other backends just add startup and link cost
+        return {
+            "with_freetype": True,
+            "with_icu": False,
+            "with_glib": False,
+            "with_gdi": False,
+            "with_uniscribe": False,
+            "with_directwrite": False,
+            "with_subset": False,
+        }
+
+    def package_id(self):
+        # Plain C ABI, binaries from any minor release of the compiler can be reused
+        if self.info.settings.compiler in ("gcc", "clang", "apple-clang"):
+            self.info.settings.compiler.version = str(Version(self.info.settings.compiler.version).major)
+
+    def validate(self):
+        if self.options.get_safe("split_dwarf") or self.options.get_safe("compress_debug_sections"):
+            if self.settings.build_type not in ("Debug", "RelWithDebInfo"):
+                raise ConanInvalidConfiguration("split_dwarf and compress_debug_sections need debug info, "
+                                                "use build_type=Debug or RelWithDebInfo")
+
     def requirements(self):
         self.requires("libpng/[>=1.6]")
-        self.requires("freetype/[>=2.13]")
+        self.requires("freetype/[>=2.13]", options=self._freetype_options)
         self.requires("fribidi/[>=1.0]")
-        self.requires("harfbuzz/[>=7.3]")
+        self.requires("harfbuzz/[>=7.3]", options=self._harfbuzz_options)
         
         if self.options.libunibreak:
             self.requires("libunibreak/[>=5.1]")
@@ -94,12 +157,17 @@ class LibassConan(ConanFile):
         self.tool_requires("pkgconf/[>=1.7]")
         if self.options.get_safe("asm"):
             self.tool_requires("nasm/[>=2.15]")
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
 
     def layout(self):
         basic_layout(self)
 
     def source(self):
         get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        meson_build = os.path.join(self.source_folder, "meson.build")
+        helpers = self.python_requires["mpv-helpers"].module
+        save(self, meson_build, helpers.add_dependency_overrides(load(self, meson_build)))
 
     def generate(self):
         pc = PkgConfigDeps(self)
@@ -127,9 +195,36 @@ class LibassConan(ConanFile):
                 for option, value in boolean_options.items() 
         })
 
+        if self.options.get_safe("split_dwarf"):
+            tc.extra_cflags.append("-gsplit-dwarf")
+        if self.options.get_safe("compress_debug_sections"):
+            compress = f"--compress-debug-sections={self.options.compress_debug_sections}"
+            tc.extra_cflags.append(f"-Wa,{compress}")
+            tc.extra_ldflags.append(f"-Wl,{compress}")
+        if self.options.reproducible:
+            tc.extra_cflags.extend(self._reproducible_flags)
+            if is_msvc(self):
+                tc.extra_ldflags.append("/Brepro")
+        if self._linker:
+            tc.c_ld = self._linker
+        if self.conf.get("user.mpv:meson_dependency_overrides", default=False, check_type=bool):
+            helpers = self.python_requires["mpv-helpers"].module
+            tc.properties.update(helpers.meson_dependency_properties(self.generators_folder))
+
         tc.generate()
 
+        if self.options.reproducible:
+            env = Environment()
+            env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                              check_type=int)))
+            if is_apple_os(self):
+                env.define("ZERO_AR_DATE", "1")
+            env.vars(self).save_script("conanbuild_reproducible")
+
     def build(self):
+        if self._jobserver:
+            # ninja only acts as a jobserver client without an explicit -j
+            self.conf.define("tools.build:jobs", 0)
         meson = Meson(self)
         meson.configure()
         meson.build()
@@ -140,9 +235,46 @@ class LibassConan(ConanFile):
         meson.install()
         rmdir(self, os.path.join(self.package_folder, "lib", "pkgconfig"))
         rm(self, "*.pdb", os.path.join(self.package_folder, "lib"))
+        if self.options.get_safe("split_dwarf"):
+            # The assembly of the asm option has no .dwo files, its debug info stays in the library
+            self._package_dwp()
+
+    def _build_fontconfig_cache(self):
+        copy(self, "*", src=self.immutable_package_folder, dst=self.package_folder)
+        # The cache is keyed on absolute font directory paths, so it is generated here, in the
+        # final folder on the consuming machine, rather than in package().
+        fontconfig_folder = os.path.join(self.package_folder, "res", "fontconfig")
+        # Extra font folders of the consuming machine, system fonts come from /etc/fonts
+        font_dirs = "".join(f"  <dir>{font_dir}</dir>\n" for font_dir in
+                            self.conf.get("user.libass:font_dirs", default=[], check_type=list))
+        # Our cachedir comes first so that it is the one fc-cache writes to
+        save(self, os.path.join(fontconfig_folder, "fonts.conf"), f"""<?xml version="1.0"?>
+<!DOCTYPE fontconfig SYSTEM "urn:fontconfig:fonts.dtd">
+<fontconfig>
+  <cachedir>{os.path.join(fontconfig_folder, "cache")}</cachedir>
+{font_dirs}  <include ignore_missing="yes">/etc/fonts/fonts.conf</include>
+</fontconfig>
+""")
+        # fc-cache of the fontconfig libass links, other releases may write another cache version
+        fontconfig = self.dependencies["fontconfig"]
+        bindirs = fontconfig.cpp_info.aggregated_components().bindirs
+        fc_cache = next((os.path.join(bindir, "fc-cache") for bindir in bindirs
+                         if os.path.isfile(os.path.join(bindir, "fc-cache"))), None)
+        if fc_cache is None:
+            raise ConanException(f"fontconfig_cache needs fc-cache, {fontconfig.ref} was packaged without it")
+        env = Environment()
+        for dependency in self.dependencies.host.values():
+            env.compose_env(runenv_from_cpp_info(dependency, str(self.info.settings.os)))
+        env.define_path("FONTCONFIG_FILE", os.path.join(fontconfig_folder, "fonts.conf"))
+        with env.vars(self).apply():
+            self.run(f'"{fc_cache}"')
 
     def package_info(self):
         self.cpp_info.libs = ["ass"]
+        if self.options.get_safe("fontconfig_cache"):
+            fontconfig_folder = os.path.join(self.package_folder, "res", "fontconfig")
+            self.cpp_info.resdirs = ["res"]
+            self.runenv_info.define_path("FONTCONFIG_FILE", os.path.join(fontconfig_folder, "fonts.conf"))
         if self.settings.os in ["Linux", "FreeBSD"]:
             self.cpp_info.system_libs = ["m"]
         elif self.settings.os == "Windows":
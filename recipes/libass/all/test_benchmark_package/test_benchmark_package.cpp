@@ -0,0 +1,113 @@
+// Measures the two libass costs that show up in mpv: font provider
+// initialization (ass_set_fonts, which triggers the fontconfig scan on Linux)
+// and shaping/rendering throughput, cold and with the glyph caches warm.
+
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <string>
+
+#include <ass/ass.h>
+
+namespace {
+
+using Clock = std::chrono::steady_clock;
+
+double elapsed_ms(Clock::time_point start) {
+    return std::chrono::duration<double, std::milli>(Clock::now() - start).count();
+}
+
+// Mixed-script lines so that bidi, shaping and font fallback are all exercised.
+const char* const lines[] = {
+    "The quick brown fox jumps over the lazy dog.",
+    "{\\b1}Съешь же ещё этих мягких французских булок{\\b0}, да выпей чаю.",
+    "{\\i1}Ξεσκεπάζω την ψυχοφθόρα βδελυγμία.{\\i0}",
+    "\xd8\xa7\xd9\x84\xd8\xb3\xd9\x84\xd8\xa7\xd9\x85 \xd8\xb9\xd9\x84\xd9\x8a\xd9\x83\xd9\x85 - mixed RTL and LTR text",
+    "{\\fs60\\bord4\\shad2}Large outlined text with shadow",
+    "{\\blur3}Blurred line that stresses the rasterizer and the bitmap cache",
+};
+
+std::string make_script(int events) {
+    std::string script =
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        "PlayResX: 1920\n"
+        "PlayResY: 1080\n"
+        "\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        "Style: Default,sans-serif,48,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,"
+        "0,0,0,0,100,100,0,0,1,2,1,2,20,20,40,1\n"
+        "\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n";
+    const int line_count = sizeof(lines) / sizeof(lines[0]);
+    char timing[64];
+    for (int i = 0; i < events; ++i) {
+        // One event per second, each visible for two seconds so frames overlap two lines.
+        std::snprintf(timing, sizeof(timing), "Dialogue: 0,%d:%02d:%02d.00,%d:%02d:%02d.00,Default,,0,0,0,,",
+                      i / 3600, (i / 60) % 60, i % 60, (i + 2) / 3600, ((i + 2) / 60) % 60, (i + 2) % 60);
+        script += timing;
+        script += lines[i % line_count];
+        script += "\n";
+    }
+    return script;
+}
+
+double render_timeline(ASS_Renderer* renderer, ASS_Track* track, int events, int* images) {
+    auto start = Clock::now();
+    *images = 0;
+    for (int i = 0; i < events; ++i) {
+        int change = 0;
+        for (ASS_Image* img = ass_render_frame(renderer, track, i * 1000LL + 500, &change); img; img = img->next) {
+            ++*images;
+        }
+    }
+    return elapsed_ms(start);
+}
+
+} // namespace
+
+int main(int argc, char** argv) {
+    const int events = argc > 1 ? std::atoi(argv[1]) : 2000;
+
+    auto start = Clock::now();
+    ASS_Library* library = ass_library_init();
+    ASS_Renderer* renderer = library ? ass_renderer_init(library) : nullptr;
+    if (!renderer) {
+        std::fprintf(stderr, "failed to initialize libass\n");
+        return 1;
+    }
+    const double init_ms = elapsed_ms(start);
+
+    ass_set_frame_size(renderer, 1920, 1080);
+    ass_set_storage_size(renderer, 1920, 1080);
+
+    start = Clock::now();
+    ass_set_fonts(renderer, nullptr, "sans-serif", ASS_FONTPROVIDER_AUTODETECT, nullptr, 1);
+    const double fonts_ms = elapsed_ms(start);
+
+    std::string script = make_script(events);
+    ASS_Track* track = ass_read_memory(library, &script[0], script.size(), nullptr);
+    if (!track) {
+        std::fprintf(stderr, "failed to parse the generated script\n");
+        return 1;
+    }
+
+    int images = 0;
+    const double cold_ms = render_timeline(renderer, track, events, &images);
+    const double warm_ms = render_timeline(renderer, track, events, &images);
+
+    std::printf("library+renderer init:  %10.2f ms\n", init_ms);
+    std::printf("ass_set_fonts:          %10.2f ms\n", fonts_ms);
+    std::printf("cold render:            %10.2f ms, %8.1f frames/s\n", cold_ms, events * 1000.0 / cold_ms);
+    std::printf("warm render (cached):   %10.2f ms, %8.1f frames/s\n", warm_ms, events * 1000.0 / warm_ms);
+    std::printf("images per pass:        %10d\n", images);
+
+    ass_free_track(track);
+    ass_renderer_done(renderer);
+    ass_library_done(library);
+    return 0;
+}
@@ -1,15 +1,24 @@
 from conan import ConanFile
+from conan.errors import ConanInvalidConfiguration
+from conan.tools.apple import is_apple_os
 from conan.tools.files import get, copy, rmdir
 from conan.tools.layout import basic_layout
 from conan.tools.gnu import AutotoolsToolchain
 from conan.tools.gnu.get_gnu_triplet import _get_gnu_triplet
 from conan.tools.env import Environment
+from conan.tools.build import build_jobs
+from conan.tools.scm import Version
 
+import glob
+import os
 import shlex
 from os.path import join
 from pathlib import Path
 from functools import cached_property
 
+required_conan_version = ">=2.0.8"
+
+
 class LibdoviConan(ConanFile):
     name = "libdovi"
     license = "MIT"
@@ -17,17 +26,26 @@ class LibdoviConan(ConanFile):
     homepage = "https://github.com/quietvoid/dovi_tool"
     url = "https://github.com/quietvoid/dovi_tool"
     package_type = "library"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
+    no_copy_source = True
 
     options = {
         "shared": [True, False],
         "xml": [True, False],
         "serde": [True, False],
+        "reproducible": [True, False],
+        "split_dwarf": [True, False],
+        "compress_debug_sections": [None, "zlib", "zstd"],
     }
     default_options = {
         "shared": False,
         "xml": True,
         "serde": True,
+        "reproducible": False,
+        "split_dwarf": False,
+        "compress_debug_sections": None,
     }
 
     @cached_property
@@ -51,10 +69,17 @@ class LibdoviConan(ConanFile):
             (",xml" if self.options.xml == True else "") +
             (",serde" if self.options.serde == True else ""),
             "--target", self.__triplet,
+            "--manifest-path", join(self._crate_folder, "dolby_vision", "Cargo.toml"),
             "--target-dir", self.build_folder,
             "--prefix", "/",
             "--destdir", self.package_folder]
 
+    @property
+    def _crate_folder(self):
+        # Cargo writes Cargo.lock next to the workspace manifest, so it builds a copy of the
+        # sources and the source folder shared by all configurations stays untouched
+        return join(self.build_folder, "crate")
+
     def source(self):
         get(self, **self.conan_data["sources"][self.version], strip_root=True)
 
@@ -64,22 +89,70 @@ class LibdoviConan(ConanFile):
     def config_options(self):
         if self.settings.os == "Windows":
             del self.options.fPIC
+        if self.settings.os == "Windows" or is_apple_os(self):
+            del self.options.split_dwarf
+            del self.options.compress_debug_sections
+
+    def configure(self):
+        # Rust behind a C API, the C/C++ compiler only drives the final link
+        self.settings.rm_safe("compiler.cppstd")
+        self.settings.rm_safe("compiler.libcxx")
+
+    def validate(self):
+        if self.options.get_safe("split_dwarf") or self.options.get_safe("compress_debug_sections"):
+            if self.settings.build_type not in ("Debug", "RelWithDebInfo"):
+                raise ConanInvalidConfiguration("split_dwarf and compress_debug_sections need debug info, "
+                                                "use build_type=Debug or RelWithDebInfo")
+
+    def package_id(self):
+        if self.info.settings.compiler in ("gcc", "clang", "apple-clang"):
+            self.info.settings.compiler.version = str(Version(self.info.settings.compiler.version).major)
+
+    def build_requirements(self):
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
 
     def generate(self):
         toolchain = AutotoolsToolchain(self).environment().vars(self)
         env = Environment()
-        env.define("RUSTFLAGS", 
-            shlex.join(map(lambda flag: f"-Clink-arg={flag}", shlex.split(toolchain["LDFLAGS"]))))
+        rustflags = list(map(lambda flag: f"-Clink-arg={flag}", shlex.split(toolchain["LDFLAGS"])))
+        if self._linker:
+            rustflags.append(f"-Clink-arg=-fuse-ld={self._linker}")
+        if self.options.reproducible:
+            # Crate sources from the registry and the target dir end up in panic messages and debug info
+            cargo_home = os.environ.get("CARGO_HOME", join(Path.home(), ".cargo"))
+            rustflags.extend([
+                f"--remap-path-prefix={cargo_home}=/usr/src/cargo",
+                f"--remap-path-prefix={self.build_folder}=/usr/src/libdovi-{self.version}/build",
+                # Inside the build folder, so it comes after it, the last matching prefix wins
+                f"--remap-path-prefix={self._crate_folder}=/usr/src/libdovi-{self.version}",
+            ])
+            env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                              check_type=int)))
+        if self.settings.build_type == "RelWithDebInfo" and \
+                (self.options.get_safe("split_dwarf") or self.options.get_safe("compress_debug_sections")):
+            # -r builds the release profile, which has no debug info by default. Only split and
+            # compressed debug info need it, other RelWithDebInfo builds keep the release profile
+            env.define("CARGO_PROFILE_RELEASE_DEBUG", "true")
+        if self.options.get_safe("split_dwarf"):
+            rustflags.append("-Csplit-debuginfo=unpacked")
+            # Incremental builds keep .dwo files of their own, dwp fails on the duplicates
+            env.define("CARGO_INCREMENTAL", "0")
+        env.define("RUSTFLAGS", shlex.join(rustflags))
         env.define(f"CARGO_TARGET_{self.__triplet.replace("-", "_").upper()}_LINKER", toolchain["CC"])
         env.vars(self).save_script("rusttoolchain")
 
     def build(self):
+        # With a jobserver in MAKEFLAGS cargo takes its tokens from it and ignores -j
+        njobs = build_jobs(self)
+        jobs = [f"-j{njobs}"] if njobs and not self._jobserver else []
+        copy(self, "*", src=self.source_folder, dst=self._crate_folder)
         with Path(self.build_folder, "build.log").open("w") as log:
             self.run(shlex.join((
                     "cargo", "cbuild", 
-                    *self.__cargo_args
+                    *self.__cargo_args,
+                    *jobs
                 )), 
-                cwd=join(self.source_folder, "dolby_vision"), 
                 stderr=log, 
                 env="rusttoolchain"
             )
@@ -90,12 +163,22 @@ class LibdoviConan(ConanFile):
                     "cargo", "cinstall", 
                     *self.__cargo_args
                 )), 
-                cwd=join(self.source_folder, "dolby_vision"), 
                 stderr=log, 
                 env="rusttoolchain"
             )
         rmdir(self, join(self.package_folder, "lib", "pkgconfig"))
         copy(self, "LICENSE*", src=self.source_folder, dst=join(self.package_folder, "licenses"))
+        if self.options.get_safe("split_dwarf"):
+            # Only the crates are split, the prebuilt standard library keeps its debug info inline
+            self._package_dwp()
+        if self.options.get_safe("compress_debug_sections"):
+            # rustc has no stable flag to compress the debug info it writes, so the installed
+            # library is compressed afterwards, archive members included
+            objcopy = "llvm-objcopy" if "clang" in str(self.settings.compiler) else "objcopy"
+            for library in glob.glob(join(self.package_folder, "lib", "libdovi.*")):
+                if not os.path.islink(library):
+                    self.run(shlex.join([objcopy, f"--compress-debug-sections={self.options.compress_debug_sections}",
+                                         library]))
 
     def package_info(self):
         self.cpp_info.set_property("pkg_config_name", "dovi")
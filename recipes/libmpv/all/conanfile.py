@@ -1,14 +1,49 @@
 from conan import ConanFile
 from conan.tools.meson import Meson, MesonToolchain
-from conan.tools.files import copy, get, rmdir
+from conan.tools.files import copy, get, load, rmdir, save
 from conan.tools.apple import is_apple_os
 from conan.tools.microsoft import is_msvc
 from conan.tools.layout import basic_layout
 from conan.tools.gnu import PkgConfigDeps
-from conan.errors import ConanInvalidConfiguration
+from conan.tools.env import Environment
+from conan.errors import ConanException, ConanInvalidConfiguration
+from collections import namedtuple
+import glob
+import json
 import os
+import re
+import shlex
+import shutil
+import string
+import struct
+import sys
+
+required_conan_version = ">=2.1.0"
+
+# Every mpv build feature the recipe exposes, as one table from which the options, their
+# platform availability, the configure() defaults, the requirements and the Meson project
+# options are all derived:
+#   meson     - name of the Meson option, None for options Meson auto-detects
+#   kind      - "boolean" or "feature", the type of the Meson option
+#   platforms - os values the option exists on, None for all of them
+#   defaults  - a value for default_options, or a dict of os (or "*") -> value that configure()
+#               applies when the option is still unset, so that presets like headless can win
+#   requires  - packages required when the option is enabled
+#   values    - possible option values
+_Feature = namedtuple("_Feature", ["meson", "kind", "platforms", "defaults", "requires", "values"],
+                      defaults=[None, None, None, (True, False)])
+
+_WINDOWS = ("Windows",)
+_LINUX = ("Linux", "FreeBSD")
+_ANDROID = ("Android",)
+_APPLE = ("Macos", "iOS", "watchOS", "tvOS", "visionOS")
+_MACOS = ("Macos",)
+_IOS = ("iOS",)
+
+
+def _on(platforms, value=True):
+    return dict.fromkeys(platforms, value)
 
-required_conan_version = ">=2.0.0"
 
 class LibmpvConan(ConanFile):
     name = "libmpv"
@@ -18,150 +53,457 @@ class LibmpvConan(ConanFile):
     description = "Command line video player"
     topics = ("video", "audio", "player", "multimedia")
     package_type = "library"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
-    options = {
+    no_copy_source = True
+
+    _features = {
         # Basic options
-        "shared": [True, False],
-        "cplayer": [True, False],
-        "tests": [True, False],
-        "fuzzers": [True, False],
-        "build_date": [True, False],
-        "gpl": [True, False],
-        "ta_leak_report": [True, False],
+        "cplayer": _Feature("cplayer", "boolean", defaults=False),
+        "tests": _Feature("tests", "boolean", defaults=False),
+        "fuzzers": _Feature("fuzzers", "boolean", defaults=False),
+        "build_date": _Feature("build-date", "boolean", defaults={"*": True}),
+        "gpl": _Feature("gpl", "boolean", defaults=True),
+        "ta_leak_report": _Feature("ta-leak-report", "boolean", defaults=False),
 
         # Features
-        "cdda": [True, False],
-        "cplugins": [True, False],
-        "dvbin": [True, False],
-        "dvdnav": [True, False],
-        "iconv": [True, False], 
-        "javascript": [True, False],
-        "jpeg": [True, False],
-        "lcms2": [True, False],
-        "libarchive": [True, False],
-        "libavdevice": [True, False],
-        "libbluray": [True, False],
-        "lua": ["lua-5.2", "lua-5.1", "luajit", True, False],
-        "pthread_debug": [True, False],
-        "rubberband": [True, False],
-        "sdl2": [True, False],
-        "sdl2_gamepad": [True, False],
-        "uchardet": [True, False],
-        "uwp": [True, False],
-        "vapoursynth": [True, False],
-        "vector": [True, False],
-        "win32_threads": [True, False],
-        "zimg": [True, False],
-        "zlib": [True, False],
+        "cdda": _Feature("cdda", "feature", defaults={"*": False},
+                         requires=("libcdio/[>=0.90]", "libcdio_paranoia/[>=0.90]")),
+        "cplugins": _Feature("cplugins", "feature", defaults={"*": True}),
+        "dvbin": _Feature("dvbin", "feature", defaults={"*": False}),
+        "dvdnav": _Feature("dvdnav", "feature", defaults={"*": False},
+                           requires=("libdvdnav/[>=4.2.0]", "libdvdread/[>=4.1.0]")),
+        # libiconv is only required where libc does not provide iconv, see requirements()
+        "iconv": _Feature("iconv", "feature", defaults={"*": True}),
+        "javascript": _Feature("javascript", "feature", defaults={"*": True},
+                               requires=("mujs/[>=1.0.0]",)),
+        "jpeg": _Feature("jpeg", "feature", defaults={"*": True}, requires=("libjpeg/[>=9]",)),
+        "lcms2": _Feature("lcms2", "feature", defaults={"*": True}, requires=("lcms/[>=2.6]",)),
+        "libarchive": _Feature("libarchive", "feature", defaults={"*": True},
+                               requires=("libarchive/[>=3.4.0]",)),
+        "libavdevice": _Feature("libavdevice", "feature", defaults={"*": True}),
+        "libbluray": _Feature("libbluray", "feature", defaults={"*": False},
+                              requires=("libbluray/[>=0.3.0]",)),
+        # The Lua package depends on the selected version, see requirements()
+        "lua": _Feature("lua", "feature", defaults={"*": "lua-5.2"},
+                        values=("lua-5.2", "lua-5.1", "luajit", True, False)),
+        "pthread_debug": _Feature("pthread-debug", "feature", defaults=False),
+        "rubberband": _Feature("rubberband", "feature", defaults={"*": False}), # No conan package available
+        "sdl2": _Feature("sdl2", "feature", defaults={"*": True}, requires=("sdl/[>=2.0.14 <3]",)),
+        "sdl2_gamepad": _Feature("sdl2-gamepad", "feature", defaults={"*": True}),
+        "uchardet": _Feature("uchardet", "feature", defaults={"*": True},
+                             requires=("uchardet/[>=0.0.1]",)),
+        "uwp": _Feature("uwp", "feature", _WINDOWS, _on(_WINDOWS, False)),
+        "vapoursynth": _Feature("vapoursynth", "feature", defaults={"*": False},
+                                requires=("vapoursynth/[>=56]", "vapoursynth-script/[>=56]")),
+        "vector": _Feature("vector", "feature", defaults={"*": True}),
+        "win32_threads": _Feature("win32-threads", "feature", _WINDOWS, _on(_WINDOWS)),
+        "zimg": _Feature("zimg", "feature", defaults={"*": True}, requires=("zimg/[>=2.9]",)),
+        "zlib": _Feature("zlib", "feature", defaults={"*": True}, requires=("zlib/[>=1.2.11]",)),
 
         # Audio outputs
-        "alsa": [True, False],
-        "audiounit": [True, False],
-        "avfoundation": [True, False],
-        "coreaudio": [True, False],
-        "jack": [True, False],
-        "openal": [True, False],
-        "opensles": [True, False],
-        "oss_audio": [True, False],
-        "pipewire": [True, False],
-        "pulse": [True, False],
-        "sdl2_audio": [True, False],
-        "sndio": [True, False],
-        "wasapi": [True, False],
+        "alsa": _Feature("alsa", "feature", _LINUX, _on(_LINUX), ("libalsa/[>=1.0.18]",)),
+        "audiounit": _Feature("audiounit", "feature", _APPLE, _on(_APPLE)),
+        "avfoundation": _Feature("avfoundation", "feature", _APPLE, _on(_APPLE)),
+        "coreaudio": _Feature("coreaudio", "feature", _APPLE, _on(_APPLE)),
+        "jack": _Feature("jack", "feature", _LINUX, _on(_LINUX), ("jack2/[>=0.0.1]",)),
+        # Android additionally needs oboe, see requirements()
+        "openal": _Feature("openal", "feature",
+                           defaults={**_on(_WINDOWS + _LINUX + _APPLE), "Android": False}, # Doesn't work on Android
+                           requires=("openal-soft/[>=1.22.0]",)),
+        "opensles": _Feature("opensles", "feature", _ANDROID, _on(_ANDROID)),
+        "oss_audio": _Feature("oss-audio", "feature", _LINUX, _on(_LINUX)),
+        "pipewire": _Feature("pipewire", "feature", _LINUX, _on(_LINUX), ("libpipewire/[>=0.3.57]",)),
+        "pulse": _Feature("pulse", "feature", _LINUX, _on(_LINUX), ("pulseaudio/[>=1.0]",)),
+        "sdl2_audio": _Feature("sdl2-audio", "feature", defaults={"*": True}),
+        "sndio": _Feature("sndio", "feature", _LINUX, _on(_LINUX), ("sndio/[>=1.9.0]",)),
+        "wasapi": _Feature("wasapi", "feature", _WINDOWS, _on(_WINDOWS)),
 
         # Video outputs
-        "caca": [True, False],
-        "cocoa": [True, False],
-        "d3d11": [True, False],
-        "direct3d": [True, False],
-        "dmabuf_wayland": [True, False],
-        "drm": [True, False],
-        "egl": [True, False],
-        "egl_android": [True, False],
-        "egl_angle": [True, False],
-        "egl_angle_lib": [True, False],
-        "egl_angle_win32": [True, False],
-        "egl_drm": [True, False],
-        "egl_wayland": [True, False],
-        "egl_x11": [True, False],
-        "gbm": [True, False],
-        "gl": [True, False],
-        "gl_cocoa": [True, False],
-        "gl_dxinterop": [True, False],
-        "gl_win32": [True, False],
-        "gl_x11": [True, False],
-        "plain_gl": [True, False],
-        "sdl2_video": [True, False],
-        "shaderc": [True, False],
-        "sixel": [True, False],
-        "spirv_cross": [True, False],
-        "vaapi": [True, False],
-        "vaapi_drm": [True, False],
-        "vaapi_wayland": [True, False],
-        "vaapi_win32": [True, False],
-        "vaapi_x11": [True, False],
-        "vdpau": [True, False],
-        "vdpau_gl_x11": [True, False],
-        "vulkan": [True, False],
-        "wayland": [True, False],
-        "x11": [True, False],
-        "xv": [True, False],
+        "caca": _Feature("caca", "feature", defaults={"*": False}, requires=("libcaca/[>=0.99]",)),
+        "cocoa": _Feature("cocoa", "feature", _MACOS),
+        "d3d11": _Feature("d3d11", "feature", _WINDOWS, _on(_WINDOWS)),
+        "direct3d": _Feature("direct3d", "feature", _WINDOWS, _on(_WINDOWS)),
+        "dmabuf_wayland": _Feature("dmabuf-wayland", "feature", _LINUX, _on(_LINUX)),
+        "drm": _Feature("drm", "feature", _LINUX, _on(_LINUX),
+                        ("libdrm/[>=2.4.105]", "libdisplay-info/[>=0.1.1]")),
+        "egl": _Feature("egl", "feature", defaults={"*": False, **_on(_LINUX + _ANDROID)},
+                        requires=("egl/system",)),
+        "egl_android": _Feature("egl-android", "feature", _ANDROID, _on(_ANDROID)),
+        "egl_angle": _Feature("egl-angle", "feature", _WINDOWS, _on(_WINDOWS, False)),
+        "egl_angle_lib": _Feature("egl-angle-lib", "feature", _WINDOWS, _on(_WINDOWS, False)),
+        "egl_angle_win32": _Feature("egl-angle-win32", "feature", _WINDOWS, _on(_WINDOWS, False)),
+        "egl_drm": _Feature("egl-drm", "feature", _LINUX, _on(_LINUX)),
+        "egl_wayland": _Feature("egl-wayland", "feature", _LINUX, _on(_LINUX)),
+        "egl_x11": _Feature("egl-x11", "feature", _LINUX, _on(_LINUX)),
+        "gbm": _Feature("gbm", "feature", _LINUX, _on(_LINUX), ("opengl/system",)),
+        "gl": _Feature("gl", "feature", defaults={"*": True}, requires=("opengl/system",)),
+        "gl_cocoa": _Feature("gl-cocoa", "feature", _MACOS),
+        "gl_dxinterop": _Feature("gl-dxinterop", "feature", _WINDOWS, _on(_WINDOWS)),
+        "gl_win32": _Feature("gl-win32", "feature", _WINDOWS, _on(_WINDOWS)),
+        "gl_x11": _Feature("gl-x11", "feature", _LINUX, _on(_LINUX)),
+        "plain_gl": _Feature("plain-gl", "feature", defaults={"*": True}),
+        "sdl2_video": _Feature("sdl2-video", "feature", defaults={"*": True}),
+        # shaderc and spirv_cross defaults depend on each other, see configure()
+        "shaderc": _Feature("shaderc", "feature", _WINDOWS, requires=("shaderc/[>=2023.7]",)),
+        "sixel": _Feature("sixel", "feature", defaults={"*": False}, requires=("libsixel/[>=1.5]",)),
+        "spirv_cross": _Feature("spirv-cross", "feature", _WINDOWS, requires=("spirv-cross/[>=1.3.268]",)),
+        "vaapi": _Feature("vaapi", "feature", _LINUX + _WINDOWS, _on(_LINUX), ("libva/[>=1.1.0]",)),
+        "vaapi_drm": _Feature(None, "feature", _LINUX, _on(_LINUX)),
+        "vaapi_wayland": _Feature(None, "feature", _LINUX, _on(_LINUX)),
+        "vaapi_win32": _Feature(None, "feature", _WINDOWS, _on(_WINDOWS, False)),
+        "vaapi_x11": _Feature(None, "feature", _LINUX, _on(_LINUX)),
+        "vdpau": _Feature("vdpau", "feature", _LINUX, _on(_LINUX), ("libvdpau/[>=0.2]",)),
+        "vdpau_gl_x11": _Feature("vdpau-gl-x11", "feature", _LINUX, _on(_LINUX)),
+        "vulkan": _Feature("vulkan", "feature", defaults={"*": True}, requires=("vulkan-loader/[>=1.3.238]",)),
+        "wayland": _Feature("wayland", "feature", _LINUX, _on(_LINUX),
+                            ("wayland/[>=1.21.0]", "wayland-protocols/[>=1.31]", "xorg/system")),
+        "x11": _Feature("x11", "feature", _LINUX, _on(_LINUX), ("xorg/system",)),
+        "xv": _Feature("xv", "feature", _LINUX, _on(_LINUX)),
 
         # Hardware acceleration
-        "android_media_ndk": [True, False],
-        "cuda_hwaccel": [True, False],
-        "cuda_interop": [True, False],
-        "d3d_hwaccel": [True, False],
-        "d3d9_hwaccel": [True, False],
-        "gl_dxinterop_d3d9": [True, False],
-        "ios_gl": [True, False],
-        "videotoolbox_gl": [True, False],
-        "videotoolbox_pl": [True, False],
-
-        # macOS features
-        "macos_10_15_4_features": [True, False],
-        "macos_11_features": [True, False],
-        "macos_11_3_features": [True, False],
-        "macos_12_features": [True, False],
-        "macos_cocoa_cb": [True, False],
-        "macos_media_player": [True, False],
-        "macos_touchbar": [True, False],
-        "swift_build": [True, False],
+        "android_media_ndk": _Feature("android-media-ndk", "feature", _ANDROID, _on(_ANDROID)),
+        "cuda_hwaccel": _Feature("cuda-hwaccel", "feature", defaults={"*": False}),
+        "cuda_interop": _Feature("cuda-interop", "feature", defaults={"*": False}),
+        "d3d_hwaccel": _Feature("d3d-hwaccel", "feature", _WINDOWS, _on(_WINDOWS)),
+        "d3d9_hwaccel": _Feature("d3d9-hwaccel", "feature", _WINDOWS, _on(_WINDOWS)),
+        "gl_dxinterop_d3d9": _Feature("gl-dxinterop-d3d9", "feature", _WINDOWS, _on(_WINDOWS)),
+        "ios_gl": _Feature("ios-gl", "feature", _IOS),
+        "videotoolbox_gl": _Feature("videotoolbox-gl", "feature", _APPLE, _on(_APPLE)),
+        "videotoolbox_pl": _Feature("videotoolbox-pl", "feature", _APPLE, _on(_APPLE)),
+
+        # macOS features, opt-in like cocoa and ios_gl
+        "macos_10_15_4_features": _Feature("macos-10-15-4-features", "feature", _MACOS),
+        "macos_11_features": _Feature("macos-11-features", "feature", _MACOS),
+        "macos_11_3_features": _Feature("macos-11-3-features", "feature", _MACOS),
+        "macos_12_features": _Feature("macos-12-features", "feature", _MACOS),
+        "macos_cocoa_cb": _Feature("macos-cocoa-cb", "feature", _MACOS),
+        "macos_media_player": _Feature("macos-media-player", "feature", _MACOS),
+        "macos_touchbar": _Feature("macos-touchbar", "feature", _MACOS),
+        "swift_build": _Feature("swift-build", "feature", _APPLE),
 
         # Windows features
-        "win32_smtc": [True, False],
+        "win32_smtc": _Feature("win32-smtc", "feature", _WINDOWS, _on(_WINDOWS)),
 
         # Documentation
-        "html_build": [True, False],
-        "manpage_build": [True, False],
-        "pdf_build": [True, False],
+        "html_build": _Feature("html-build", "feature", defaults=False),
+        "manpage_build": _Feature("manpage-build", "feature", defaults=False),
+        "pdf_build": _Feature("pdf-build", "feature", defaults=False),
+    }
+
+    options = {
+        # Basic options
+        "shared": [True, False],
+        "headless": [True, False],
+        "lazy_backends": [True, False],
+        "reproducible": [True, False],
+
+        # Shared library link tuning (ELF only)
+        "hidden_visibility": [True, False],
+        "bsymbolic_functions": [True, False],
+        "as_needed": [True, False],
+        "gc_sections": [True, False],
+        "icf": [None, "safe", "all"],
+
+        # Static library bundling
+        "bundle": [None, "archive", "object"],
+
+        # Post-link optimization
+        "bolt": [True, False],
+
+        # Debug info layout (ELF only)
+        "split_dwarf": [True, False],
+        "compress_debug_sections": [None, "zlib", "zstd"],
+
+        # FFmpeg configuration
+        "software_decode": [True, False],
+
+        # mpv features
+        **{option: list(feature.values) for option, feature in _features.items()},
     }
     default_options = {
         # Library options
         "shared": False,
 
         # Build options
-        "gpl": True,
-        "build_date": True,
+        "headless": False,
+        "lazy_backends": False,
+        "reproducible": False,
 
-        # Executables
-        "cplayer": False,
+        # Shared library link tuning
+        "hidden_visibility": False,
+        "bsymbolic_functions": False,
+        "as_needed": True, # Meson's own default
+        "gc_sections": False,
+        "icf": None,
 
-        # Tests and fuzzers
-        "tests": False,
-        "fuzzers": False,
+        # Static library bundling
+        "bundle": None,
 
-        # Debugging
-        "ta_leak_report": False,
-        "pthread_debug": False,
+        # Post-link optimization
+        "bolt": False,
 
-        # Documentation
-        "html_build": False,
-        "manpage_build": False,
-        "pdf_build": False,
+        # Debug info layout
+        "split_dwarf": False,
+        "compress_debug_sections": None,
+
+        # FFmpeg configuration
+        "software_decode": False,
+
+        # mpv features with a fixed default, the others get theirs in configure()
+        **{option: feature.defaults for option, feature in _features.items()
+           if feature.defaults is not None and not isinstance(feature.defaults, dict)},
+    }
+
+    # Options that only build together with other options, option -> options it needs enabled.
+    # Mirrors the require() conditions of mpv's meson.build so that conflicts fail in validate().
+    _option_rules = {
+        "cuda_interop": ("cuda_hwaccel",),
+        "d3d9_hwaccel": ("d3d_hwaccel",),
+        "dmabuf_wayland": ("wayland", "drm"),
+        "egl_android": ("egl",),
+        "egl_angle_lib": ("egl_angle",),
+        "egl_angle_win32": ("egl_angle",),
+        "egl_drm": ("egl", "drm", "gbm"),
+        "egl_wayland": ("egl", "wayland"),
+        "egl_x11": ("egl", "x11"),
+        "gl_cocoa": ("gl", "cocoa"),
+        "gl_dxinterop": ("gl", "gl_win32"),
+        "gl_dxinterop_d3d9": ("gl_dxinterop", "d3d9_hwaccel"),
+        "gl_win32": ("gl",),
+        "gl_x11": ("gl", "x11"),
+        "ios_gl": ("gl",),
+        "macos_cocoa_cb": ("cocoa", "swift_build"),
+        "macos_media_player": ("swift_build",),
+        "macos_touchbar": ("cocoa", "swift_build"),
+        "plain_gl": ("gl",),
+        "sdl2_audio": ("sdl2",),
+        "sdl2_gamepad": ("sdl2",),
+        "sdl2_video": ("sdl2",),
+        "vaapi_drm": ("vaapi", "drm"),
+        "vaapi_wayland": ("vaapi", "wayland"),
+        "vaapi_win32": ("vaapi",),
+        "vaapi_x11": ("vaapi", "x11"),
+        "vdpau_gl_x11": ("vdpau", "gl_x11"),
+    }
+
+    # Optional backends that lazy_backends turns into dlopen() stubs, option -> package
+    _lazy_backends = {
+        "vaapi": "libva",
+        "vdpau": "libvdpau",
+        "jack": "jack2",
+        "pulse": "pulseaudio",
+        "pipewire": "libpipewire",
+        "sdl2": "sdl",
+        "libarchive": "libarchive",
+    }
+
+    # dlopen() stubs of a lazy backend library. The trampolines jump through $prefix_table, whose
+    # entries $prefix_resolve() fills on the first call of each function.
+    _lazy_stub_loader = """\
+/* dlopen() stubs of $soname, generated by the libmpv recipe */
+#include <dlfcn.h>
+#include <stdio.h>
+#include <stdlib.h>
+
+static const char *const names[] = {
+$names
+};
+
+__attribute__((visibility("hidden"))) void *${prefix}_table[$count];
+
+__attribute__((visibility("hidden"))) void *${prefix}_resolve(unsigned index)
+{
+    static void *handle;
+    void *library = __atomic_load_n(&handle, __ATOMIC_ACQUIRE);
+    if (!library) {
+        library = dlopen("$soname", RTLD_NOW | RTLD_GLOBAL);
+        if (!library) {
+            fprintf(stderr, "libmpv: cannot load $soname: %s\\n", dlerror());
+            abort();
+        }
+        __atomic_store_n(&handle, library, __ATOMIC_RELEASE);
+    }
+    void *address = dlsym(library, names[index]);
+    if (!address) {
+        fprintf(stderr, "libmpv: %s not found in $soname\\n", names[index]);
+        abort();
+    }
+    __atomic_store_n(&${prefix}_table[index], address, __ATOMIC_RELEASE);
+    return address;
+}
+"""
+
+    # Trampolines per Conan arch, as (one per function, slow path of the library). They are hidden
+    # so that libmpv.so does not export the functions of its backends. The slow path keeps every
+    # argument register, variadic calls included, while the function is resolved.
+    _lazy_trampolines = {
+        "x86_64": ("""
+    .section .text.{name},"ax",@progbits
+    .globl {name}
+    .hidden {name}
+    .type {name}, @function
+    .p2align 4
+{name}:
+    movq {prefix}_table+{offset}(%rip), %r11
+    testq %r11, %r11
+    jz 1f
+    jmp *%r11
+1:  movl ${index}, %r11d
+    jmp {prefix}_slow
+    .size {name}, .-{name}
+""", """
+    .hidden {prefix}_table
+    .hidden {prefix}_resolve
+    .text
+    .p2align 4
+    .type {prefix}_slow, @function
+{prefix}_slow:
+    pushq %rdi
+    pushq %rsi
+    pushq %rdx
+    pushq %rcx
+    pushq %r8
+    pushq %r9
+    pushq %rax
+    subq $128, %rsp
+    movdqu %xmm0, 0(%rsp)
+    movdqu %xmm1, 16(%rsp)
+    movdqu %xmm2, 32(%rsp)
+    movdqu %xmm3, 48(%rsp)
+    movdqu %xmm4, 64(%rsp)
+    movdqu %xmm5, 80(%rsp)
+    movdqu %xmm6, 96(%rsp)
+    movdqu %xmm7, 112(%rsp)
+    movl %r11d, %edi
+    call {prefix}_resolve
+    movq %rax, %r11
+    movdqu 0(%rsp), %xmm0
+    movdqu 16(%rsp), %xmm1
+    movdqu 32(%rsp), %xmm2
+    movdqu 48(%rsp), %xmm3
+    movdqu 64(%rsp), %xmm4
+    movdqu 80(%rsp), %xmm5
+    movdqu 96(%rsp), %xmm6
+    movdqu 112(%rsp), %xmm7
+    addq $128, %rsp
+    popq %rax
+    popq %r9
+    popq %r8
+    popq %rcx
+    popq %rdx
+    popq %rsi
+    popq %rdi
+    jmp *%r11
+    .size {prefix}_slow, .-{prefix}_slow
+    .section .note.GNU-stack,"",@progbits
+"""),
+        "armv8": ("""
+    .section .text.{name},"ax",%progbits
+    .globl {name}
+    .hidden {name}
+    .type {name}, %function
+    .p2align 2
+{name}:
+    adrp x16, {prefix}_table+{offset}
+    ldr x16, [x16, :lo12:{prefix}_table+{offset}]
+    cbz x16, 1f
+    br x16
+1:  mov x17, #{index}
+    b {prefix}_slow
+    .size {name}, .-{name}
+""", """
+    .hidden {prefix}_table
+    .hidden {prefix}_resolve
+    .text
+    .p2align 2
+    .type {prefix}_slow, %function
+{prefix}_slow:
+    stp x29, x30, [sp, #-224]!
+    mov x29, sp
+    stp x0, x1, [sp, #16]
+    stp x2, x3, [sp, #32]
+    stp x4, x5, [sp, #48]
+    stp x6, x7, [sp, #64]
+    str x8, [sp, #80]
+    stp q0, q1, [sp, #96]
+    stp q2, q3, [sp, #128]
+    stp q4, q5, [sp, #160]
+    stp q6, q7, [sp, #192]
+    mov w0, w17
+    bl {prefix}_resolve
+    mov x16, x0
+    ldp q6, q7, [sp, #192]
+    ldp q4, q5, [sp, #160]
+    ldp q2, q3, [sp, #128]
+    ldp q0, q1, [sp, #96]
+    ldr x8, [sp, #80]
+    ldp x6, x7, [sp, #64]
+    ldp x4, x5, [sp, #48]
+    ldp x2, x3, [sp, #32]
+    ldp x0, x1, [sp, #16]
+    ldp x29, x30, [sp], #224
+    br x16
+    .size {prefix}_slow, .-{prefix}_slow
+    .section .note.GNU-stack,"",%progbits
+"""),
     }
+
+    def _missing_option_requirements(self):
+        missing = {}
+        for option, needs in self._option_rules.items():
+            if self.options.get_safe(option):
+                disabled = [need for need in needs if not self.options.get_safe(need)]
+                if disabled:
+                    missing[option] = disabled
+        return missing
+
+    @property
+    def _linker_supports_icf(self):
+        # GNU ld (bfd) cannot fold identical code, the NDK links with lld by default
+        if self.settings.os == "Android" or self._linker:
+            return True
+        link_flags = self.conf.get("tools.build:sharedlinkflags", default=[], check_type=list)
+        return any(flag in ("-fuse-ld=lld", "-fuse-ld=gold", "-fuse-ld=mold") for flag in link_flags)
+
+    # Training input for bolt, rendered by libavfilter so no media files are needed
+    _bolt_workload = [
+        "av://lavfi:testsrc2=size=1920x1080:rate=30:duration=20,format=yuv420p",
+        "av://lavfi:sine=frequency=440:sample_rate=48000:duration=20",
+    ]
+
+    # Drives libmpv through its client API, the shared library has no executable to train with
+    _bolt_driver = """\
+import ctypes
+import sys
+
+mpv = ctypes.CDLL(sys.argv[1])
+mpv.mpv_create.restype = ctypes.c_void_p
+mpv.mpv_set_option_string.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+mpv.mpv_initialize.argtypes = [ctypes.c_void_p]
+mpv.mpv_command.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_char_p)]
+mpv.mpv_wait_event.argtypes = [ctypes.c_void_p, ctypes.c_double]
+mpv.mpv_wait_event.restype = ctypes.POINTER(ctypes.c_int)
+mpv.mpv_terminate_destroy.argtypes = [ctypes.c_void_p]
+
+ctx = mpv.mpv_create()
+# idle=no would shut the core down before the playlist below is filled, once quits after it ends
+for name, value in (("vo", "null"), ("ao", "null"), ("untimed", "yes"), ("idle", "once")):
+    mpv.mpv_set_option_string(ctx, name.encode(), value.encode())
+mpv.mpv_initialize(ctx)
+for url in sys.argv[2:]:
+    mpv.mpv_command(ctx, (ctypes.c_char_p * 4)(b"loadfile", url.encode(), b"append-play", None))
+while mpv.mpv_wait_event(ctx, -1)[0] != 1:  # MPV_EVENT_SHUTDOWN
+    pass
+mpv.mpv_terminate_destroy(ctx)
+"""
+
     def source(self):
         get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        meson_build = os.path.join(self.source_folder, "meson.build")
+        helpers = self.python_requires["mpv-helpers"].module
+        save(self, meson_build, helpers.add_dependency_overrides(load(self, meson_build)))
 
     def layout(self):
         basic_layout(self)
@@ -169,111 +511,140 @@ class LibmpvConan(ConanFile):
     def validate(self):
         if is_msvc(self):
             raise ConanInvalidConfiguration("MSVC is not supported")
+        conflicts = [f"{option} requires {', '.join(missing)}"
+                     for option, missing in self._missing_option_requirements().items()]
+        if conflicts:
+            raise ConanInvalidConfiguration("Inconsistent options: " + "; ".join(conflicts))
+        if self.options.lazy_backends:
+            if self.settings.os not in ("Linux", "FreeBSD"):
+                raise ConanInvalidConfiguration("lazy_backends is only supported for ELF platforms")
+            if str(self.settings.arch) not in self._lazy_trampolines:
+                raise ConanInvalidConfiguration(f"lazy_backends is not supported on {self.settings.arch}")
+        if self.options.get_safe("icf") and not self._linker_supports_icf:
+            raise ConanInvalidConfiguration("icf requires lld, gold or mold, set user.mpv:linker or add "
+                                            "-fuse-ld=<linker> to tools.build:sharedlinkflags")
+        if self.options.bolt:
+            if self.settings.os != "Linux" or self.settings.arch not in ("x86_64", "armv8"):
+                raise ConanInvalidConfiguration("bolt is only supported on Linux x86_64 and armv8")
+            if not self.options.shared and not self.options.cplayer:
+                raise ConanInvalidConfiguration("bolt needs shared=True or cplayer=True, "
+                                                "static libraries cannot be optimized")
+        if self.options.reproducible:
+            if self.options.build_date:
+                raise ConanInvalidConfiguration("reproducible cannot be combined with build_date=True")
+            if self.options.bolt:
+                raise ConanInvalidConfiguration("bolt layouts depend on the training run, "
+                                                "they cannot be reproducible")
+        if self.options.get_safe("split_dwarf") or self.options.get_safe("compress_debug_sections"):
+            if self.settings.build_type not in ("Debug", "RelWithDebInfo"):
+                raise ConanInvalidConfiguration("split_dwarf and compress_debug_sections need debug info, "
+                                                "use build_type=Debug or RelWithDebInfo")
+        if self.options.get_safe("bundle"):
+            if self.options.lazy_backends:
+                raise ConanInvalidConfiguration("bundle cannot be combined with lazy_backends")
+            if self.settings.os == "Windows":
+                raise ConanInvalidConfiguration("bundle is not supported on Windows")
+            if self.options.bundle == "object" and is_apple_os(self):
+                raise ConanInvalidConfiguration("bundle=object is only supported for ELF platforms")
+            shared = sorted(str(dependency.ref.name) for dependency in self.dependencies.host.values()
+                            if dependency.options.get_safe("shared"))
+            if shared:
+                raise ConanInvalidConfiguration(
+                    f"bundle requires static dependencies, these are shared: {', '.join(shared)}")
     
     def config_options(self):
-        if self.settings.os != "Windows":
-            for opt in ["uwp", "wasapi", "win32_threads", "win32_smtc", "d3d11",
-                       "d3d_hwaccel", "d3d9_hwaccel", "gl_dxinterop",
-                       "gl_dxinterop_d3d9", "direct3d", "gl_win32",
-                       "egl_angle", "egl_angle_lib", "egl_angle_win32",
-                       "vaapi_win32", "shaderc", "spirv_cross"]:
-                delattr(self.options, opt)
+        for option, feature in self._features.items():
+            if feature.platforms and self.settings.os not in feature.platforms:
+                delattr(self.options, option)
 
-        if self.settings.os != "Linux" and self.settings.os != "FreeBSD":
-            for opt in ["alsa", "jack", "oss_audio", "pipewire", "pulse", "sndio",
-                       "drm", "gbm", "egl_drm", "vaapi_drm", "vaapi_x11", "vaapi_wayland",
-                       "vdpau", "vdpau_gl_x11", "x11", "xv", "wayland",
-                       "dmabuf_wayland", "egl_wayland", "egl_x11", "gl_x11"]:
-                delattr(self.options, opt)
-        
-        if self.settings.os not in ("Linux", "FreeBSD", "Windows"):
-            for opt in ["vaapi"]:
+        if self.settings.os == "Windows" or is_apple_os(self):
+            # GNU ld style flags for ELF shared objects
+            for opt in ["hidden_visibility", "bsymbolic_functions", "as_needed",
+                        "gc_sections", "icf"]:
                 delattr(self.options, opt)
+            # PDB and dSYM keep the debug info apart already
+            del self.options.split_dwarf
+            del self.options.compress_debug_sections
 
-        if self.settings.os != "Android":
-            for opt in ["opensles", "egl_android", "android_media_ndk"]:
-                delattr(self.options, opt)
+    def configure(self):
+        if self.options.shared:
+            self.options.rm_safe("bundle")
+        else:
+            for opt in ["hidden_visibility", "bsymbolic_functions", "as_needed",
+                        "gc_sections", "icf"]:
+                self.options.rm_safe(opt)
 
-        if not is_apple_os(self):
-            # Remove common Apple-specific options
-            for opt in ["coreaudio", "avfoundation", "audiounit", "swift_build",
-                       "videotoolbox_gl", "videotoolbox_pl"]:
-                delattr(self.options, opt)
+        # Headless preset: client API only, no window system, GPU API or audio/video output.
+        # Applied before everything else so that it wins over the platform defaults below,
+        # while still letting explicitly set options through. libavdevice stays, it provides the
+        # lavfi input the bolt workload and the memory benchmark play.
+        if self.options.headless:
+            headless_defaults = [
+                "cplayer",
 
-        if self.settings.os != "iOS":
-            # Remove iOS-specific options
-            for opt in ["ios_gl"]:
-                delattr(self.options, opt)
-        if self.settings.os != "Macos":
-            # Remove macOS-specific options
-            for opt in ["cocoa", "gl_cocoa",
-                        "macos_cocoa_cb", "macos_media_player", "macos_touchbar",
-                        "macos_10_15_4_features", "macos_11_features",
-                        "macos_11_3_features", "macos_12_features"]:
-                delattr(self.options, opt)
+                # Audio outputs
+                "alsa", "audiounit", "avfoundation", "coreaudio", "jack", "openal",
+                "opensles", "oss_audio", "pipewire", "pulse", "sdl2_audio", "sndio", "wasapi",
 
-    def configure(self):
-        # Universal defaults first - these apply across all platforms unless overridden
-        universal_defaults = {
-            "cplayer": True,
-            "cplugins": True,
-
-            # Effects
-            "rubberband": False, # No conan package available
-            "lcms2": True,
-
-            # Formats
-            "dvbin": False,
-            "dvdnav": False,
-            "libbluray": False,
-            "cdda": False,
-            "vapoursynth": False,
-            "jpeg": True,
-            "sixel": False,
-            "zimg": True,
-            "zlib": True,
-            "libarchive": True,
-
-            # Scripting
-            "javascript": True,
-            "lua": "lua-5.2",
-            
-            # FFmpeg
-            "libavdevice": True,
-
-            # Text encoding
-            "iconv": True,
-            "uchardet": True,
-
-            # CPU features
-            "vector": True,
-
-            # SDL2
-            "sdl2": True,
-            "sdl2_gamepad": True,
-            "sdl2_video": True,
-            "sdl2_audio": True,
-
-            # Graphics APIs
-            "gl": True,
-            "egl": False,
-            "vulkan": True,
-
-            # Video outputs
-            "plain_gl": True,
-            "caca": False,
-
-             # Hardware specific acceleration
-            "cuda_hwaccel": False,
-            "cuda_interop": False,
-        }
+                # Video outputs, windowing and graphics APIs
+                "caca", "cocoa", "d3d11", "direct3d", "dmabuf_wayland", "drm", "egl",
+                "egl_android", "egl_angle", "egl_angle_lib", "egl_angle_win32", "egl_drm",
+                "egl_wayland", "egl_x11", "gbm", "gl", "gl_cocoa", "gl_dxinterop", "gl_win32",
+                "gl_x11", "plain_gl", "sdl2_video", "shaderc", "sixel", "spirv_cross", "vaapi",
+                "vaapi_drm", "vaapi_wayland", "vaapi_win32", "vaapi_x11", "vdpau", "vdpau_gl_x11",
+                "vulkan", "wayland", "x11", "xv",
+
+                # Hardware acceleration interop
+                "android_media_ndk", "cuda_hwaccel", "cuda_interop", "d3d_hwaccel", "d3d9_hwaccel",
+                "gl_dxinterop_d3d9", "ios_gl", "videotoolbox_gl", "videotoolbox_pl",
+
+                # Desktop integration
+                "sdl2", "sdl2_gamepad", "macos_cocoa_cb", "macos_media_player", "macos_touchbar",
+                "win32_smtc",
 
-        # First set universal defaults
-        for option, value in universal_defaults.items():
-            if self.options.get_safe(option) == None:
-                setattr(self.options, option, value)
+                # Documentation
+                "html_build", "manpage_build", "pdf_build",
+            ]
+            for option in headless_defaults:
+                if option in self.options and self.options.get_safe(option) == None:
+                    setattr(self.options, option, False)
 
-        # OS-specific defaults
+        # Software decode profile: the tuned ffmpeg has no hardware accelerators to drive
+        if self.options.software_decode:
+            for option in ["cuda_hwaccel", "cuda_interop", "d3d_hwaccel", "d3d9_hwaccel",
+                           "vaapi", "vdpau", "videotoolbox_gl", "videotoolbox_pl",
+                           "android_media_ndk"]:
+                if option in self.options and self.options.get_safe(option) == None:
+                    setattr(self.options, option, False)
+
+        # Reproducible builds must not embed the time they were made
+        if self.options.reproducible and self.options.get_safe("build_date") == None:
+            self.options.build_date = False
+
+        # Platform defaults, for the options nothing above or downstream has set
+        os_name = str(self.settings.os)
+        defaults = {}
+        for option, feature in self._features.items():
+            if not isinstance(feature.defaults, dict) or option not in self.options:
+                continue
+            value = feature.defaults.get(os_name, feature.defaults.get("*"))
+            if value is not None and self.options.get_safe(option) == None:
+                defaults[option] = value
+
+        # Defaulted options follow what they build on, e.g. x11=False also turns off egl_x11.
+        # Resolved before assigning anything, options cannot be changed once set.
+        changed = True
+        while changed:
+            changed = False
+            for option, value in defaults.items():
+                needs = self._option_rules.get(option, ())
+                if value and not all(defaults.get(need, self.options.get_safe(need)) for need in needs):
+                    defaults[option] = False
+                    changed = True
+        for option, value in defaults.items():
+            setattr(self.options, option, value)
+
+        # Windows ships one shader compiler backend, shaderc unless spirv_cross is asked for
         if self.settings.os == "Windows":
             if self.options.get_safe("shaderc") == None:
                 if self.options.get_safe("spirv_cross") in (False, None):
@@ -284,123 +655,91 @@ class LibmpvConan(ConanFile):
             else:
                 if self.options.get_safe("shaderc") == False:
                     self.options.shaderc = False
-                    self.options.spirv_cross = True
+                    # spirv_cross takes over, unless it was set as well, e.g. turned off by headless
+                    if self.options.get_safe("spirv_cross") == None:
+                        self.options.spirv_cross = True
                 else:
                     self.options.spirv_cross = False
 
-            windows_defaults = {
-                "uwp": False,
-                "wasapi": True,
-                "openal": True,
-                "win32_threads": True,
-                "win32_smtc": True,
-                "d3d11": True,
-                "d3d_hwaccel": True,
-                "d3d9_hwaccel": True,
-                "direct3d": True,
-                "gl_win32": True,
-                "gl_dxinterop": True,
-                "gl_dxinterop_d3d9": True,
-                "egl": False,
-                "egl_angle": False,
-                "egl_angle_lib": False,
-                "egl_angle_win32": False,
-                "vaapi_win32": False,
-            }
-            for option, value in windows_defaults.items():
-                if self.options.get_safe(option) == None:
-                    setattr(self.options, option, value)
-
-        elif self.settings.os == "Linux" or self.settings.os == "FreeBSD":
-            linux_defaults = {
-                "alsa": True,
-                "jack": True,
-                "oss_audio": True,
-                "pipewire": True,
-                "pulse": True,
-                "sndio": True,
-                "openal": True,
-                "drm": True,
-                "gbm": True,
-                "egl": True,
-                "egl_drm": True,
-                "vaapi": True,
-                "vaapi_x11": True,
-                "vaapi_wayland": True,
-                "vaapi_drm": True,
-                "vdpau": True,
-                "vdpau_gl_x11": True,
-                "x11": True,
-                "xv": True,
-                "wayland": True,
-                "dmabuf_wayland": True,
-                "egl": True,
-                "egl_wayland": True,
-                "egl_x11": True,
-                "gl_x11": True,
-            }
-            for option, value in linux_defaults.items():
-                if self.options.get_safe(option) == None:
-                    setattr(self.options, option, value)
-
-        elif self.settings.os == "Android":
-            android_defaults = {
-                "opensles": True,
-                "openal": False, # Doesn't work
-                "egl": True,
-                "egl_android": True,
-                "android_media_ndk": True,
-            }
-            for option, value in android_defaults.items():
-                if self.options.get_safe(option) == None:
-                    setattr(self.options, option, value)
-
-        elif is_apple_os(self):
-            apple_defaults = {
-                "audiounit": True,
-                "coreaudio": True,
-                "avfoundation": True,
-                "openal": True,
-                "videotoolbox_gl": True,
-                "videotoolbox_pl": True,
-            }
-            for option, value in apple_defaults.items():
-                if self.options.get_safe(option) == None:
-                    setattr(self.options, option, value)
-            
-            if self.settings.os == "iOS":
-                ios_defaults = {
-                    "swift_build": True,
-                    "ios_gl": True,
-                }
-                for option, value in ios_defaults.items():
-                    if self.options.get_safe(option) is None:
-                        setattr(self.options, option, value)
-
-            elif self.settings.os == "Macos":
-                macos_defaults = {
-                    "cocoa": True,
-                    "gl_cocoa": True,
-                    "macos_cocoa_cb": True,
-                    "macos_media_player": True,
-                    "macos_touchbar": True,
-                    "swift_build": True,
-                    "macos_10_15_4_features": True,
-                    "macos_11_features": True,
-                    "macos_11_3_features": True,
-                    "macos_12_features": True,
-                }
-            for option, value in macos_defaults.items():
-                if self.options.get_safe(option) is None:
-                    setattr(self.options, option, value)
-
     def build_requirements(self):
         self.tool_requires("meson/[>=1.5]")
         self.tool_requires("pkgconf/[>=2.0.0]")
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
+
+    def _lazy_traits(self, options=None):
+        # Lazily bound backends have to be shared libraries, and consumers must not link them
+        options = dict(options or {})
+        if not self.options.lazy_backends:
+            return {"options": options} if options else {}
+        options["shared"] = True
+        return {"options": options, "libs": False}
+
+    @property
+    def _ffmpeg_options(self):
+        options = {}
+        # ffmpeg only has its window system, audio server and VA-API/VDPAU options on Linux and
+        # FreeBSD, and Conan rejects options a required package does not have
+        linux = self.settings.os in ("Linux", "FreeBSD")
+        if self.options.headless:
+            # ffmpeg's own device, window system and audio server backends would still pull
+            # xorg, pulseaudio, libva and libvdpau into the graph
+            options.update({
+                "avdevice": bool(self.options.libavdevice),
+                "with_vulkan": False,
+            })
+            if linux:
+                options.update({
+                    "with_xcb": False,
+                    "with_xlib": False,
+                    "with_libalsa": False,
+                    "with_pulse": False,
+                    "with_vaapi": False,
+                    "with_vdpau": False,
+                })
+        if not self.options.software_decode:
+            return options
+        # Fastest CPU decoders and nothing mpv does not use for playback. Frame and slice
+        # threading are runtime settings (vd-lavc-threads), ffmpeg always builds them in.
+        options.update({
+            "with_asm": True,
+            "with_libdav1d": True,
+            "with_libaom": False,
+            "with_libvpx": False,
+            "with_openh264": False,
+            "with_libx264": False,
+            "with_libx265": False,
+            "with_libsvtav1": False,
+            "with_libmp3lame": False,
+            "with_libfdk_aac": False,
+            "with_vulkan": False,
+            "with_programs": False,
+            "disable_all_encoders": True,
+            "disable_all_muxers": True,
+            "disable_all_hardware_accelerators": True,
+        })
+        if linux:
+            options.update({"with_vaapi": False, "with_vdpau": False})
+        return options
+
+    @property
+    def _feature_requirement_options(self):
+        # Options forwarded to the packages of enabled features
+        return {
+            "libarchive": {"with_iconv": bool(self.options.iconv)}, # Workaround build issue
+        }
+
+    # Package for each value of the lua option
+    _lua_requirements = {
+        "lua-5.1": "lua/[>=5.1.0 <5.2.0]",
+        "lua-5.2": "lua/[>=5.2.0 <5.3.0]",
+        "luajit": "luajit/[>=2.1]",
+        "True": "lua/[>=5.1.0 <=5.2.0]",
+    }
 
     def requirements(self):
         # Core dependencies
-        self.requires("ffmpeg/[>=6.0.0]")
+        self.requires("ffmpeg/[>=6.0.0]", options=self._ffmpeg_options)
         self.requires("libass/[>=0.12.2]")
         self.requires("libplacebo/[>=6.338.2]", options={
             "dovi": True,
@@ -410,269 +749,316 @@ class LibmpvConan(ConanFile):
             "d3d11": self.options.get_safe("d3d11"),
         })
         
-        # Disc/Stream formats
-        if self.options.get_safe("cdda"):
-            self.requires("libcdio/[>=0.90]")
-            self.requires("libcdio_paranoia/[>=0.90]")
-        
-        if self.options.get_safe("dvdnav"):
-            self.requires("libdvdnav/[>=4.2.0]")
-            self.requires("libdvdread/[>=4.1.0]")
-
-        # Graphics APIs and hardware acceleration
-        if self.options.get_safe("vulkan"):
-                self.requires("vulkan-loader/[>=1.3.238]")
-        
-        if self.options.get_safe("shaderc"):
-            self.requires("shaderc/[>=2023.7]")
-        
-        if self.options.get_safe("spirv_cross"):
-            self.requires("spirv-cross/[>=1.3.268]")
-
-        # X11 and related
-        if self.options.get_safe("x11"):
-            self.requires("xorg/system")
-            
-        # OpenGL and EGL
-        if self.options.get_safe("gl"):
-            self.requires("opengl/system")
-                
-        if self.options.get_safe("egl"):
-            self.requires("egl/system")
-            
-        # Audio outputs
-        if self.options.get_safe("alsa"):
-            self.requires("libalsa/[>=1.0.18]")
-        
-        if self.options.get_safe("jack"):
-            self.requires("jack2/[>=0.0.1]")
-        
-        if self.options.get_safe("pulse"):
-            self.requires("pulseaudio/[>=1.0]")
-        
-        if self.options.get_safe("sndio"):
-            self.requires("sndio/[>=1.9.0]")
+        # Feature dependencies, several features share a package
+        required = set()
+        for option, feature in self._features.items():
+            if not feature.requires or not self.options.get_safe(option):
+                continue
+            options = self._feature_requirement_options.get(option)
+            if option in self._lazy_backends:
+                traits = self._lazy_traits(options)
+            else:
+                traits = {"options": options} if options else {}
+            for ref in feature.requires:
+                name = ref.split("/")[0]
+                if name not in required:
+                    required.add(name)
+                    self.requires(ref, **traits)
 
-        if self.options.get_safe("pipewire"):
-            self.requires("libpipewire/[>=0.3.57]")
-        if self.options.get_safe("openal"):
-            if self.settings.os == "Android":
-                self.requires("oboe/[>=1.5.0]")
-            self.requires("openal-soft/[>=1.22.0]")
+        lua = self.options.get_safe("lua")
+        if lua:
+            self.requires(self._lua_requirements[str(lua)])
 
-            
-        # Video outputs and hardware acceleration
-        if self.options.get_safe("vaapi"):
-            self.requires("libva/[>=1.1.0]")
-        
-        if self.options.get_safe("vdpau"):
-            self.requires("libvdpau/[>=0.2]")
-        
-        if self.options.get_safe("wayland"):
-            self.requires("wayland/[>=1.21.0]")
-            self.requires("wayland-protocols/[>=1.31]")
-            self.requires("xorg/[>=0.3.0]")
-        
-        if self.options.get_safe("drm"):
-            self.requires("libdrm/[>=2.4.105]")
-            self.requires("libdisplay-info/[>=0.1.1]")
-            
-        if self.options.get_safe("gbm"):
-            self.requires("opengl/system")
+        if self.options.get_safe("openal") and self.settings.os == "Android":
+            self.requires("oboe/[>=1.5.0]")
 
-        # SDL2
-        if self.options.get_safe("sdl2"):
-            self.requires("sdl/[>=2.0.14 <3]")
-        
-        # Additional features
-        if self.options.get_safe("javascript"):
-            self.requires("mujs/[>=1.0.0]")
-        
-        if self.options.get_safe("lcms2"):
-            self.requires("lcms/[>=2.6]")
-        
-        if self.options.get_safe("libarchive"):
-            self.requires("libarchive/[>=3.4.0]", 
-                          options={"with_iconv": bool(self.options.iconv)}) # Workaround build issue
-        
-        if self.options.get_safe("libbluray"):
-            self.requires("libbluray/[>=0.3.0]")
-        
-        if self.options.get_safe("lua") != None:
-            match self.options.lua:
-                case "lua-5.1":
-                    self.requires("lua/[>=5.1.0 <5.2.0]")
-                case "lua-5.2":
-                    self.requires("lua/[>=5.2.0 <5.3.0]")
-                case"luajit":
-                    self.requires("luajit")
-                case True:
-                    self.requires("lua/[>=5.1.0 <=5.2.0]")
-
-        # Misc libraries
-        if self.options.get_safe("iconv") and self.settings.os != "Linux" and self.settings.os != "Android":
+        if self.options.get_safe("iconv") and self.settings.os not in ("Linux", "Android"):
             self.requires("libiconv/[>=1.17]")
-            
-        if self.options.get_safe("jpeg"):
-            self.requires("libjpeg/[>=9]")
-            
-        if self.options.get_safe("zlib"):
-            self.requires("zlib/[>=1.2.11]")
-            
-        if self.options.get_safe("zimg"):
-            self.requires("zimg/[>=2.9]")
-            
-        if self.options.get_safe("uchardet"):
-            self.requires("uchardet/[>=0.0.1]")
-            
-        if self.options.get_safe("vapoursynth"):
-            self.requires("vapoursynth/[>=56]")
-            self.requires("vapoursynth-script/[>=56]")
 
-        # Additional outputs    
-        if self.options.get_safe("caca"):
-            self.requires("libcaca/[>=0.99]")
-            
-        if self.options.get_safe("sixel"):
-            self.requires("libsixel/[>=1.5]")
+        # The bundled archive already contains every dependency library, consumers only link it
+        if self.options.get_safe("bundle"):
+            for requirement in self.requires.values():
+                requirement.transitive_libs = False
 
     def generate(self):
         pc = PkgConfigDeps(self)
         pc.generate()
+        if self.options.lazy_backends:
+            # Before the machine file properties below are read from the .pc files
+            self._link_lazy_stubs()
         
         tc = MesonToolchain(self)
         # Hard coded options
         tc.project_options["libmpv"] = "true"
 
-        # Set boolean meson options based on conan options
-        boolean_options ={
-            "cplayer": "cplayer",
-            "tests": "tests",
-            "fuzzers": "fuzzers",
-            "build-date": "build_date",
-            "gpl": "gpl",
-            "ta-leak-report": "ta_leak_report", 
-        } 
-        tc.project_options.update({
-            option : ("true" if self.options.get_safe(value) else "false")
-                for option, value in boolean_options.items()
-        })
-        
-        # Features from meson.options
-        feature_options = {
-            "cdda": "cdda",
-            "cplugins": "cplugins",
-            "dvbin": "dvbin",
-            "dvdnav": "dvdnav",
-            "iconv": "iconv",
-            "javascript": "javascript",
-            "jpeg": "jpeg",
-            "lcms2": "lcms2",
-            "libarchive": "libarchive",
-            "libavdevice": "libavdevice",
-            "libbluray": "libbluray",
-            "lua": "lua",
-            "pthread-debug": "pthread_debug",
-            "rubberband": "rubberband",
-            "sdl2": "sdl2",
-            "sdl2-gamepad": "sdl2_gamepad",
-            "uchardet": "uchardet",
-            "uwp": "uwp",
-            "vapoursynth": "vapoursynth",
-            "vector": "vector",
-            "win32-threads": "win32_threads",
-            "zimg": "zimg",
-            "zlib": "zlib",
-
-            # Audio outputs
-            "alsa": "alsa",
-            "audiounit": "audiounit",
-            "coreaudio": "coreaudio",
-            "avfoundation": "avfoundation",
-            "jack": "jack",
-            "openal": "openal",
-            "opensles": "opensles",
-            "oss-audio": "oss_audio",
-            "pipewire": "pipewire",
-            "pulse": "pulse",
-            "sdl2-audio": "sdl2_audio",
-            "sndio": "sndio",
-            "wasapi": "wasapi",
-
-            # Video outputs and features
-            "caca": "caca",
-            "cocoa": "cocoa",
-            "d3d11": "d3d11",
-            "direct3d": "direct3d",
-            "dmabuf-wayland": "dmabuf_wayland",
-            "drm": "drm",
-            "egl": "egl",
-            "egl-android": "egl_android",
-            "egl-angle": "egl_angle",
-            "egl-angle-lib": "egl_angle_lib",
-            "egl-angle-win32": "egl_angle_win32",
-            "egl-drm": "egl_drm",
-            "egl-wayland": "egl_wayland",
-            "egl-x11": "egl_x11",
-            "gbm": "gbm",
-            "gl": "gl",
-            "gl-cocoa": "gl_cocoa",
-            "gl-dxinterop": "gl_dxinterop",
-            "gl-win32": "gl_win32",
-            "gl-x11": "gl_x11",
-            "plain-gl": "plain_gl",
-            "sdl2-video": "sdl2_video",
-            "shaderc": "shaderc",
-            "sixel": "sixel",
-            "spirv-cross": "spirv_cross",
-            "vaapi": "vaapi",
-            "vdpau": "vdpau",
-            "vdpau-gl-x11": "vdpau_gl_x11",
-            "vulkan": "vulkan",
-            "wayland": "wayland",
-            "x11": "x11",
-            "xv": "xv",
-
-            # Hardware acceleration 
-            "android-media-ndk": "android_media_ndk",
-            "cuda-hwaccel": "cuda_hwaccel",
-            "cuda-interop": "cuda_interop",
-            "d3d-hwaccel": "d3d_hwaccel",
-            "d3d9-hwaccel": "d3d9_hwaccel",
-            "gl-dxinterop-d3d9": "gl_dxinterop_d3d9",
-            "ios-gl": "ios_gl",
-            "videotoolbox-gl": "videotoolbox_gl",
-            "videotoolbox-pl": "videotoolbox_pl",
-
-            # macOS features
-            "macos-10-15-4-features": "macos_10_15_4_features",
-            "macos-11-features": "macos_11_features",
-            "macos-11-3-features": "macos_11_3_features",
-            "macos-12-features": "macos_12_features",
-            "macos-cocoa-cb": "macos_cocoa_cb",
-            "macos-media-player": "macos_media_player",
-            "macos-touchbar": "macos_touchbar",
-            "swift-build": "swift_build",
-
-            # Windows features
-            "win32-smtc": "win32_smtc",
-
-            # Documentation
-            "html-build": "html_build",
-            "manpage-build": "manpage_build",
-            "pdf-build": "pdf_build",
-        }
+        for option, feature in self._features.items():
+            if feature.meson is None:
+                continue
+            enabled = bool(self.options.get_safe(option))
+            if feature.kind == "boolean":
+                tc.project_options[feature.meson] = "true" if enabled else "false"
+            else:
+                tc.project_options[feature.meson] = "enabled" if enabled else "disabled"
 
-        tc.project_options.update({ 
-            option : ("enabled" if self.options.get_safe(value) else "disabled")
-                for option, value in feature_options.items() 
-        })   
+        # Shared library link tuning. The client API is marked with MPV_EXPORT in the public
+        # headers, so hiding everything else only drops internal symbols from the dynamic table.
+        if self.options.get_safe("hidden_visibility"):
+            tc.extra_cflags.append("-fvisibility=hidden")
+        if self.options.get_safe("bsymbolic_functions"):
+            tc.extra_ldflags.append("-Wl,-Bsymbolic-functions")
+        if self.options.get_safe("as_needed") is not None:
+            tc.project_options["b_asneeded"] = bool(self.options.as_needed)
+        if self.options.get_safe("gc_sections"):
+            tc.extra_cflags.extend(["-ffunction-sections", "-fdata-sections"])
+            tc.extra_ldflags.append("-Wl,--gc-sections")
+        if self.options.get_safe("icf"):
+            tc.extra_cflags.append("-ffunction-sections")
+            tc.extra_ldflags.append(f"-Wl,--icf={self.options.icf}")
+        if self.options.bolt:
+            # BOLT rewrites function layout and needs the relocations kept in the output
+            tc.extra_ldflags.append("-Wl,--emit-relocs")
+            if self.settings.compiler == "gcc":
+                tc.extra_cflags.append("-fno-reorder-blocks-and-partition")
+        if self.options.get_safe("split_dwarf"):
+            # Objects keep only a skeleton, the rest goes to a .dwo file per object
+            tc.extra_cflags.append("-gsplit-dwarf")
+            tc.extra_cxxflags.append("-gsplit-dwarf")
+        if self.options.get_safe("compress_debug_sections"):
+            # Given to as and ld directly, older compilers only know -gz=zlib
+            compress = f"--compress-debug-sections={self.options.compress_debug_sections}"
+            tc.extra_cflags.append(f"-Wa,{compress}")
+            tc.extra_cxxflags.append(f"-Wa,{compress}")
+            tc.extra_ldflags.append(f"-Wl,{compress}")
+        if self.options.reproducible:
+            tc.extra_cflags.extend(self._reproducible_flags)
+            tc.extra_cxxflags.extend(self._reproducible_flags)
+        if self._linker:
+            tc.c_ld = tc.cpp_ld = self._linker
+        if self.conf.get("user.mpv:meson_dependency_overrides", default=False, check_type=bool):
+            helpers = self.python_requires["mpv-helpers"].module
+            tc.properties.update(helpers.meson_dependency_properties(self.generators_folder))
         tc.generate()
 
+        if self.options.reproducible:
+            env = Environment()
+            env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                              check_type=int)))
+            if is_apple_os(self):
+                # Apple's ar and libtool store the current time in archive members otherwise
+                env.define("ZERO_AR_DATE", "1")
+            env.vars(self).save_script("conanbuild_reproducible")
+
+    @property
+    def _ar_flags(self):
+        # D zeroes the timestamps, uids and modes of archive members
+        return "rcsD" if self.options.reproducible else "rcs"
+
+    @property
+    def _build_tools(self):
+        """ C compiler and ar of the host, the ones MesonToolchain gives Meson, from
+        tools.build:compiler_executables or the build environment.
+        """
+        tc = MesonToolchain(self)
+        return shlex.split(tc.c), shlex.split(tc.ar or "ar")
+
+    @property
+    def _lazy_stubs_folder(self):
+        return os.path.join(self.build_folder, "lazy-stubs")
+
+    @property
+    def _lazy_stubs(self):
+        """ Library name -> shared library, for every library of the enabled lazy backends.
+        """
+        stubs = {}
+        for option, package in self._lazy_backends.items():
+            if not self.options.get_safe(option):
+                continue
+            cpp_info = self.dependencies[package].cpp_info.aggregated_components()
+            for lib in cpp_info.libs:
+                shared = next((os.path.join(libdir, f"lib{lib}.so") for libdir in cpp_info.libdirs
+                               if os.path.exists(os.path.join(libdir, f"lib{lib}.so"))), None)
+                if shared is not None:
+                    stubs[lib] = shared
+        return stubs
+
+    def _link_lazy_stubs(self):
+        """Point the pkg-config files of the lazy backends at the static stubs that
+        _build_lazy_stubs() creates, instead of the shared libraries."""
+        # Meson resolves every dependency through these files, so this is the single place
+        # where the hard link-time dependency gets replaced by the stub.
+        stubbed = list(self._lazy_stubs)
+        for pc_file in glob.glob(os.path.join(self.generators_folder, "*.pc")):
+            content = load(self, pc_file)
+            for lib in stubbed:
+                content = re.sub(rf"-l{re.escape(lib)}(?=\s|$)",
+                                 f"-L{self._lazy_stubs_folder} -l{lib}_stub -ldl", content)
+            save(self, pc_file, content)
+
+    @staticmethod
+    def _elf_functions(path):
+        """ (soname, names of the functions it exports) of a 64-bit little-endian ELF shared library.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:6] != b"\x7fELF\x02\x01":
+            raise ConanException(f"{path} is not a 64-bit little-endian ELF file")
+        section_offset, = struct.unpack_from("<Q", data, 0x28)
+        section_size, section_count = struct.unpack_from("<HH", data, 0x3a)
+        # (type, offset, size, link, entry size) of every section
+        sections = [struct.unpack_from("<4xI16xQQI12xQ", data, section_offset + index * section_size)
+                    for index in range(section_count)]
+
+        def read_string(table, offset):
+            start = sections[table][1] + offset
+            return data[start:data.index(b"\0", start)].decode()
+
+        soname, functions = os.path.basename(path), set()
+        for kind, offset, size, link, entry_size in sections:
+            if kind == 11:  # SHT_DYNSYM, the first entry is the undefined symbol
+                for entry in range(offset + entry_size, offset + size, entry_size):
+                    name, info, other, section = struct.unpack_from("<IBBH", data, entry)
+                    # Defined global or weak functions with default visibility
+                    if section != 0 and info & 0xf in (2, 10) and info >> 4 in (1, 2) and other & 3 == 0:
+                        functions.add(read_string(link, name))
+            elif kind == 6:  # SHT_DYNAMIC
+                for entry in range(offset, offset + size, entry_size):
+                    tag, value = struct.unpack_from("<qQ", data, entry)
+                    if tag == 14:  # DT_SONAME
+                        soname = read_string(link, value)
+        # Called by the dynamic loader, they must not be replaced in libmpv
+        return soname, sorted(functions - {"_init", "_fini"})
+
+    def _lazy_stub_sources(self, lib, shared):
+        """ (assembly, C) sources of the dlopen() stubs of the shared library 'shared'.
+        """
+        soname, functions = self._elf_functions(shared)
+        prefix = "mpv_lazy_" + re.sub(r"\W", "_", lib)
+        trampoline, slow_path = self._lazy_trampolines[str(self.settings.arch)]
+        assembly = "".join(trampoline.format(name=name, prefix=prefix, index=index, offset=8 * index)
+                           for index, name in enumerate(functions))
+        loader = string.Template(self._lazy_stub_loader).substitute(
+            soname=soname, prefix=prefix, count=max(len(functions), 1),
+            names="\n".join(f'    "{name}",' for name in functions))
+        return assembly + slow_path.format(prefix=prefix), loader
+
+    def _build_lazy_stubs(self):
+        """Generate dlopen() trampolines for every library of the enabled lazy backends, built
+        into lib<name>_stub.a with the compiler and ar of the host."""
+        cc, ar = self._build_tools
+        cflags = ["-fPIC", "-O2"] + (self._reproducible_flags if self.options.reproducible else [])
+        for lib, shared in self._lazy_stubs.items():
+            stem = os.path.join(self._lazy_stubs_folder, f"lib{lib}_stub")
+            assembly, loader = self._lazy_stub_sources(lib, shared)
+            save(self, f"{stem}.S", assembly)
+            save(self, f"{stem}.c", loader)
+            self.run(shlex.join([*cc, *cflags, "-c", f"{stem}.S", "-o", f"{stem}.tramp.o"]))
+            self.run(shlex.join([*cc, *cflags, "-c", f"{stem}.c", "-o", f"{stem}.init.o"]))
+            self.run(shlex.join([*ar, self._ar_flags, f"{stem}.a", f"{stem}.tramp.o", f"{stem}.init.o"]))
+
+    @property
+    def _bundle_manifest(self):
+        return os.path.join(self.package_folder, "lib", "mpv-bundle.json")
+
+    def _bundle_static_deps(self):
+        """Merge libmpv.a with the static libraries of all host dependencies, either as a plain
+        archive or as a single prelinked object with unreferenced sections dropped."""
+        libdir = os.path.join(self.package_folder, "lib")
+        libmpv = os.path.join(libdir, "libmpv.a")
+        archives, system_libs, frameworks = [libmpv], [], []
+        for dependency in self.dependencies.host.values():
+            cpp_info = dependency.cpp_info.aggregated_components()
+            for lib in cpp_info.libs:
+                archive = next((os.path.join(path, f"lib{lib}.a") for path in cpp_info.libdirs
+                                if os.path.exists(os.path.join(path, f"lib{lib}.a"))), None)
+                if archive is not None and archive not in archives:
+                    archives.append(archive)
+            system_libs.extend(lib for lib in cpp_info.system_libs if lib not in system_libs)
+            frameworks.extend(fw for fw in cpp_info.frameworks if fw not in frameworks)
+
+        cc, ar = self._build_tools
+        merged = os.path.join(self.build_folder, "libmpv-bundle.a")
+        if self.options.bundle == "object":
+            # The client API is the only root, everything it does not reach is garbage collected
+            api = set()
+            for header in glob.glob(os.path.join(self.package_folder, "include", "mpv", "*.h")):
+                api.update(re.findall(r"^MPV_EXPORT\b[^;(]*?\b(mpv_\w+)\s*\(", load(self, header),
+                                      re.MULTILINE))
+            prelinked = os.path.join(self.build_folder, "mpv-bundle.o")
+            response_file = os.path.join(self.build_folder, "mpv-bundle.rsp")
+            save(self, response_file, "\n".join(
+                ["-r", "-nostdlib", "-Wl,--gc-sections"]
+                + [f"-Wl,--undefined={symbol}" for symbol in sorted(api)]
+                + ["-Wl,--whole-archive"] + [f'"{archive}"' for archive in archives]
+                + ["-Wl,--no-whole-archive", "-o", f'"{prelinked}"']))
+            self.run(shlex.join([*cc, f"@{response_file}"]))
+            self.run(shlex.join([*ar, self._ar_flags, merged, prelinked]))
+        elif is_apple_os(self):
+            self.run(shlex.join(["libtool", "-static", "-o", merged, *archives]))
+        else:
+            mri_script = os.path.join(self.build_folder, "mpv-bundle.mri")
+            save(self, mri_script, "\n".join([f"CREATE {merged}"]
+                                              + [f"ADDLIB {archive}" for archive in archives]
+                                              + ["SAVE", "END", ""]))
+            # POSIX shell redirection, bundle is rejected on Windows
+            self.run(f"{shlex.join([*ar, '-M'])} < {shlex.quote(mri_script)}")
+
+        shutil.move(merged, libmpv)
+        save(self, self._bundle_manifest, json.dumps({
+            "archives": [os.path.basename(archive) for archive in archives[1:]],
+            "system_libs": system_libs,
+            "frameworks": frameworks,
+        }, indent=2))
+
+    def _bolt(self):
+        """Optimize the code layout of libmpv.so and the mpv executable with llvm-bolt, from a
+        profile collected by running instrumented copies of them on a playback workload."""
+        llvm_bolt = self.conf.get("user.libmpv:llvm_bolt", default="llvm-bolt")
+        merge_fdata = os.path.join(os.path.dirname(llvm_bolt), "merge-fdata")
+        workload = self.conf.get("user.libmpv:bolt_workload", default=self._bolt_workload,
+                                 check_type=list)
+        profile_folder = os.path.join(self.build_folder, "bolt")
+        # The instrumented binaries write their profiles there, they do not create it
+        os.makedirs(profile_folder, exist_ok=True)
+        inputs = " ".join(f'"{url}"' for url in workload)
+
+        targets = {}
+        if self.options.shared:
+            libmpv = next(path for path in glob.glob(os.path.join(self.build_folder, "libmpv.so*"))
+                          if not os.path.islink(path))
+            driver = os.path.join(profile_folder, "driver.py")
+            save(self, driver, self._bolt_driver)
+            targets[libmpv] = f'"{sys.executable}" "{driver}" "{libmpv}" {inputs}'
+        if self.options.cplayer:
+            player = os.path.join(self.build_folder, "mpv")
+            targets[player] = f'"{player}" --no-config --vo=null --ao=null --untimed {inputs}'
+
+        for binary, workload_command in targets.items():
+            original = f"{binary}.orig"
+            profile = os.path.join(profile_folder, os.path.basename(binary))
+            shutil.copy2(binary, original)
+            self.run(f'"{llvm_bolt}" "{original}" -o "{binary}" -instrument '
+                     f'-instrumentation-file="{profile}" -instrumentation-file-append-pid')
+            self.run(workload_command, env="conanrun")
+            profiles = " ".join(f'"{path}"' for path in sorted(glob.glob(f"{profile}.*")))
+            if not profiles:
+                raise ConanException(f"The bolt workload of {os.path.basename(binary)} wrote no profile "
+                                     f"to {profile_folder}, check user.libmpv:bolt_workload")
+            self.run(f'"{merge_fdata}" {profiles} > "{profile}.fdata"')
+            self.run(f'"{llvm_bolt}" "{original}" -o "{binary}" -data="{profile}.fdata" '
+                     f'-reorder-blocks=ext-tsp -reorder-functions=hfsort -split-functions '
+                     f'-split-all-cold -icf=1 -use-gnu-stack -dyno-stats')
+
     def build(self):
+        if self._jobserver:
+            # No -j, so that ninja takes its job tokens from the pool
+            self.conf.define("tools.build:jobs", 0)
+        if self.options.lazy_backends:
+            self._build_lazy_stubs()
         meson = Meson(self)
         meson.configure()
         meson.build()
+        if self.options.bolt:
+            self._bolt()
 
     def package(self):
         meson = Meson(self)
@@ -685,6 +1071,13 @@ class LibmpvConan(ConanFile):
         # Remove pkg-config files if static
         if not self.options.shared:
             rmdir(self, os.path.join(self.package_folder, "lib", "pkgconfig"))
+            # A static libmpv still needs the stubs at the consumer's link step
+            if self.options.lazy_backends:
+                copy(self, "*_stub.a", src=self._lazy_stubs_folder, dst=os.path.join(self.package_folder, "lib"))
+            if self.options.bundle:
+                self._bundle_static_deps()
+        if self.options.get_safe("split_dwarf"):
+            self._package_dwp()
                  
         if is_apple_os(self) and self.settings.os != "iOS":
             if self.options.swift:
@@ -695,6 +1088,15 @@ class LibmpvConan(ConanFile):
     def package_info(self):
         self.cpp_info.set_property("pkg_config_name", "mpv")
         self.cpp_info.libs = ["mpv"]
+        if self.options.lazy_backends and not self.options.shared:
+            # Lazy backends are required with libs=False, only their stubs are linked
+            stubs = glob.glob(os.path.join(self.package_folder, "lib", "lib*_stub.a"))
+            self.cpp_info.libs.extend(sorted(os.path.basename(stub)[3:-2] for stub in stubs))
+        if self.options.get_safe("bundle"):
+            # Dependency libraries are not propagated, only what they need from the system is
+            manifest = json.loads(load(self, self._bundle_manifest))
+            self.cpp_info.system_libs.extend(manifest["system_libs"])
+            self.cpp_info.frameworks.extend(manifest["frameworks"])
             
         if self.settings.os in ("Linux", "FreeBSD"):
             self.cpp_info.system_libs.extend(["m", "dl", "pthread"])
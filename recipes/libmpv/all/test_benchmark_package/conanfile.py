@@ -0,0 +1,64 @@
+from conan import ConanFile
+from conan.tools.build import can_run
+from conan.tools.cmake import cmake_layout, CMake
+from io import StringIO
+import json
+import os
+
+
+class TestBenchmarkPackageConan(ConanFile):
+    settings = "os", "arch", "compiler", "build_type"
+    generators = "CMakeDeps", "CMakeToolchain", "VirtualRunEnv"
+    test_type = "explicit"
+
+    # libmpv options whose effect on the per-instance memory is compared
+    _compared_options = ("shared", "ta_leak_report")
+
+    def requirements(self):
+        self.requires(self.tested_reference_str)
+
+    def layout(self):
+        cmake_layout(self)
+
+    def build(self):
+        cmake = CMake(self)
+        cmake.configure()
+        cmake.build()
+
+    def _compare(self, results_file, option_set, result):
+        """ Adds the result of this option set to the ones of earlier runs in 'results_file' and
+        prints all of them side by side.
+        """
+        results = {}
+        if os.path.isfile(results_file):
+            with open(results_file) as f:
+                results = json.load(f)
+        results[option_set] = result
+        with open(results_file, "w") as f:
+            json.dump(results, f, indent=2)
+        self.output.info(f"{'option set':<40} {'first KiB':>10} {'further KiB':>12} "
+                         f"{'private KiB':>12} {'heap KiB':>10}")
+        for name, recorded in sorted(results.items()):
+            self.output.info(f"{name:<40} {recorded['first']['rss_kib']:>10.1f} "
+                             f"{recorded['further']['rss_kib']:>12.1f} "
+                             f"{recorded['further']['private_kib']:>12.1f} "
+                             f"{recorded['further']['heap_kib']:>10.1f}")
+
+    def test(self):
+        if can_run(self):
+            libmpv = self.dependencies["libmpv"]
+            option_set = ", ".join(f"{option}={libmpv.options.get_safe(option)}"
+                                   for option in self._compared_options)
+            self.output.info(f"libmpv {option_set}")
+            instances = self.conf.get("user.libmpv:benchmark_instances", default=16, check_type=int)
+            cache_mib = self.conf.get("user.libmpv:benchmark_cache_mib", default=32, check_type=int)
+            bin_path = os.path.join(self.cpp.build.bindir, "test_benchmark_package")
+            output = StringIO()
+            self.run(f"{bin_path} {instances} {cache_mib}", env="conanrun", stdout=output)
+            self.output.info(output.getvalue())
+            # Every option set is one 'conan test' run, pointing them at the same file compares them,
+            # e.g. with -o libmpv/*:shared=True and -o libmpv/*:ta_leak_report=True
+            results_file = self.conf.get("user.libmpv:benchmark_results")
+            if results_file:
+                line = next(line for line in output.getvalue().splitlines() if line.startswith("json: "))
+                self._compare(results_file, option_set, json.loads(line[len("json: "):]))
@@ -0,0 +1,219 @@
+// Measures the memory cost of packing many players into one process: RSS per
+// mpv_handle with a filled demuxer cache and vo=null, split into shared and
+// private pages, plus the heap in use and the peak RSS. Players are paused so
+// that every sample is taken once all demuxer caches stopped growing.
+//
+// Usage: test_benchmark_package [instances] [demuxer cache MiB] [url]
+// The last line of the output repeats the results as JSON.
+
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <fstream>
+#include <sstream>
+#include <string>
+#include <thread>
+#include <vector>
+
+#if defined(__GLIBC__)
+#include <malloc.h>
+#endif
+
+#include <mpv/client.h>
+
+namespace {
+
+struct Memory {
+    long rss_kib = 0;
+    long shared_kib = 0;
+    long private_kib = 0;
+    long peak_rss_kib = 0;
+    long heap_kib = 0;
+};
+
+long field_kib(const std::string& path, const char* name) {
+    std::ifstream file(path);
+    std::string line;
+    const std::string prefix = std::string(name) + ":";
+    while (std::getline(file, line)) {
+        if (line.compare(0, prefix.size(), prefix) == 0)
+            return std::strtol(line.c_str() + prefix.size(), nullptr, 10);
+    }
+    return -1;
+}
+
+Memory sample() {
+    Memory memory;
+    // smaps_rollup needs Linux 4.14, everything reads as -1 elsewhere
+    const std::string smaps = "/proc/self/smaps_rollup";
+    memory.rss_kib = field_kib(smaps, "Rss");
+    memory.shared_kib = field_kib(smaps, "Shared_Clean") + field_kib(smaps, "Shared_Dirty");
+    memory.private_kib = field_kib(smaps, "Private_Clean") + field_kib(smaps, "Private_Dirty");
+    memory.peak_rss_kib = field_kib("/proc/self/status", "VmHWM");
+#if defined(__GLIBC__) && (__GLIBC__ > 2 || (__GLIBC__ == 2 && __GLIBC_MINOR__ >= 33))
+    memory.heap_kib = static_cast<long>(mallinfo2().uordblks / 1024);
+#else
+    memory.heap_kib = -1;
+#endif
+    return memory;
+}
+
+void print(const char* label, const Memory& memory, int divisor) {
+    std::printf("%-22s rss %9.1f KiB  shared %9.1f KiB  private %9.1f KiB  heap %9.1f KiB\n", label,
+                double(memory.rss_kib) / divisor, double(memory.shared_kib) / divisor,
+                double(memory.private_kib) / divisor, double(memory.heap_kib) / divisor);
+}
+
+void print_json(const Memory& memory, int divisor) {
+    std::printf("{\"rss_kib\": %.1f, \"shared_kib\": %.1f, \"private_kib\": %.1f, \"heap_kib\": %.1f}",
+                double(memory.rss_kib) / divisor, double(memory.shared_kib) / divisor,
+                double(memory.private_kib) / divisor, double(memory.heap_kib) / divisor);
+}
+
+Memory delta(const Memory& after, const Memory& before) {
+    Memory result;
+    result.rss_kib = after.rss_kib - before.rss_kib;
+    result.shared_kib = after.shared_kib - before.shared_kib;
+    result.private_kib = after.private_kib - before.private_kib;
+    result.heap_kib = after.heap_kib - before.heap_kib;
+    return result;
+}
+
+// Waits until the file is playing (or failed to load) so the demuxer cache is active.
+bool wait_loaded(mpv_handle* ctx) {
+    for (;;) {
+        mpv_event* event = mpv_wait_event(ctx, 10.0);
+        if (event->event_id == MPV_EVENT_FILE_LOADED)
+            return true;
+        if (event->event_id == MPV_EVENT_END_FILE || event->event_id == MPV_EVENT_NONE ||
+            event->event_id == MPV_EVENT_SHUTDOWN)
+            return false;
+    }
+}
+
+// Bytes read ahead by the demuxer and whether it reached the end, -1 if unknown.
+long long cache_bytes_ahead(mpv_handle* ctx, bool* eof) {
+    mpv_node node;
+    if (mpv_get_property(ctx, "demuxer-cache-state", MPV_FORMAT_NODE, &node) < 0)
+        return -1;
+    long long bytes = -1;
+    if (node.format == MPV_FORMAT_NODE_MAP) {
+        for (int i = 0; i < node.u.list->num; ++i) {
+            const std::string key = node.u.list->keys[i];
+            const mpv_node& value = node.u.list->values[i];
+            if (key == "fw-bytes" && value.format == MPV_FORMAT_INT64)
+                bytes = value.u.int64;
+            else if (key == "eof" && value.format == MPV_FORMAT_FLAG)
+                *eof = value.u.flag != 0;
+        }
+    }
+    mpv_free_node_contents(&node);
+    return bytes;
+}
+
+// A paused player's demuxer reads ahead until the cache limit and then stops, which is
+// when its read-ahead stays the same for half a second.
+bool wait_cache_filled(mpv_handle* ctx) {
+    long long last = -1;
+    int unchanged = 0;
+    for (int poll = 0; poll < 600; ++poll) {
+        bool eof = false;
+        const long long bytes = cache_bytes_ahead(ctx, &eof);
+        if (eof)
+            return true;
+        unchanged = bytes > 0 && bytes == last ? unchanged + 1 : 0;
+        if (unchanged == 5)
+            return true;
+        last = bytes;
+        std::this_thread::sleep_for(std::chrono::milliseconds(100));
+    }
+    return false;
+}
+
+mpv_handle* create_player(const std::string& url, const std::string& cache_bytes) {
+    mpv_handle* ctx = mpv_create();
+    if (!ctx)
+        return nullptr;
+    mpv_set_option_string(ctx, "config", "no");
+    mpv_set_option_string(ctx, "vo", "null");
+    mpv_set_option_string(ctx, "ao", "null");
+    mpv_set_option_string(ctx, "pause", "yes");
+    mpv_set_option_string(ctx, "cache", "yes");
+    mpv_set_option_string(ctx, "demuxer-max-bytes", cache_bytes.c_str());
+    mpv_set_option_string(ctx, "demuxer-max-back-bytes", "0");
+    if (mpv_initialize(ctx) < 0) {
+        mpv_terminate_destroy(ctx);
+        return nullptr;
+    }
+    const char* command[] = {"loadfile", url.c_str(), nullptr};
+    if (mpv_command(ctx, command) < 0 || !wait_loaded(ctx)) {
+        mpv_terminate_destroy(ctx);
+        return nullptr;
+    }
+    return ctx;
+}
+
+}  // namespace
+
+int main(int argc, char** argv) {
+    const int instances = argc > 1 ? std::atoi(argv[1]) : 16;
+    const long cache_mib = argc > 2 ? std::atol(argv[2]) : 32;
+    // Rendered by libavfilter, endless so the demuxer cache always fills up to its limit
+    const std::string url = argc > 3 ? argv[3] : "av://lavfi:testsrc2=size=1280x720:rate=30";
+    const std::string cache_bytes = std::to_string(cache_mib) + "MiB";
+
+    const Memory baseline = sample();
+    std::vector<mpv_handle*> players;
+    Memory first;
+    for (int i = 0; i < instances; ++i) {
+        mpv_handle* ctx = create_player(url, cache_bytes);
+        if (!ctx) {
+            std::fprintf(stderr, "failed to create player %d for %s\n", i, url.c_str());
+            break;
+        }
+        players.push_back(ctx);
+        if (i == 0) {
+            if (!wait_cache_filled(ctx)) {
+                std::fprintf(stderr, "demuxer cache of the first player did not fill up\n");
+                return 1;
+            }
+            first = delta(sample(), baseline);
+        }
+    }
+    if (players.empty())
+        return 1;
+    for (mpv_handle* ctx : players) {
+        if (!wait_cache_filled(ctx)) {
+            std::fprintf(stderr, "demuxer cache of a player did not fill up\n");
+            return 1;
+        }
+    }
+    const Memory total = sample();
+    const int count = static_cast<int>(players.size());
+
+    std::printf("instances: %d, demuxer cache: %ld MiB, source: %s\n", count, cache_mib, url.c_str());
+    print("baseline", baseline, 1);
+    print("first instance", first, 1);
+    // Both samples were taken with full caches, so the difference is the cost of the others
+    Memory rest = delta(total, baseline);
+    rest.rss_kib -= first.rss_kib;
+    rest.shared_kib -= first.shared_kib;
+    rest.private_kib -= first.private_kib;
+    rest.heap_kib -= first.heap_kib;
+    if (count > 1)
+        print("each further instance", rest, count - 1);
+    print("per instance (average)", delta(total, baseline), count);
+    std::printf("peak rss: %ld KiB\n", total.peak_rss_kib);
+
+    std::printf("json: {\"instances\": %d, \"cache_mib\": %ld, \"first\": ", count, cache_mib);
+    print_json(first, 1);
+    std::printf(", \"further\": ");
+    print_json(rest, count > 1 ? count - 1 : 1);
+    std::printf(", \"average\": ");
+    print_json(delta(total, baseline), count);
+    std::printf(", \"peak_rss_kib\": %ld}\n", total.peak_rss_kib);
+
+    for (mpv_handle* ctx : players)
+        mpv_terminate_destroy(ctx);
+    return 0;
+}
@@ -0,0 +1,90 @@
+from conan import ConanFile
+from conan.errors import ConanException
+from conan.tools.build import can_run
+from conan.tools.cmake import cmake_layout, CMake
+from conan.tools.files import load
+from io import StringIO
+import glob
+import os
+import re
+import shutil
+import subprocess
+
+
+class TestPackageConan(ConanFile):
+    settings = "os", "arch", "compiler", "build_type"
+    generators = "CMakeDeps", "CMakeToolchain", "VirtualRunEnv"
+    test_type = "explicit"
+
+    # Defined by the linker in every shared object, not part of any API
+    _linker_symbols = {"_init", "_fini", "__bss_start", "_edata", "_end"}
+
+    def requirements(self):
+        self.requires(self.tested_reference_str)
+
+    def layout(self):
+        cmake_layout(self)
+
+    def build(self):
+        cmake = CMake(self)
+        cmake.configure()
+        cmake.build()
+
+    def _public_api(self, libmpv):
+        symbols = set()
+        for include_dir in libmpv.cpp_info.includedirs:
+            for header in glob.glob(os.path.join(include_dir, "mpv", "*.h")):
+                symbols.update(re.findall(r"^MPV_EXPORT\b[^;(]*?\b(mpv_\w+)\s*\(",
+                                          load(self, header), re.MULTILINE))
+        return symbols
+
+    def _dynamic_symbols(self, library, kind):
+        output = subprocess.run(["nm", "-D", kind, "--format=posix", library],
+                                check=True, capture_output=True, text=True).stdout
+        return {line.split()[0].split("@")[0] for line in output.splitlines() if line.strip()}
+
+    def _needed(self, library):
+        """ DT_NEEDED entries of 'library', soname -> path the dynamic loader finds, None if it
+        finds none.
+        """
+        dynamic = subprocess.run(["readelf", "-d", library], check=True, capture_output=True, text=True).stdout
+        output = StringIO()
+        self.run(f'ldd "{library}"', stdout=output, env="conanrun")
+        resolved = dict(re.findall(r"^\s*(\S+) => (/\S+)", output.getvalue(), re.MULTILINE))
+        return {soname: resolved.get(soname) for soname in re.findall(r"\(NEEDED\).*\[(.+)\]", dynamic)}
+
+    def _check_shared_library(self):
+        libmpv = self.dependencies["libmpv"]
+        if not libmpv.options.shared or self.settings.os not in ("Linux", "FreeBSD"):
+            return
+        missing_tools = [tool for tool in ("nm", "readelf", "ldd") if shutil.which(tool) is None]
+        if missing_tools:
+            raise ConanException(f"{', '.join(missing_tools)} not found, they are needed to check libmpv.so")
+        library = next(path for libdir in libmpv.cpp_info.libdirs
+                       for path in glob.glob(os.path.join(libdir, "libmpv.so*")))
+
+        public = self._public_api(libmpv)
+        exported = self._dynamic_symbols(library, "--defined-only") - self._linker_symbols
+        if exported != public:
+            raise ConanException(
+                f"libmpv exports do not match the client API, "
+                f"missing: {sorted(public - exported)}, extra: {sorted(exported - public)}")
+        self.output.info(f"libmpv exports exactly the {len(public)} client API symbols")
+
+        needed = self._needed(library)
+        missing = sorted(soname for soname, path in needed.items() if path is None)
+        if missing:
+            raise ConanException(f"libmpv needs libraries the loader does not find: {missing}")
+        if libmpv.options.as_needed:
+            undefined = self._dynamic_symbols(library, "--undefined-only")
+            unused = sorted(soname for soname, path in needed.items()
+                            if not undefined & self._dynamic_symbols(path, "--defined-only"))
+            if unused:
+                raise ConanException(f"libmpv was linked --as-needed but needs unused libraries: {unused}")
+        self.output.info(f"libmpv needs {len(needed)} libraries: {', '.join(sorted(needed))}")
+
+    def test(self):
+        if can_run(self):
+            bin_path = os.path.join(self.cpp.build.bindir, "test_package")
+            self.run(bin_path, env="conanrun")
+            self._check_shared_library()
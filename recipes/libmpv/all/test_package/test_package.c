@@ -0,0 +1,19 @@
+#include <stdio.h>
+
+#include <mpv/client.h>
+
+int main(void) {
+    unsigned long version = mpv_client_api_version();
+    printf("mpv client API %lu.%lu\n", version >> 16, version & 0xffff);
+
+    mpv_handle *ctx = mpv_create();
+    if (!ctx)
+        return 1;
+    mpv_set_option_string(ctx, "vo", "null");
+    mpv_set_option_string(ctx, "ao", "null");
+    int status = mpv_initialize(ctx);
+    if (status < 0)
+        fprintf(stderr, "mpv_initialize: %s\n", mpv_error_string(status));
+    mpv_terminate_destroy(ctx);
+    return status < 0;
+}
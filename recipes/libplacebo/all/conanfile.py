@@ -2,16 +2,20 @@ from conan import ConanFile
 from conan.tools.build import check_min_cppstd
 from conan.tools.layout import basic_layout
 from conan.tools.meson import Meson, MesonToolchain
-from conan.tools.files import copy, get, rmdir
+from conan.tools.files import copy, get, load, rmdir, save
 from conan.tools.gnu import PkgConfigDeps
 from conan.tools.cmake import CMakeToolchain
+from conan.tools.env import Environment
+from conan.tools.apple import is_apple_os
+from conan.tools.microsoft import is_msvc
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.scm import Git
 
 import os
 from pathlib import Path
 
-required_conan_version = ">=2.0.0"
+required_conan_version = ">=2.1.0"
+
 
 class LibplaceboConan(ConanFile):
     name = "libplacebo"
@@ -21,7 +25,10 @@ class LibplaceboConan(ConanFile):
     topics = ("gpu", "rendering", "video", "image")
     url = "https://github.com/conan-io/conan-center-index"
     package_type = "library"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
+    no_copy_source = True
     options = {
         "shared": [True, False],
         "fPIC": [True, False],
@@ -38,16 +45,25 @@ class LibplaceboConan(ConanFile):
         "unwind": [True, False],
         "xxhash": [True, False],
         "debug_abort": [True, False],
+        "reproducible": [True, False],
+        "split_dwarf": [True, False],
+        "compress_debug_sections": [None, "zlib", "zstd"],
     }
     default_options = {
         "shared": False,
         "fPIC": True,
         "debug_abort": False,
+        "reproducible": False,
+        "split_dwarf": False,
+        "compress_debug_sections": None,
     }
     
     def source(self):
         git = Git(self)
         git.clone(url=self.conan_data["sources"][self.version]["url"], target=self.source_folder, args=["--recursive", "--depth=1", "--branch", f"v{self.version}"])
+        meson_build = os.path.join(self.source_folder, "meson.build")
+        helpers = self.python_requires["mpv-helpers"].module
+        save(self, meson_build, helpers.add_dependency_overrides(load(self, meson_build)))
     
     def layout(self):
         basic_layout(self)
@@ -57,6 +73,9 @@ class LibplaceboConan(ConanFile):
             del self.options.fPIC
         if self.settings.os != "Windows":
             del self.options.d3d11
+        if self.settings.os == "Windows" or is_apple_os(self):
+            del self.options.split_dwarf
+            del self.options.compress_debug_sections
 
     def configure(self):
         if self.options.get_safe("vulkan") == None:
@@ -100,6 +119,10 @@ class LibplaceboConan(ConanFile):
             raise ConanInvalidConfiguration("gl_proc_addr cannot be enabled if opengl is disabled")
         if self.options.get_safe("libdovi") == True and self.options.get_safe("dovi") == False:
             raise ConanInvalidConfiguration("libdovi cannot be enabled if dovi is disabled")
+        if self.options.get_safe("split_dwarf") or self.options.get_safe("compress_debug_sections"):
+            if self.settings.build_type not in ("Debug", "RelWithDebInfo"):
+                raise ConanInvalidConfiguration("split_dwarf and compress_debug_sections need debug info, "
+                                                "use build_type=Debug or RelWithDebInfo")
 
     def requirements(self):
         if self.options.lcms == True:
@@ -134,6 +157,8 @@ class LibplaceboConan(ConanFile):
         self.tool_requires("pkgconf/[>=2.0.0]")
         if self.options.get_safe("glslang"):
             self.tool_requires("cmake/[>=3.24]")  # For finding SPIRV components
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
 
     def generate(self):
         if self.options.get_safe("glslang"):
@@ -178,11 +203,40 @@ class LibplaceboConan(ConanFile):
             option : ("true" if self.options.get_safe(value) else "false")
                 for option, value in boolean_options.items()
         })
-        
+
+        if self.options.get_safe("split_dwarf"):
+            tc.extra_cflags.append("-gsplit-dwarf")
+            tc.extra_cxxflags.append("-gsplit-dwarf")
+        if self.options.get_safe("compress_debug_sections"):
+            compress = f"--compress-debug-sections={self.options.compress_debug_sections}"
+            tc.extra_cflags.append(f"-Wa,{compress}")
+            tc.extra_cxxflags.append(f"-Wa,{compress}")
+            tc.extra_ldflags.append(f"-Wl,{compress}")
+        if self.options.reproducible:
+            tc.extra_cflags.extend(self._reproducible_flags)
+            tc.extra_cxxflags.extend(self._reproducible_flags)
+            if is_msvc(self):
+                tc.extra_ldflags.append("/Brepro")
+        if self._linker:
+            tc.c_ld = tc.cpp_ld = self._linker
+        if self.conf.get("user.mpv:meson_dependency_overrides", default=False, check_type=bool):
+            helpers = self.python_requires["mpv-helpers"].module
+            tc.properties.update(helpers.meson_dependency_properties(self.generators_folder))
+
         tc.generate()
-        
+
+        if self.options.reproducible:
+            env = Environment()
+            env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                              check_type=int)))
+            if is_apple_os(self):
+                env.define("ZERO_AR_DATE", "1")
+            env.vars(self).save_script("conanbuild_reproducible")
 
     def build(self):
+        if self._jobserver:
+            # ninja only acts as a jobserver client without an explicit -j
+            self.conf.define("tools.build:jobs", 0)
         meson = Meson(self)
         meson.configure()
         meson.build()
@@ -193,6 +247,8 @@ class LibplaceboConan(ConanFile):
         meson = Meson(self)
         meson.install()
         rmdir(self, os.path.join(self.package_folder, "lib", "pkgconfig"))
+        if self.options.get_safe("split_dwarf"):
+            self._package_dwp()
 
     def package_info(self):
         self.cpp_info.libs = ["placebo"]
@@ -4,10 +4,13 @@ from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
 from conan.tools.files import get, copy, load, save, export_conandata_patches, apply_conandata_patches, collect_libs
-from conan.tools.apple import fix_apple_shared_install_name
+from conan.tools.apple import fix_apple_shared_install_name, is_apple_os
+from conan.tools.env import Environment
+from conan.tools.microsoft import is_msvc
+from conan.tools.scm import Version
 
 
-required_conan_version = ">=1.53.0"
+required_conan_version = ">=2.0.8"
 
 
 class LuaConan(ConanFile):
@@ -19,13 +22,17 @@ class LuaConan(ConanFile):
     homepage = "https://www.lua.org/"
     topics = ("embed", "scripting")
     package_type = "library"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
+    no_copy_source = True
     options = {
         "shared": [False, True],
         "fPIC": [True, False],
         "compile_as_cpp": [True, False],
         "with_tools": [True, False],
         "with_readline": [True, False],
+        "reproducible": [True, False],
     }
     default_options = {
         "shared": False,
@@ -33,6 +40,7 @@ class LuaConan(ConanFile):
         "compile_as_cpp": False,
         "with_tools": False,
         "with_readline": False,
+        "reproducible": False,
     }
 
     def export_sources(self):
@@ -47,8 +55,8 @@ class LuaConan(ConanFile):
         if self.options.shared:
             self.options.rm_safe("fPIC")
         if not self.options.compile_as_cpp:
-            self.options.rm_safe("compiler.libcxx")
-            self.options.rm_safe("compiler.cppstd")
+            self.settings.rm_safe("compiler.libcxx")
+            self.settings.rm_safe("compiler.cppstd")
 
     def layout(self):
         cmake_layout(self, src_folder="src")
@@ -57,12 +65,26 @@ class LuaConan(ConanFile):
         if self.options.with_tools and self.options.with_readline:
             self.requires("readline/8.2")
 
+    def package_id(self):
+        # Built as C, the ABI does not depend on the compiler minor version
+        if not self.info.options.compile_as_cpp and \
+                self.info.settings.compiler in ("gcc", "clang", "apple-clang"):
+            self.info.settings.compiler.version = str(Version(self.info.settings.compiler.version).major)
+
     def validate(self):
         if not self.options.with_tools and self.options.with_readline:
             raise ConanInvalidConfiguration(f"{self.ref} requires readline only with with_tools=True")
 
     def source(self):
         get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        apply_conandata_patches(self)
+
+    def build_requirements(self):
+        if self._linker:
+            # CMAKE_LINKER_TYPE is new in CMake 3.29
+            self.tool_requires("cmake/[>=3.29 <4]")
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
 
     def generate(self):
         tc = CMakeToolchain(self)
@@ -70,12 +92,36 @@ class LuaConan(ConanFile):
         tc.variables["COMPILE_AS_CPP"] = self.options.compile_as_cpp
         tc.variables["SKIP_INSTALL_TOOLS"] = not self.options.with_tools
         tc.variables["WITH_READLINE"] = self.options.with_readline
+        if self.options.reproducible:
+            tc.extra_cflags.extend(self._reproducible_flags)
+            tc.extra_cxxflags.extend(self._reproducible_flags)
+            if is_msvc(self):
+                tc.extra_sharedlinkflags.append("/Brepro")
+                tc.extra_exelinkflags.append("/Brepro")
+                tc.cache_variables["CMAKE_STATIC_LINKER_FLAGS"] = "/Brepro"
+            elif not is_apple_os(self):
+                # ar D: no timestamps, uids or modes in the archive
+                for lang in ("C", "CXX"):
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_CREATE"] = "<CMAKE_AR> qcD <TARGET> <LINK_FLAGS> <OBJECTS>"
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_APPEND"] = "<CMAKE_AR> qD <TARGET> <LINK_FLAGS> <OBJECTS>"
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_FINISH"] = "<CMAKE_RANLIB> -D <TARGET>"
+        if self._linker:
+            tc.cache_variables["CMAKE_LINKER_TYPE"] = self._linker.upper()
         tc.generate()
         deps = CMakeDeps(self)
         deps.generate()
+        if self.options.reproducible:
+            env = Environment()
+            env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                              check_type=int)))
+            if is_apple_os(self):
+                env.define("ZERO_AR_DATE", "1")
+            env.vars(self).save_script("conanbuild_reproducible")
 
     def build(self):
-        apply_conandata_patches(self)
+        if self._jobserver:
+            # cmake --build then runs the generator's tool without -j, which joins the pool
+            self.conf.define("tools.build:jobs", 0)
         cmake = CMake(self)
         cmake.configure(build_script_folder=os.path.join(self.source_folder, os.pardir))
         cmake.build()
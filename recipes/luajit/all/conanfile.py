@@ -4,13 +4,14 @@ from conan.tools.files import get, chdir, replace_in_file, copy, rmdir, export_c
 from conan.tools.microsoft import is_msvc, MSBuildToolchain, VCVars, unix_path
 from conan.tools.layout import basic_layout
 from conan.tools.gnu import Autotools, AutotoolsToolchain
+from conan.tools.env import Environment
 from conan.tools.apple import is_apple_os
 from conan.tools.build import cross_building
 from conan.errors import ConanInvalidConfiguration
 import os
 
 
-required_conan_version = ">=1.53.0"
+required_conan_version = ">=2.0.8"
 
 
 class LuajitConan(ConanFile):
@@ -21,9 +22,11 @@ class LuajitConan(ConanFile):
     description = "LuaJIT is a Just-In-Time Compiler (JIT) for the Lua programming language."
     topics = ("lua", "jit")
     provides = "lua"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
-    options = {"shared": [True, False], "fPIC": [True, False]}
-    default_options = {"shared": False, "fPIC": True}
+    options = {"shared": [True, False], "fPIC": [True, False], "reproducible": [True, False]}
+    default_options = {"shared": False, "fPIC": True, "reproducible": False}
 
     def export_sources(self):
         export_conandata_patches(self)
@@ -41,6 +44,11 @@ class LuajitConan(ConanFile):
     def layout(self):
         basic_layout(self, src_folder="src")
 
+    def package_id(self):
+        # The C API does not change between minor compiler releases
+        if self.info.settings.compiler in ("gcc", "clang", "apple-clang"):
+            self.info.settings.compiler.version = str(Version(self.info.settings.compiler.version).major)
+
     def validate(self):
         if self.settings.os == "Macos" and self.settings.arch == "armv8" and cross_building(self):
             raise ConanInvalidConfiguration(f"{self.ref} can not be cross-built to Mac M1. Please, try any version >=2.1")
@@ -50,6 +58,11 @@ class LuajitConan(ConanFile):
     def source(self):
         filename = f"LuaJIT-{self.version}.tar.gz"
         get(self, **self.conan_data["sources"][self.version], destination=self.source_folder, filename=filename, strip_root=True)
+        apply_conandata_patches(self)
+
+    def build_requirements(self):
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
 
     def generate(self):
         if is_msvc(self):
@@ -59,7 +72,29 @@ class LuajitConan(ConanFile):
             tc.generate()
         else:
             tc = AutotoolsToolchain(self)
+            if self.options.reproducible:
+                # The Makefile appends CFLAGS from the environment to its own
+                tc.extra_cflags.extend(self._reproducible_flags)
+            if self._linker:
+                # LDFLAGS reach the links of both buildvm and luajit
+                tc.extra_ldflags.append(f"-fuse-ld={self._linker}")
             tc.generate()
+        if self.options.reproducible:
+            env = Environment()
+            env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                              check_type=int)))
+            if is_msvc(self):
+                # msvcbuild.bat hardcodes its flags, cl and link also read options from these
+                env.define("CL", "/Brepro")
+                env.define("_LINK_", "/Brepro")
+            if is_apple_os(self):
+                env.define("ZERO_AR_DATE", "1")
+            env.vars(self).save_script("conanbuild_reproducible")
+
+    @property
+    def _reproducible_flags(self):
+        # The sources are built in place, the only varying path is the source folder
+        return [f"-ffile-prefix-map={self.source_folder}=/usr/src/{self.name}-{self.version}"]
 
     def _patch_sources(self):
         if not is_msvc(self):
@@ -95,6 +130,9 @@ class LuajitConan(ConanFile):
         args = [f"PREFIX={unix_path(self, self.package_folder)}"]
         if is_apple_os(self) and self._macosx_deployment_target:
             args.append(f"MACOSX_DEPLOYMENT_TARGET={self._macosx_deployment_target}")
+        if self.options.reproducible and not is_apple_os(self):
+            # Single quotes keep $(CROSS) for make to expand
+            args.append("'TARGET_AR=$(CROSS)ar rcsD'")
         return args
 
     @property
@@ -105,7 +143,11 @@ class LuajitConan(ConanFile):
         return "luajit-2.1"
 
     def build(self):
-        apply_conandata_patches(self)
+        if self._jobserver:
+            # make only joins the pool when it gets no -j of its own
+            self.conf.define("tools.build:jobs", 0)
+        # The Makefiles only build in the source tree, so luajit keeps a copy of the sources per
+        # configuration and the edits that depend on the options are made to that copy
         self._patch_sources()
         if is_msvc(self):
             with chdir(self, os.path.join(self.source_folder, "src")):
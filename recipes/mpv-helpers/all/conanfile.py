@@ -0,0 +1,280 @@
+from conan import ConanFile
+from conan.errors import ConanException, ConanInvalidConfiguration
+from conan.tools.apple import is_apple_os
+from conan.tools.gnu import PkgConfig
+from conan.tools.microsoft import is_msvc
+from conan.tools.scm import Version
+from io import StringIO
+import glob
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+
+required_conan_version = ">=2.0.8"
+
+
+# Added after project() in meson.build. Declares the dependencies that generate() lists in the
+# machine file, so that Meson takes them as they are instead of running pkg-config for each
+_MESON_DEPENDENCY_OVERRIDES = """
+foreach conan_name : meson.get_external_property('conan_dependencies', [])
+  conan_dependency = declare_dependency(
+    compile_args: meson.get_external_property('conan_' + conan_name + '_compile_args'),
+    link_args: meson.get_external_property('conan_' + conan_name + '_link_args'),
+    version: meson.get_external_property('conan_' + conan_name + '_version'))
+  meson.override_dependency(conan_name, conan_dependency, static: true)
+  meson.override_dependency(conan_name, conan_dependency, static: false)
+endforeach
+"""
+
+# Variables PkgConfigDeps writes to every .pc file, anything else is read with get_variable()
+_PC_DIR_VARIABLE = re.compile(r"(prefix|libdir\d*|includedir\d*|bindir\d*)$")
+
+
+def add_dependency_overrides(meson_build):
+    """ meson.build with _MESON_DEPENDENCY_OVERRIDES right after the project() call.
+    """
+    index, depth = re.search(r"^project\s*\(", meson_build, re.M).end(), 1
+    while depth:
+        if meson_build.startswith("'''", index):
+            index = meson_build.index("'''", index + 3) + 3
+            continue
+        char = meson_build[index]
+        if char == "'":
+            index += 1
+            while meson_build[index] != "'":
+                index += 2 if meson_build[index] == "\\" else 1
+        elif char == "#":
+            index = meson_build.index("\n", index)
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        index += 1
+    return meson_build[:index] + "\n" + _MESON_DEPENDENCY_OVERRIDES + meson_build[index:]
+
+
+def _read_pc(path):
+    """ (variables, fields) of a .pc file, with the variables expanded.
+    """
+    variables, fields = {}, {}
+    with open(path) as f:
+        for line in f:
+            match = re.match(r"([\w.]+)\s*([=:])\s*(.*)$", line.strip())
+            if match:
+                key, kind, value = match.groups()
+                value = re.sub(r"\$\{(\w+)\}", lambda m: variables.get(m.group(1), ""), value)
+                (variables if kind == "=" else fields)[key] = value
+    return variables, fields
+
+
+def meson_dependency_properties(generators_folder):
+    """ Machine file properties with what pkg-config returns for the .pc files of
+    PkgConfigDeps, the flags of the required packages included. Packages with variables of
+    their own stay with pkg-config, as do those that require one of them.
+    """
+    files = {os.path.basename(path)[:-len(".pc")]: _read_pc(path)
+             for path in glob.glob(os.path.join(generators_folder, "*.pc"))}
+    resolved = {}
+
+    def resolve(name):
+        if name in resolved or name not in files:
+            return resolved.get(name)
+        resolved[name] = None
+        variables, fields = files[name]
+        if not all(_PC_DIR_VARIABLE.match(variable) for variable in variables):
+            return None
+        cflags, libs = fields.get("Cflags", ""), fields.get("Libs", "")
+        # pkg-config and shlex disagree on escapes, and the machine file cannot quote them
+        if any(char in cflags + libs for char in "'\\"):
+            return None
+        compile_args, link_args = shlex.split(cflags), shlex.split(libs)
+        for required in fields.get("Requires", "").replace(",", " ").split():
+            dependency = resolve(required)
+            if dependency is None:
+                return None
+            compile_args += dependency[1]
+            link_args += dependency[2]
+        # Meson removes the repeated flags itself
+        resolved[name] = (fields.get("Version", ""), compile_args, link_args)
+        return resolved[name]
+
+    properties = {"conan_dependencies": []}
+    for name in sorted(files):
+        dependency = resolve(name)
+        if dependency:
+            properties["conan_dependencies"].append(name)
+            properties[f"conan_{name}_version"], properties[f"conan_{name}_compile_args"], \
+                properties[f"conan_{name}_link_args"] = dependency
+    return properties
+
+
+# What PkgConfig.fill_cpp_info() reads, kept by pkg_config_info()
+_PKG_CONFIG_FIELDS = ("libs", "libdirs", "linkflags", "defines", "includedirs", "cflags")
+
+
+def _pc_files(search_path):
+    """ [path, mtime] of every .pc file in the pkg-config search path. Changes whenever a system
+    package adds, removes or updates one.
+    """
+    result = []
+    for folder in search_path:
+        if os.path.isdir(folder):
+            for filename in sorted(os.listdir(folder)):
+                if filename.endswith(".pc"):
+                    path = os.path.join(folder, filename)
+                    result.append([path, os.stat(path).st_mtime_ns])
+    return result
+
+
+def fill_cpp_info(cpp_info, info, is_system):
+    """ PkgConfig.fill_cpp_info() from the results of pkg_config_info().
+    """
+    if is_system:
+        cpp_info.system_libs = info["libs"]
+    else:
+        cpp_info.libs = info["libs"]
+        cpp_info.system_libs = []
+    cpp_info.libdirs = info["libdirs"]
+    cpp_info.sharedlinkflags = info["linkflags"]
+    cpp_info.exelinkflags = info["linkflags"]
+    cpp_info.defines = info["defines"]
+    cpp_info.includedirs = info["includedirs"]
+    cpp_info.cflags = info["cflags"]
+    cpp_info.cxxflags = info["cflags"]
+
+
+def install_system_packages(conanfile, manager, *substitutes):
+    """ Installs the first of 'substitutes' the package manager has, unless one of them is
+    installed already. Everything is checked before the package index is updated, which
+    happens at most once and only when something is missing.
+    """
+    if conanfile.conf.get("tools.system.package_manager:mode") == "install":
+        # None when 'manager' is not the package manager of this system
+        missing = manager.check([package for packages in substitutes for package in packages])
+        if missing is not None:
+            installed = [packages for packages in substitutes if not set(packages) & set(missing)]
+            if installed:
+                substitutes = installed[:1]
+            else:
+                manager.update()
+    manager.install_substitutes(*substitutes, update=False, check=True)
+
+
+def pkg_config_info(conanfile, library):
+    """ What PkgConfig.fill_cpp_info() would set for 'library'. With 'user.mpv:pkg_config_cache'
+    set to a JSON file, the results are kept there until a .pc file of the search path
+    changes, instead of calling pkg-config on every graph evaluation.
+    """
+    executable = conanfile.conf.get("tools.gnu:pkg_config", default="pkg-config")
+    cache_file = conanfile.conf.get("user.mpv:pkg_config_cache", check_type=str)
+    environment = [os.environ.get(name, "") for name in
+                   ("PKG_CONFIG_PATH", "PKG_CONFIG_LIBDIR", "PKG_CONFIG_SYSROOT_DIR")]
+    key = hashlib.sha256(json.dumps([executable, library, environment]).encode()).hexdigest()
+    cache = {}
+    if cache_file and os.path.isfile(cache_file):
+        with open(cache_file) as f:
+            cache = json.load(f)
+        entry = cache.get(key)
+        if entry and entry["files"] == _pc_files(entry["search_path"]):
+            conanfile.output.verbose(f"pkg-config results for {library} taken from {cache_file}")
+            return entry["info"]
+
+    pkg_config = PkgConfig(conanfile, library)
+    if not pkg_config.provides:
+        raise ConanException(f"PkgConfig error, '{library}' files not available")
+    info = {field: getattr(pkg_config, field) for field in _PKG_CONFIG_FIELDS}
+    if cache_file:
+        output = StringIO()
+        conanfile.run(f"{executable} --variable=pc_path pkg-config", stdout=output, quiet=True)
+        search_path = [folder for folder in os.pathsep.join([*environment[:2], output.getvalue().strip()])
+                       .split(os.pathsep) if folder]
+        cache[key] = {"search_path": search_path, "files": _pc_files(search_path), "info": info}
+        # Written under another name first, concurrent installs read the cache too
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        with open(f"{cache_file}.{os.getpid()}", "w") as f:
+            json.dump(cache, f, indent=4)
+        os.replace(f"{cache_file}.{os.getpid()}", cache_file)
+    return info
+
+
+class MpvRecipe:
+    """ Base of the recipes built from source, taken with python_requires_extend. Handles the
+    user.mpv:linker conf, the reproducible and jobserver builds and split debug info.
+    """
+
+    @property
+    def _linker(self):
+        # mold is the ConanCenter tool requirement. ConanCenter has no lld package, so lld is the
+        # ld.lld of the host system, installed with clang or the Android NDK
+        return self.conf.get("user.mpv:linker", check_type=str, choices=["mold", "lld"])
+
+    def _lld_found(self):
+        # -fuse-ld=lld looks for ld.lld next to the compiler and in PATH
+        folders = [os.path.dirname(shutil.which(compiler) or compiler) for compiler in
+                   self.conf.get("tools.build:compiler_executables", default={}, check_type=dict).values()]
+        ndk_path = self.conf.get("tools.android:ndk_path", check_type=str)
+        if ndk_path:
+            folders.extend(glob.glob(os.path.join(ndk_path, "toolchains", "llvm", "prebuilt", "*", "bin")))
+        return shutil.which("ld.lld", path=os.pathsep.join([*folders, os.environ.get("PATH", "")])) is not None
+
+    def validate_build(self):
+        if not self._linker:
+            return
+        if self.settings.os == "Windows" or is_apple_os(self):
+            raise ConanInvalidConfiguration(f"user.mpv:linker={self._linker} is only supported for ELF targets")
+        minimum = {"mold": "12.1", "lld": "9"}[self._linker]
+        if self.settings.compiler == "gcc" and Version(self.settings.compiler.version) < minimum:
+            raise ConanInvalidConfiguration(f"gcc {self.settings.compiler.version} cannot link with "
+                                            f"{self._linker}, gcc {minimum} or newer is needed")
+        if self._linker == "lld":
+            if not self._lld_found():
+                raise ConanInvalidConfiguration("user.mpv:linker=lld uses the ld.lld of the host system, it "
+                                                "is not a tool requirement. ld.lld is neither in PATH nor "
+                                                "next to the compiler, install it or use user.mpv:linker=mold")
+            self.output.warning("user.mpv:linker=lld uses the ld.lld of the host system, it is not a tool "
+                                "requirement. Use user.mpv:linker=mold for a linker built by Conan")
+
+    @property
+    def _reproducible_flags(self):
+        if is_msvc(self):
+            return ["/Brepro"]
+        # Source, build and dependency folders are embedded in debug info and __FILE__
+        folders = {self.source_folder: f"/usr/src/{self.name}-{self.version}",
+                   self.build_folder: f"/usr/src/{self.name}-{self.version}/build"}
+        for dependency in self.dependencies.host.values():
+            if dependency.package_folder:
+                folders[dependency.package_folder] = f"/usr/src/{dependency.ref.name}-{dependency.ref.version}"
+        return [f"-ffile-prefix-map={folder}={target}" for folder, target in folders.items()]
+
+    @property
+    def _jobserver(self):
+        # GNU make 4.4 fifo jobserver of 'conan mpv:build --jobserver' or of an outer make
+        return "--jobserver-auth=fifo:" in os.environ.get("MAKEFLAGS", "")
+
+    def _package_dwp(self):
+        # The binaries only point at .dwo files in the build folder. dwp merges them into one file
+        # in the metadata folder, which is uploaded with the package but only downloaded with
+        # 'conan download --metadata="debug/*"', keeping the package itself small
+        dwo_files = sorted(glob.glob(os.path.join(self.build_folder, "**", "*.dwo"), recursive=True))
+        if not dwo_files:
+            raise ConanException("split_dwarf is enabled but the build produced no .dwo files")
+        debug_folder = os.path.join(self.package_metadata_folder, "debug")
+        os.makedirs(debug_folder, exist_ok=True)
+        dwp_file = os.path.join(debug_folder, f"{self.name}.dwp")
+        llvm = "clang" in str(self.settings.compiler)
+        self.run(shlex.join(["llvm-dwp" if llvm else "dwp", "-o", dwp_file, *dwo_files]))
+        if self.options.get_safe("compress_debug_sections"):
+            # dwp decompresses its input and writes the merged sections uncompressed
+            self.run(shlex.join(["llvm-objcopy" if llvm else "objcopy",
+                                 f"--compress-debug-sections={self.options.compress_debug_sections}",
+                                 dwp_file]))
+
+
+class MpvHelpersConan(ConanFile):
+    name = "mpv-helpers"
+    description = "Code shared by the recipes of mpv and its dependencies"
+    license = "MIT"
+    package_type = "python-require"
@@ -1,8 +1,7 @@
 from conan import ConanFile
 from conan.tools.system import package_manager
-from conan.tools.gnu import PkgConfig
 
-required_conan_version = ">=1.50.0"
+required_conan_version = ">=2.0.8"
 
 
 class SysConfigOpenGLConan(ConanFile):
@@ -14,6 +13,7 @@ class SysConfigOpenGLConan(ConanFile):
     homepage = "https://www.opengl.org/"
     license = "MIT"
     package_type = "shared-library"
+    python_requires = "mpv-helpers/1.0"
     settings = "os", "arch", "compiler", "build_type"
 
     def layout(self):
@@ -26,27 +26,15 @@ class SysConfigOpenGLConan(ConanFile):
         if self.settings.os not in ["Linux", "FreeBSD", "SunOS"]:
             return
 
-        dnf = package_manager.Dnf(self)
-        dnf.install_substitutes(["libglvnd-devel"], ["mesa-libGL-devel"], update=True, check=True)
-
-        yum = package_manager.Yum(self)
-        yum.install(["mesa-libGL-devel"], update=True, check=True)
-
-        apt = package_manager.Apt(self)
-        apt.install_substitutes(["libgl-dev"], ["libgl1-mesa-dev"], update=True, check=True)
-
-        pacman = package_manager.PacMan(self)
-        pacman.install(["libglvnd"], update=True, check=True)
-
-        zypper = package_manager.Zypper(self)
-        zypper.install_substitutes(["Mesa-libGL-devel", "glproto-devel"],
-                                   ["Mesa-libGL-devel", "xorgproto-devel"], update=True, check=True)
-
-        pkg = package_manager.Pkg(self)
-        pkg.install(["libglvnd"], update=True, check=True)
-
-        pkg_util = package_manager.PkgUtil(self)
-        pkg_util.install(["mesalibs"], update=True, check=True)
+        helpers = self.python_requires["mpv-helpers"].module
+        helpers.install_system_packages(self, package_manager.Dnf(self), ["libglvnd-devel"], ["mesa-libGL-devel"])
+        helpers.install_system_packages(self, package_manager.Yum(self), ["mesa-libGL-devel"])
+        helpers.install_system_packages(self, package_manager.Apt(self), ["libgl-dev"], ["libgl1-mesa-dev"])
+        helpers.install_system_packages(self, package_manager.PacMan(self), ["libglvnd"])
+        helpers.install_system_packages(self, package_manager.Zypper(self), ["Mesa-libGL-devel", "glproto-devel"],
+                                        ["Mesa-libGL-devel", "xorgproto-devel"])
+        helpers.install_system_packages(self, package_manager.Pkg(self), ["libglvnd"])
+        helpers.install_system_packages(self, package_manager.PkgUtil(self), ["mesalibs"])
 
     def package_info(self):
         # TODO: Workaround for #2311 until a better solution can be found
@@ -64,8 +52,8 @@ class SysConfigOpenGLConan(ConanFile):
         elif self.settings.os == "Windows":
             self.cpp_info.system_libs = ["opengl32"]
         elif self.settings.os in ["Linux", "FreeBSD", "SunOS"]:
-            pkg_config = PkgConfig(self, 'gl')
-            pkg_config.fill_cpp_info(self.cpp_info, is_system=self.settings.os != "FreeBSD")
+            helpers = self.python_requires["mpv-helpers"].module
+            info = helpers.pkg_config_info(self, "gl")
+            helpers.fill_cpp_info(self.cpp_info, info, is_system=self.settings.os != "FreeBSD")
         elif self.settings.os == "Android":
-            pkg_config = PkgConfig(self, 'gl')
             self.cpp_info.system_libs = ["GLESv2", "GLESv3"]
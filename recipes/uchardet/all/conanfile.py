@@ -1,12 +1,14 @@
 import os
 
 from conan import ConanFile
-from conan.tools.apple import fix_apple_shared_install_name
+from conan.tools.apple import fix_apple_shared_install_name, is_apple_os
 from conan.tools.cmake import CMake, CMakeToolchain, cmake_layout
+from conan.tools.env import Environment
 from conan.tools.files import copy, get, replace_in_file, rmdir, save
+from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
 
-required_conan_version = ">=1.53.0"
+required_conan_version = ">=2.0.8"
 
 
 class UchardetConan(ConanFile):
@@ -23,16 +25,27 @@ class UchardetConan(ConanFile):
     topics = ("encoding", "detector")
 
     package_type = "library"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
+    no_copy_source = True
     options = {
         "shared": [True, False],
         "fPIC": [True, False],
         "check_sse2": [True, False],
+        "optimization": [None, "O2", "O3"],
+        "target_isa": [None, "ANY"],
+        "lto": [True, False],
+        "reproducible": [True, False],
     }
     default_options = {
         "shared": False,
         "fPIC": True,
         "check_sse2": True,
+        "optimization": None,
+        "target_isa": None,
+        "lto": False,
+        "reproducible": False,
     }
 
     @property
@@ -48,20 +61,69 @@ class UchardetConan(ConanFile):
     def configure(self):
         if self.options.shared:
             self.options.rm_safe("fPIC")
+        # Implemented in C++ behind a C API, the language standard is not visible to consumers.
+        # compiler.libcxx stays, static consumers link the same C++ runtime.
+        self.settings.rm_safe("compiler.cppstd")
 
     def layout(self):
         cmake_layout(self, src_folder="src")
 
+    def package_id(self):
+        # libstdc++ and libc++ keep their ABI across minor compiler releases
+        if self.info.settings.compiler in ("gcc", "clang", "apple-clang"):
+            self.info.settings.compiler.version = str(Version(self.info.settings.compiler.version).major)
+
     def source(self):
         get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        self._patch_sources()
+
+    def build_requirements(self):
+        if self._linker:
+            # CMAKE_LINKER_TYPE is new in CMake 3.29
+            self.tool_requires("cmake/[>=3.29 <4]")
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
 
     def generate(self):
         tc = CMakeToolchain(self)
         tc.variables["CHECK_SSE2"] = self.options.get_safe("check_sse2", False)
         tc.variables["BUILD_BINARY"] = False
         tc.variables["BUILD_STATIC"] = not self.options.shared
+        # Detection runs on every external subtitle load, so allow trading portability for speed.
+        if self.options.optimization:
+            # MSVC has no level above /O2
+            tc.extra_cxxflags.append("/O2" if is_msvc(self) else f"-{self.options.optimization}")
+        if self.options.target_isa:
+            # e.g. "x86-64-v3" or "native" for GCC/Clang, "AVX2" for MSVC
+            tc.extra_cxxflags.append(f"/arch:{self.options.target_isa}" if is_msvc(self)
+                                     else f"-march={self.options.target_isa}")
+        if self.options.lto:
+            tc.cache_variables["CMAKE_POLICY_DEFAULT_CMP0069"] = "NEW"
+            tc.cache_variables["CMAKE_INTERPROCEDURAL_OPTIMIZATION"] = True
+        if self.options.reproducible:
+            tc.extra_cflags.extend(self._reproducible_flags)
+            tc.extra_cxxflags.extend(self._reproducible_flags)
+            if is_msvc(self):
+                tc.extra_sharedlinkflags.append("/Brepro")
+                tc.cache_variables["CMAKE_STATIC_LINKER_FLAGS"] = "/Brepro"
+            elif not is_apple_os(self):
+                # Archive members without timestamps, uids and modes
+                for lang in ("C", "CXX"):
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_CREATE"] = "<CMAKE_AR> qcD <TARGET> <LINK_FLAGS> <OBJECTS>"
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_APPEND"] = "<CMAKE_AR> qD <TARGET> <LINK_FLAGS> <OBJECTS>"
+                    tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_FINISH"] = "<CMAKE_RANLIB> -D <TARGET>"
+        if self._linker:
+            tc.cache_variables["CMAKE_LINKER_TYPE"] = self._linker.upper()
         tc.generate()
 
+        if self.options.reproducible:
+            env = Environment()
+            env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                              check_type=int)))
+            if is_apple_os(self):
+                env.define("ZERO_AR_DATE", "1")
+            env.vars(self).save_script("conanbuild_reproducible")
+
     def _patch_sources(self):
         if Version(self.version) < "0.0.8":
             # fix problem with macOS
@@ -73,7 +135,9 @@ class UchardetConan(ConanFile):
         save(self, os.path.join(self.source_folder, "test", "CMakeLists.txt"), "")
 
     def build(self):
-        self._patch_sources()
+        if self._jobserver:
+            # cmake --build then runs the generator's tool without -j, which joins the pool
+            self.conf.define("tools.build:jobs", 0)
         cmake = CMake(self)
         cmake.configure()
         cmake.build()
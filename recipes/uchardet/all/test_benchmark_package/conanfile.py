@@ -0,0 +1,31 @@
+from conan import ConanFile
+from conan.tools.build import can_run
+from conan.tools.cmake import cmake_layout, CMake
+import os
+
+
+class TestBenchmarkPackageConan(ConanFile):
+    settings = "os", "arch", "compiler", "build_type"
+    generators = "CMakeDeps", "CMakeToolchain", "VirtualRunEnv"
+    test_type = "explicit"
+
+    def requirements(self):
+        self.requires(self.tested_reference_str)
+
+    def layout(self):
+        cmake_layout(self)
+
+    def build(self):
+        cmake = CMake(self)
+        cmake.configure()
+        cmake.build()
+
+    def test(self):
+        if can_run(self):
+            # Size of each generated subtitle corpus in MiB
+            size_mib = self.conf.get("user.uchardet:benchmark_size_mib", default=4, check_type=int)
+            # Real subtitle files to benchmark as well, path -> expected charset
+            files = self.conf.get("user.uchardet:benchmark_files", default={}, check_type=dict)
+            arguments = "".join(f' "{path}={charset}"' for path, charset in files.items())
+            bin_path = os.path.join(self.cpp.build.bindir, "test_benchmark_package")
+            self.run(f"{bin_path} {size_mib}{arguments}", env="conanrun")
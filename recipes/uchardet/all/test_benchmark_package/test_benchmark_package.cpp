@@ -0,0 +1,191 @@
+#include <uchardet/uchardet.h>
+
+#include <algorithm>
+#include <cctype>
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <iterator>
+#include <string>
+#include <vector>
+
+// Subtitle lines in the encodings mpv commonly meets for external subtitles.
+// The expected name is matched as a case-insensitive prefix of the detected
+// charset, so "UTF-16" accepts both "UTF-16" and "UTF-16LE".
+struct Sample {
+    const char* charset;
+    size_t size;
+    const char* data;
+};
+
+static const Sample samples[] = {
+    {
+        "UTF-8", 144,
+        "\xd0\x9f\xd1\x80\xd0\xb8\xd0\xb2\xd0\xb5\xd1\x82\x2c\x20\xd0\xba\xd0\xb0\xd0\xba\x20"
+        "\xd0\xb4\xd0\xb5\xd0\xbb\xd0\xb0\x3f\x20\xd0\xad\xd1\x82\xd0\xbe\x20\xd1\x81\xd1\x83"
+        "\xd0\xb1\xd1\x82\xd0\xb8\xd1\x82\xd1\x80\xd1\x8b\x20\xd0\xb4\xd0\xbb\xd1\x8f\x20\xd0"
+        "\xbf\xd1\x80\xd0\xbe\xd0\xb2\xd0\xb5\xd1\x80\xd0\xba\xd0\xb8\x2e\x0a\xe3\x81\x93\xe3"
+        "\x82\x93\xe3\x81\xab\xe3\x81\xa1\xe3\x81\xaf\xe3\x80\x81\xe5\x85\x83\xe6\xb0\x97\xe3"
+        "\x81\xa7\xe3\x81\x99\xe3\x81\x8b\xef\xbc\x9f\xe5\xad\x97\xe5\xb9\x95\xe3\x81\xae\xe3"
+        "\x83\x86\xe3\x82\xb9\xe3\x83\x88\xe3\x81\xa7\xe3\x81\x99\xe3\x80\x82\x0a"
+    },
+    {
+        "WINDOWS-1251", 128,
+        "\xcf\xf0\xe8\xe2\xe5\xf2\x2c\x20\xea\xe0\xea\x20\xe4\xe5\xeb\xe0\x3f\x20\xdd\xf2\xee"
+        "\x20\xf1\xf3\xe1\xf2\xe8\xf2\xf0\xfb\x20\xe4\xeb\xff\x20\xef\xf0\xee\xe2\xe5\xf0\xea"
+        "\xe8\x20\xf1\xea\xee\xf0\xee\xf1\xf2\xe8\x20\xee\xef\xf0\xe5\xe4\xe5\xeb\xe5\xed\xe8"
+        "\xff\x20\xea\xee\xe4\xe8\xf0\xee\xe2\xea\xe8\x2e\x0a\xcc\xfb\x20\xe5\xe4\xe5\xec\x20"
+        "\xe4\xee\xec\xee\xe9\x20\xe7\xe0\xe2\xf2\xf0\xe0\x20\xf3\xf2\xf0\xee\xec\x2c\x20\xed"
+        "\xe5\x20\xe7\xe0\xe1\xf3\xe4\xfc\x20\xe2\xe7\xff\xf2\xfc\x20\xe1\xe8\xeb\xe5\xf2\xfb"
+        "\x2e\x0a"
+    },
+    {
+        "ISO-8859-7", 108,
+        "\xca\xe1\xeb\xe7\xec\xdd\xf1\xe1\x2c\x20\xf4\xe9\x20\xea\xdc\xed\xe5\xe9\xf2\x3b\x20"
+        "\xc1\xf5\xf4\xef\xdf\x20\xe5\xdf\xed\xe1\xe9\x20\xf5\xf0\xfc\xf4\xe9\xf4\xeb\xef\xe9"
+        "\x20\xe3\xe9\xe1\x20\xe4\xef\xea\xe9\xec\xde\x2e\x0a\xc8\xe1\x20\xf6\xfd\xe3\xef\xf5"
+        "\xec\xe5\x20\xe1\xfd\xf1\xe9\xef\x20\xf4\xef\x20\xf0\xf1\xf9\xdf\x2c\x20\xec\xe7\xed"
+        "\x20\xee\xe5\xf7\xdc\xf3\xe5\xe9\xf2\x20\xf4\xe1\x20\xe5\xe9\xf3\xe9\xf4\xde\xf1\xe9"
+        "\xe1\x2e\x0a"
+    },
+    {
+        "SHIFT_JIS", 122,
+        "\x82\xb1\x82\xf1\x82\xc9\x82\xbf\x82\xcd\x81\x41\x8c\xb3\x8b\x43\x82\xc5\x82\xb7\x82"
+        "\xa9\x81\x48\x82\xb1\x82\xea\x82\xcd\x95\xb6\x8e\x9a\x83\x52\x81\x5b\x83\x68\x94\xbb"
+        "\x92\xe8\x82\xcc\x91\xac\x93\x78\x82\xf0\x91\xaa\x82\xe9\x82\xbd\x82\xdf\x82\xcc\x8e"
+        "\x9a\x96\x8b\x82\xc5\x82\xb7\x81\x42\x0a\x96\xbe\x93\xfa\x82\xcc\x92\xa9\x82\xc9\x8f"
+        "\x6f\x94\xad\x82\xb5\x82\xdc\x82\xb7\x81\x42\x90\xd8\x95\x84\x82\xf0\x96\x59\x82\xea"
+        "\x82\xc8\x82\xa2\x82\xc5\x82\xad\x82\xbe\x82\xb3\x82\xa2\x81\x42\x0a"
+    },
+    {
+        "GB18030", 86,
+        "\xc4\xe3\xba\xc3\xa3\xac\xc4\xe3\xd7\xee\xbd\xfc\xd4\xf5\xc3\xb4\xd1\xf9\xa3\xbf\xd5"
+        "\xe2\xca\xc7\xd3\xc3\xd3\xda\xb2\xe2\xca\xd4\xb1\xe0\xc2\xeb\xbc\xec\xb2\xe2\xcb\xd9"
+        "\xb6\xc8\xb5\xc4\xd7\xd6\xc4\xbb\xa1\xa3\x0a\xce\xd2\xc3\xc7\xc3\xf7\xcc\xec\xd4\xe7"
+        "\xc9\xcf\xb3\xf6\xb7\xa2\xa3\xac\xb1\xf0\xcd\xfc\xc1\xcb\xb4\xf8\xb3\xb5\xc6\xb1\xa1"
+        "\xa3\x0a"
+    },
+    {
+        "UTF-16", 218,
+        "\xff\xfe\x48\x00\x65\x00\x6c\x00\x6c\x00\x6f\x00\x2c\x00\x20\x00\x74\x00\x68\x00\x69"
+        "\x00\x73\x00\x20\x00\x69\x00\x73\x00\x20\x00\x61\x00\x20\x00\x73\x00\x75\x00\x62\x00"
+        "\x74\x00\x69\x00\x74\x00\x6c\x00\x65\x00\x20\x00\x6c\x00\x69\x00\x6e\x00\x65\x00\x20"
+        "\x00\x75\x00\x73\x00\x65\x00\x64\x00\x20\x00\x66\x00\x6f\x00\x72\x00\x20\x00\x62\x00"
+        "\x65\x00\x6e\x00\x63\x00\x68\x00\x6d\x00\x61\x00\x72\x00\x6b\x00\x69\x00\x6e\x00\x67"
+        "\x00\x2e\x00\x0a\x00\x57\x00\x65\x00\x20\x00\x6c\x00\x65\x00\x61\x00\x76\x00\x65\x00"
+        "\x20\x00\x74\x00\x6f\x00\x6d\x00\x6f\x00\x72\x00\x72\x00\x6f\x00\x77\x00\x20\x00\x6d"
+        "\x00\x6f\x00\x72\x00\x6e\x00\x69\x00\x6e\x00\x67\x00\x2c\x00\x20\x00\x64\x00\x6f\x00"
+        "\x20\x00\x6e\x00\x6f\x00\x74\x00\x20\x00\x66\x00\x6f\x00\x72\x00\x67\x00\x65\x00\x74"
+        "\x00\x20\x00\x74\x00\x68\x00\x65\x00\x20\x00\x74\x00\x69\x00\x63\x00\x6b\x00\x65\x00"
+        "\x74\x00\x73\x00\x2e\x00\x0a\x00"
+    },
+};
+
+struct Corpus {
+    std::string name;
+    std::string expected;
+    std::vector<char> data;
+};
+
+static bool charset_matches(const char* detected, const std::string& expected) {
+    if (!detected || std::strlen(detected) < expected.size()) {
+        return false;
+    }
+    for (size_t i = 0; i < expected.size(); ++i) {
+        if (std::toupper(static_cast<unsigned char>(detected[i])) !=
+            std::toupper(static_cast<unsigned char>(expected[i]))) {
+            return false;
+        }
+    }
+    return true;
+}
+
+static std::vector<char> repeat_sample(const Sample& sample, size_t target_size) {
+    std::vector<char> data;
+    data.reserve(target_size + sample.size);
+    // Keep a leading BOM only once, like a real subtitle file would.
+    size_t bom = (sample.size >= 2 && static_cast<unsigned char>(sample.data[0]) == 0xff &&
+                  static_cast<unsigned char>(sample.data[1]) == 0xfe) ? 2 : 0;
+    data.insert(data.end(), sample.data, sample.data + sample.size);
+    while (data.size() < target_size) {
+        data.insert(data.end(), sample.data + bom, sample.data + sample.size);
+    }
+    return data;
+}
+
+static const char* detect(uchardet_t ud, const std::vector<char>& data, size_t chunk_size) {
+    uchardet_reset(ud);
+    for (size_t offset = 0; offset < data.size(); offset += chunk_size) {
+        size_t len = std::min(chunk_size, data.size() - offset);
+        if (uchardet_handle_data(ud, data.data() + offset, len) != 0) {
+            return nullptr;
+        }
+    }
+    uchardet_data_end(ud);
+    return uchardet_get_charset(ud);
+}
+
+int main(int argc, char** argv) {
+    // Usage: test_benchmark_package [size_mib] [file=EXPECTED_CHARSET ...]
+    size_t size_mib = argc > 1 ? std::strtoul(argv[1], nullptr, 10) : 4;
+    if (size_mib == 0) {
+        size_mib = 4;
+    }
+    const size_t target_size = size_mib * 1024 * 1024;
+    const size_t chunk_size = 64 * 1024;
+    const int iterations = 5;
+
+    std::vector<Corpus> corpora;
+    for (const Sample& sample : samples) {
+        corpora.push_back({sample.charset, sample.charset, repeat_sample(sample, target_size)});
+    }
+    for (int i = 2; i < argc; ++i) {
+        std::string arg = argv[i];
+        size_t sep = arg.rfind('=');
+        if (sep == std::string::npos) {
+            std::fprintf(stderr, "ignoring '%s': expected file=CHARSET\n", argv[i]);
+            continue;
+        }
+        std::ifstream file(arg.substr(0, sep), std::ios::binary);
+        if (!file) {
+            std::fprintf(stderr, "cannot open '%s'\n", arg.substr(0, sep).c_str());
+            return 1;
+        }
+        std::vector<char> data((std::istreambuf_iterator<char>(file)), std::istreambuf_iterator<char>());
+        corpora.push_back({arg.substr(0, sep), arg.substr(sep + 1), std::move(data)});
+    }
+
+    uchardet_t ud = uchardet_new();
+    size_t correct = 0;
+    double total_bytes = 0.0;
+    double total_seconds = 0.0;
+
+    std::printf("%-16s %10s %10s %-16s\n", "corpus", "MiB", "MB/s", "detected");
+    for (const Corpus& corpus : corpora) {
+        const char* charset = nullptr;
+        std::string detected;
+        auto start = std::chrono::steady_clock::now();
+        for (int i = 0; i < iterations; ++i) {
+            charset = detect(ud, corpus.data, chunk_size);
+        }
+        double seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+        detected = charset ? charset : "(error)";
+        if (charset_matches(charset, corpus.expected)) {
+            ++correct;
+        }
+        double bytes = static_cast<double>(corpus.data.size()) * iterations;
+        total_bytes += bytes;
+        total_seconds += seconds;
+        std::printf("%-16s %10.2f %10.1f %-16s%s\n", corpus.name.c_str(),
+                    corpus.data.size() / (1024.0 * 1024.0), bytes / seconds / 1e6,
+                    detected.empty() ? "(unknown)" : detected.c_str(),
+                    charset_matches(charset, corpus.expected) ? "" : " MISMATCH");
+    }
+    uchardet_delete(ud);
+
+    std::printf("throughput: %.1f MB/s, accuracy: %zu/%zu\n",
+                total_bytes / total_seconds / 1e6, correct, corpora.size());
+    return 0;
+}
@@ -1,14 +1,15 @@
 from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
+from conan.tools.apple import is_apple_os
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
-from conan.tools.env import VirtualBuildEnv
+from conan.tools.env import Environment, VirtualBuildEnv
 from conan.tools.files import apply_conandata_patches, copy, export_conandata_patches, get, replace_in_file, rmdir
 from conan.tools.gnu import PkgConfigDeps
-from conan.tools.microsoft import check_min_vs
+from conan.tools.microsoft import check_min_vs, is_msvc
 from conan.tools.scm import Version
 import os
 
-required_conan_version = ">=1.55.0"
+required_conan_version = ">=2.0.8"
 
 
 class VulkanLoaderConan(ConanFile):
@@ -18,19 +19,34 @@ class VulkanLoaderConan(ConanFile):
     homepage = "https://github.com/KhronosGroup/Vulkan-Loader"
     url = "https://github.com/conan-io/conan-center-index"
     license = "Apache-2.0"
-    package_type = "shared-library"
+    package_type = "library"
+    python_requires = "mpv-helpers/1.0"
+    python_requires_extend = "mpv-helpers.MpvRecipe"
     settings = "os", "arch", "compiler", "build_type"
+    no_copy_source = True
     options = {
+        "shared": [True, False],
         "with_wsi_xcb": [True, False],
         "with_wsi_xlib": [True, False],
         "with_wsi_wayland": [True, False],
         "with_wsi_directfb": [True, False],
+        "implicit_layers": [True, False],
+        "sysconfdir": [None, "ANY"],
+        "fallback_config_dirs": [None, "ANY"],
+        "fallback_data_dirs": [None, "ANY"],
+        "reproducible": [True, False],
     }
     default_options = {
+        "shared": True,
         "with_wsi_xcb": True,
         "with_wsi_xlib": True,
         "with_wsi_wayland": True,
         "with_wsi_directfb": False,
+        "implicit_layers": True,
+        "sysconfdir": None,
+        "fallback_config_dirs": None,
+        "fallback_data_dirs": None,
+        "reproducible": False,
     }
 
     @property
@@ -51,6 +67,11 @@ class VulkanLoaderConan(ConanFile):
             del self.options.with_wsi_xlib
             del self.options.with_wsi_wayland
             del self.options.with_wsi_directfb
+        if self.settings.os not in ["Linux", "FreeBSD"]:
+            # Manifest search directories are only configurable on XDG platforms
+            del self.options.sysconfdir
+            del self.options.fallback_config_dirs
+            del self.options.fallback_data_dirs
 
     def configure(self):
         self.settings.rm_safe("compiler.cppstd")
@@ -66,12 +87,22 @@ class VulkanLoaderConan(ConanFile):
         if Version(self.version) < "1.3.231" and self.options.get_safe("with_wsi_wayland"):
             self.requires("wayland/1.22.0")
 
+    def package_id(self):
+        # Only changes the run environment, the loader is built the same either way
+        del self.info.options.implicit_layers
+
     def validate(self):
         if self.options.get_safe("with_wsi_directfb"):
             # TODO: directfb package
             raise ConanInvalidConfiguration("Conan recipe for DirectFB is not available yet.")
         # FIXME: It should build but Visual Studio 2015 container in CI of CCI seems to lack some Win SDK headers
         check_min_vs(self, "191")
+        if not self.options.shared:
+            # Upstream only supports a static loader on Apple platforms
+            if not is_apple_os(self) or Version(self.version) < "1.3.239":
+                raise ConanInvalidConfiguration(f"{self.ref} can only be built as a static library on Apple platforms.")
+        if not self.options.implicit_layers and Version(self.version) < "1.3.234":
+            raise ConanInvalidConfiguration(f"{self.ref} does not support filtering implicit layers, use >= 1.3.234.")
         # TODO: to replace by some version range check
         if self.dependencies["vulkan-headers"].ref.version != self.version:
             self.output.warning("vulkan-loader should be built & consumed with the same version than vulkan-headers.")
@@ -82,11 +113,17 @@ class VulkanLoaderConan(ConanFile):
                 self.tool_requires("pkgconf/2.1.0")
         if self._is_mingw:
             self.tool_requires("jwasm/2.13")
-        if Version(self.version) >= "1.3.234":
+        if self._linker:
+            # CMAKE_LINKER_TYPE is new in CMake 3.29
+            self.tool_requires("cmake/[>=3.29 <4.0]")
+        elif Version(self.version) >= "1.3.234":
             self.tool_requires("cmake/[>=3.17.2 <4.0]")
+        if self._linker == "mold":
+            self.tool_requires("mold/[>=2.30]")
 
     def source(self):
         get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        self._patch_sources()
 
     def generate(self):
         if self.settings.os != "Android":
@@ -105,12 +142,43 @@ class VulkanLoaderConan(ConanFile):
                 tc.variables["BUILD_WSI_DIRECTFB_SUPPORT"] = self.options.with_wsi_directfb
             if self.settings.os == "Windows":
                 tc.variables["ENABLE_WIN10_ONECORE"] = False
+            # Every vkCreateInstance scans these directories for ICD and layer manifests. Without an
+            # explicit sysconfdir, the loader also searches the (usually empty) package folder.
+            if self.options.get_safe("sysconfdir"):
+                tc.cache_variables["SYSCONFDIR"] = str(self.options.sysconfdir)
+            if self.options.get_safe("fallback_config_dirs"):
+                tc.cache_variables["FALLBACK_CONFIG_DIRS"] = str(self.options.fallback_config_dirs)
+            if self.options.get_safe("fallback_data_dirs"):
+                tc.cache_variables["FALLBACK_DATA_DIRS"] = str(self.options.fallback_data_dirs)
+            if is_apple_os(self):
+                tc.cache_variables["APPLE_STATIC_LOADER"] = not self.options.shared
             tc.variables["BUILD_LOADER"] = True
             if self.settings.os == "Windows":
                 tc.variables["USE_MASM"] = True
             if Version(self.version) >= "1.3.212":
                 tc.variables["ENABLE_WERROR"] = False
+            if self.options.reproducible:
+                tc.extra_cflags.extend(self._reproducible_flags)
+                tc.extra_cxxflags.extend(self._reproducible_flags)
+                if is_msvc(self):
+                    tc.extra_sharedlinkflags.append("/Brepro")
+                    tc.cache_variables["CMAKE_STATIC_LINKER_FLAGS"] = "/Brepro"
+                elif not is_apple_os(self):
+                    # Apple's libtool follows ZERO_AR_DATE instead
+                    for lang in ("C", "CXX"):
+                        tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_CREATE"] = "<CMAKE_AR> qcD <TARGET> <LINK_FLAGS> <OBJECTS>"
+                        tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_APPEND"] = "<CMAKE_AR> qD <TARGET> <LINK_FLAGS> <OBJECTS>"
+                        tc.cache_variables[f"CMAKE_{lang}_ARCHIVE_FINISH"] = "<CMAKE_RANLIB> -D <TARGET>"
+            if self._linker:
+                tc.cache_variables["CMAKE_LINKER_TYPE"] = self._linker.upper()
             tc.generate()
+            if self.options.reproducible:
+                env = Environment()
+                env.define("SOURCE_DATE_EPOCH", str(self.conf.get("user.mpv:source_date_epoch", default=0,
+                                                                  check_type=int)))
+                if is_apple_os(self):
+                    env.define("ZERO_AR_DATE", "1")
+                env.vars(self).save_script("conanbuild_reproducible")
             deps = CMakeDeps(self)
             deps.generate()
             if self._is_pkgconf_needed:
@@ -118,53 +186,54 @@ class VulkanLoaderConan(ConanFile):
                 pkg.generate()
 
     def _patch_sources(self):
-        if self.settings.os != "Android":
-            apply_conandata_patches(self)
-
-            if Version(self.version) < "1.3.234":
-                replace_in_file(self, os.path.join(self.source_folder, "cmake", "FindVulkanHeaders.cmake"),
-                                    "HINTS ${VULKAN_HEADERS_INSTALL_DIR}/share/vulkan/registry",
-                                    "HINTS ${VULKAN_HEADERS_INSTALL_DIR}/res/vulkan/registry")
-
-            cmakelists = os.path.join(self.source_folder, "CMakeLists.txt")
-
-            # Honor settings.compiler.runtime
-            if Version(self.version) < "1.3.254":
-                replace_in_file(self, os.path.join(self.source_folder, "loader", "CMakeLists.txt"),
-                                    "if(${configuration} MATCHES \"/MD\")",
-                                    "if(FALSE)")
-            else:
-                if Version(self.version) < "1.3.275":
-                    replace_in_file(
-                        self,
-                        cmakelists,
-                        "set(TESTS_STANDARD_CXX_PROPERTIES ${LOADER_STANDARD_CXX_PROPERTIES} MSVC_RUNTIME_LIBRARY \"MultiThreaded$<$<CONFIG:Debug>:Debug>DLL\")",
-                        "set(TESTS_STANDARD_CXX_PROPERTIES ${LOADER_STANDARD_CXX_PROPERTIES})",
-                    )
+        apply_conandata_patches(self)
+
+        if Version(self.version) < "1.3.234":
+            replace_in_file(self, os.path.join(self.source_folder, "cmake", "FindVulkanHeaders.cmake"),
+                                "HINTS ${VULKAN_HEADERS_INSTALL_DIR}/share/vulkan/registry",
+                                "HINTS ${VULKAN_HEADERS_INSTALL_DIR}/res/vulkan/registry")
+
+        cmakelists = os.path.join(self.source_folder, "CMakeLists.txt")
+
+        # Honor settings.compiler.runtime
+        if Version(self.version) < "1.3.254":
+            replace_in_file(self, os.path.join(self.source_folder, "loader", "CMakeLists.txt"),
+                                "if(${configuration} MATCHES \"/MD\")",
+                                "if(FALSE)")
+        else:
+            if Version(self.version) < "1.3.275":
                 replace_in_file(
                     self,
                     cmakelists,
-                    "set(CMAKE_MSVC_RUNTIME_LIBRARY \"MultiThreaded$<$<CONFIG:Debug>:Debug>\")",
-                    "",
+                    "set(TESTS_STANDARD_CXX_PROPERTIES ${LOADER_STANDARD_CXX_PROPERTIES} MSVC_RUNTIME_LIBRARY \"MultiThreaded$<$<CONFIG:Debug>:Debug>DLL\")",
+                    "set(TESTS_STANDARD_CXX_PROPERTIES ${LOADER_STANDARD_CXX_PROPERTIES})",
                 )
+            replace_in_file(
+                self,
+                cmakelists,
+                "set(CMAKE_MSVC_RUNTIME_LIBRARY \"MultiThreaded$<$<CONFIG:Debug>:Debug>\")",
+                "",
+            )
 
-            # No warnings as errors
-            if Version(self.version) < "1.3.212":
-                replace_in_file(self, cmakelists, "/WX", "")
-            # This fix is needed due to CMAKE_FIND_PACKAGE_PREFER_CONFIG ON in CMakeToolchain (see https://github.com/conan-io/conan/issues/10387).
-            # Indeed we want to use upstream Find modules of xcb, x11, wayland and directfb. There are properly using pkgconfig under the hood.
-            if Version(self.version) < "1.3.234":
-                replace_in_file(self, cmakelists, "find_package(XCB REQUIRED)", "find_package(XCB REQUIRED MODULE)")
-                replace_in_file(self, cmakelists, "find_package(X11 REQUIRED)", "find_package(X11 REQUIRED MODULE)")
-            # find_package(Wayland REQUIRED) was removed, as it was unused
-            if Version(self.version) < "1.3.231":
-                replace_in_file(self, cmakelists, "find_package(Wayland REQUIRED)", "find_package(Wayland REQUIRED MODULE)")
-            if Version(self.version) < "1.3.234":
-                replace_in_file(self, cmakelists, "find_package(DirectFB REQUIRED)", "find_package(DirectFB REQUIRED MODULE)")
+        # No warnings as errors
+        if Version(self.version) < "1.3.212":
+            replace_in_file(self, cmakelists, "/WX", "")
+        # This fix is needed due to CMAKE_FIND_PACKAGE_PREFER_CONFIG ON in CMakeToolchain (see https://github.com/conan-io/conan/issues/10387).
+        # Indeed we want to use upstream Find modules of xcb, x11, wayland and directfb. There are properly using pkgconfig under the hood.
+        if Version(self.version) < "1.3.234":
+            replace_in_file(self, cmakelists, "find_package(XCB REQUIRED)", "find_package(XCB REQUIRED MODULE)")
+            replace_in_file(self, cmakelists, "find_package(X11 REQUIRED)", "find_package(X11 REQUIRED MODULE)")
+        # find_package(Wayland REQUIRED) was removed, as it was unused
+        if Version(self.version) < "1.3.231":
+            replace_in_file(self, cmakelists, "find_package(Wayland REQUIRED)", "find_package(Wayland REQUIRED MODULE)")
+        if Version(self.version) < "1.3.234":
+            replace_in_file(self, cmakelists, "find_package(DirectFB REQUIRED)", "find_package(DirectFB REQUIRED MODULE)")
 
     def build(self):
+        if self._jobserver:
+            # Lets make or ninja under cmake --build take their tokens from the pool
+            self.conf.define("tools.build:jobs", 0)
         if self.settings.os != "Android":
-            self._patch_sources()
             cmake = CMake(self)
             cmake.configure()
             cmake.build()
@@ -198,3 +267,8 @@ class VulkanLoaderConan(ConanFile):
             self.cpp_info.system_libs = ["dl", "pthread", "m"]
         elif self.settings.os == "Macos":
             self.cpp_info.frameworks = ["CoreFoundation"]
+
+        if not self.options.implicit_layers:
+            # No build switch exists upstream, so skip implicit layers through the loader's own filter.
+            # Only applies where the consumer runs with the run environment, e.g. VirtualRunEnv
+            self.runenv_info.define("VK_LOADER_LAYERS_DISABLE", "~implicit~")
@@ -0,0 +1,37 @@
+from conan import ConanFile
+from conan.tools.build import can_run
+from conan.tools.cmake import CMake, cmake_layout
+from conan.tools.env import Environment
+import os
+
+
+class TestBenchmarkPackageConan(ConanFile):
+    settings = "os", "arch", "compiler", "build_type"
+    generators = "CMakeToolchain", "CMakeDeps", "VirtualRunEnv"
+    test_type = "explicit"
+
+    def layout(self):
+        cmake_layout(self)
+
+    def requirements(self):
+        self.requires(self.tested_reference_str)
+
+    def build(self):
+        cmake = CMake(self)
+        cmake.configure()
+        cmake.build()
+
+    def test(self):
+        if can_run(self):
+            bin_dir = os.path.abspath(self.cpp.build.bindirs[0])
+            bin_path = os.path.join(bin_dir, "test_benchmark_package")
+            # Startup cost with the host's real manifests, honoring the loader's search options
+            self.run(f"{bin_path} startup", env="conanrun")
+            manifest = os.path.join(bin_dir, "mock_icd.json")
+            # Only load the null ICD, and keep implicit layers installed on the host out of the numbers
+            env = Environment()
+            env.define_path("VK_DRIVER_FILES", manifest)
+            env.define_path("VK_ICD_FILENAMES", manifest)
+            env.define("VK_LOADER_LAYERS_DISABLE", "~implicit~")
+            with env.vars(self).apply():
+                self.run(bin_path, env="conanrun")
@@ -0,0 +1,312 @@
+/*
+ * Null Vulkan ICD used to measure loader overhead without a GPU.
+ *
+ * Every entry point does the minimum required by the loader/ICD interface:
+ * dispatchable objects carry the loader magic in their first word, and all
+ * other calls return immediately.
+ */
+#include <stdlib.h>
+#include <string.h>
+
+#include <vulkan/vk_icd.h>
+
+#if defined(_WIN32)
+#define MOCK_ICD_EXPORT __declspec(dllexport)
+#else
+#define MOCK_ICD_EXPORT __attribute__((visibility("default")))
+#endif
+
+typedef struct {
+    VK_LOADER_DATA loader_data;
+} mock_dispatchable;
+
+static mock_dispatchable mock_physical_device = {{ICD_LOADER_MAGIC}};
+static mock_dispatchable mock_queue = {{ICD_LOADER_MAGIC}};
+
+static void *mock_new_dispatchable(void) {
+    mock_dispatchable *object = calloc(1, sizeof(*object));
+    if (object) {
+        set_loader_magic_value(object);
+    }
+    return object;
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_CreateInstance(const VkInstanceCreateInfo *pCreateInfo,
+                                                          const VkAllocationCallbacks *pAllocator,
+                                                          VkInstance *pInstance) {
+    (void)pCreateInfo;
+    (void)pAllocator;
+    *pInstance = (VkInstance)mock_new_dispatchable();
+    return *pInstance ? VK_SUCCESS : VK_ERROR_OUT_OF_HOST_MEMORY;
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_DestroyInstance(VkInstance instance,
+                                                      const VkAllocationCallbacks *pAllocator) {
+    (void)pAllocator;
+    free(instance);
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_EnumerateInstanceExtensionProperties(const char *pLayerName,
+                                                                               uint32_t *pPropertyCount,
+                                                                               VkExtensionProperties *pProperties) {
+    (void)pProperties;
+    if (pLayerName) {
+        return VK_ERROR_LAYER_NOT_PRESENT;
+    }
+    *pPropertyCount = 0;
+    return VK_SUCCESS;
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_EnumeratePhysicalDevices(VkInstance instance,
+                                                                   uint32_t *pPhysicalDeviceCount,
+                                                                   VkPhysicalDevice *pPhysicalDevices) {
+    (void)instance;
+    if (!pPhysicalDevices) {
+        *pPhysicalDeviceCount = 1;
+        return VK_SUCCESS;
+    }
+    if (*pPhysicalDeviceCount < 1) {
+        return VK_INCOMPLETE;
+    }
+    pPhysicalDevices[0] = (VkPhysicalDevice)&mock_physical_device;
+    *pPhysicalDeviceCount = 1;
+    return VK_SUCCESS;
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_GetPhysicalDeviceProperties(VkPhysicalDevice physicalDevice,
+                                                                  VkPhysicalDeviceProperties *pProperties) {
+    (void)physicalDevice;
+    memset(pProperties, 0, sizeof(*pProperties));
+    pProperties->apiVersion = VK_API_VERSION_1_0;
+    pProperties->deviceType = VK_PHYSICAL_DEVICE_TYPE_CPU;
+    strcpy(pProperties->deviceName, "Conan null ICD");
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_GetPhysicalDeviceFeatures(VkPhysicalDevice physicalDevice,
+                                                                VkPhysicalDeviceFeatures *pFeatures) {
+    (void)physicalDevice;
+    memset(pFeatures, 0, sizeof(*pFeatures));
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_GetPhysicalDeviceMemoryProperties(VkPhysicalDevice physicalDevice,
+                                                                        VkPhysicalDeviceMemoryProperties *pMemoryProperties) {
+    (void)physicalDevice;
+    memset(pMemoryProperties, 0, sizeof(*pMemoryProperties));
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_GetPhysicalDeviceQueueFamilyProperties(VkPhysicalDevice physicalDevice,
+                                                                             uint32_t *pQueueFamilyPropertyCount,
+                                                                             VkQueueFamilyProperties *pQueueFamilyProperties) {
+    (void)physicalDevice;
+    if (!pQueueFamilyProperties) {
+        *pQueueFamilyPropertyCount = 1;
+        return;
+    }
+    if (*pQueueFamilyPropertyCount < 1) {
+        return;
+    }
+    memset(pQueueFamilyProperties, 0, sizeof(*pQueueFamilyProperties));
+    pQueueFamilyProperties->queueFlags = VK_QUEUE_GRAPHICS_BIT | VK_QUEUE_COMPUTE_BIT | VK_QUEUE_TRANSFER_BIT;
+    pQueueFamilyProperties->queueCount = 1;
+    *pQueueFamilyPropertyCount = 1;
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_EnumerateDeviceExtensionProperties(VkPhysicalDevice physicalDevice,
+                                                                             const char *pLayerName,
+                                                                             uint32_t *pPropertyCount,
+                                                                             VkExtensionProperties *pProperties) {
+    (void)physicalDevice;
+    (void)pProperties;
+    if (pLayerName) {
+        return VK_ERROR_LAYER_NOT_PRESENT;
+    }
+    *pPropertyCount = 0;
+    return VK_SUCCESS;
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_CreateDevice(VkPhysicalDevice physicalDevice,
+                                                        const VkDeviceCreateInfo *pCreateInfo,
+                                                        const VkAllocationCallbacks *pAllocator,
+                                                        VkDevice *pDevice) {
+    (void)physicalDevice;
+    (void)pCreateInfo;
+    (void)pAllocator;
+    *pDevice = (VkDevice)mock_new_dispatchable();
+    return *pDevice ? VK_SUCCESS : VK_ERROR_OUT_OF_HOST_MEMORY;
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_DestroyDevice(VkDevice device, const VkAllocationCallbacks *pAllocator) {
+    (void)pAllocator;
+    free(device);
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_GetDeviceQueue(VkDevice device, uint32_t queueFamilyIndex,
+                                                      uint32_t queueIndex, VkQueue *pQueue) {
+    (void)device;
+    (void)queueFamilyIndex;
+    (void)queueIndex;
+    *pQueue = (VkQueue)&mock_queue;
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_CreateFence(VkDevice device, const VkFenceCreateInfo *pCreateInfo,
+                                                       const VkAllocationCallbacks *pAllocator, VkFence *pFence) {
+    (void)device;
+    (void)pCreateInfo;
+    (void)pAllocator;
+    *pFence = (VkFence)(uintptr_t)1;
+    return VK_SUCCESS;
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_DestroyFence(VkDevice device, VkFence fence,
+                                                    const VkAllocationCallbacks *pAllocator) {
+    (void)device;
+    (void)fence;
+    (void)pAllocator;
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_GetFenceStatus(VkDevice device, VkFence fence) {
+    (void)device;
+    (void)fence;
+    return VK_SUCCESS;
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_CreateCommandPool(VkDevice device,
+                                                             const VkCommandPoolCreateInfo *pCreateInfo,
+                                                             const VkAllocationCallbacks *pAllocator,
+                                                             VkCommandPool *pCommandPool) {
+    (void)device;
+    (void)pCreateInfo;
+    (void)pAllocator;
+    *pCommandPool = (VkCommandPool)(uintptr_t)1;
+    return VK_SUCCESS;
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_DestroyCommandPool(VkDevice device, VkCommandPool commandPool,
+                                                          const VkAllocationCallbacks *pAllocator) {
+    (void)device;
+    (void)commandPool;
+    (void)pAllocator;
+}
+
+static VKAPI_ATTR VkResult VKAPI_CALL mock_AllocateCommandBuffers(VkDevice device,
+                                                                  const VkCommandBufferAllocateInfo *pAllocateInfo,
+                                                                  VkCommandBuffer *pCommandBuffers) {
+    uint32_t i;
+    (void)device;
+    for (i = 0; i < pAllocateInfo->commandBufferCount; ++i) {
+        pCommandBuffers[i] = (VkCommandBuffer)mock_new_dispatchable();
+        if (!pCommandBuffers[i]) {
+            return VK_ERROR_OUT_OF_HOST_MEMORY;
+        }
+    }
+    return VK_SUCCESS;
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_FreeCommandBuffers(VkDevice device, VkCommandPool commandPool,
+                                                          uint32_t commandBufferCount,
+                                                          const VkCommandBuffer *pCommandBuffers) {
+    uint32_t i;
+    (void)device;
+    (void)commandPool;
+    for (i = 0; i < commandBufferCount; ++i) {
+        free(pCommandBuffers[i]);
+    }
+}
+
+static VKAPI_ATTR void VKAPI_CALL mock_CmdDraw(VkCommandBuffer commandBuffer, uint32_t vertexCount,
+                                               uint32_t instanceCount, uint32_t firstVertex,
+                                               uint32_t firstInstance) {
+    (void)commandBuffer;
+    (void)vertexCount;
+    (void)instanceCount;
+    (void)firstVertex;
+    (void)firstInstance;
+}
+
+static VKAPI_ATTR PFN_vkVoidFunction VKAPI_CALL mock_GetDeviceProcAddr(VkDevice device, const char *pName);
+
+typedef struct {
+    const char *name;
+    PFN_vkVoidFunction function;
+} mock_entry_point;
+
+#define MOCK_ENTRY(name) { "vk" #name, (PFN_vkVoidFunction)mock_##name }
+
+static const mock_entry_point mock_global_entry_points[] = {
+    MOCK_ENTRY(CreateInstance),
+    MOCK_ENTRY(EnumerateInstanceExtensionProperties),
+};
+
+static const mock_entry_point mock_instance_entry_points[] = {
+    MOCK_ENTRY(DestroyInstance),
+    MOCK_ENTRY(EnumeratePhysicalDevices),
+    MOCK_ENTRY(GetDeviceProcAddr),
+};
+
+static const mock_entry_point mock_physical_device_entry_points[] = {
+    MOCK_ENTRY(GetPhysicalDeviceProperties),
+    MOCK_ENTRY(GetPhysicalDeviceFeatures),
+    MOCK_ENTRY(GetPhysicalDeviceMemoryProperties),
+    MOCK_ENTRY(GetPhysicalDeviceQueueFamilyProperties),
+    MOCK_ENTRY(EnumerateDeviceExtensionProperties),
+    MOCK_ENTRY(CreateDevice),
+};
+
+static const mock_entry_point mock_device_entry_points[] = {
+    MOCK_ENTRY(GetDeviceProcAddr),
+    MOCK_ENTRY(DestroyDevice),
+    MOCK_ENTRY(GetDeviceQueue),
+    MOCK_ENTRY(CreateFence),
+    MOCK_ENTRY(DestroyFence),
+    MOCK_ENTRY(GetFenceStatus),
+    MOCK_ENTRY(CreateCommandPool),
+    MOCK_ENTRY(DestroyCommandPool),
+    MOCK_ENTRY(AllocateCommandBuffers),
+    MOCK_ENTRY(FreeCommandBuffers),
+    MOCK_ENTRY(CmdDraw),
+};
+
+#define MOCK_LOOKUP(table, name) mock_lookup(table, sizeof(table) / sizeof(table[0]), name)
+
+static PFN_vkVoidFunction mock_lookup(const mock_entry_point *table, size_t count, const char *name) {
+    size_t i;
+    for (i = 0; i < count; ++i) {
+        if (strcmp(table[i].name, name) == 0) {
+            return table[i].function;
+        }
+    }
+    return NULL;
+}
+
+static VKAPI_ATTR PFN_vkVoidFunction VKAPI_CALL mock_GetDeviceProcAddr(VkDevice device, const char *pName) {
+    (void)device;
+    return MOCK_LOOKUP(mock_device_entry_points, pName);
+}
+
+MOCK_ICD_EXPORT VKAPI_ATTR VkResult VKAPI_CALL vk_icdNegotiateLoaderICDInterfaceVersion(uint32_t *pSupportedVersion) {
+    if (*pSupportedVersion > 5) {
+        *pSupportedVersion = 5;
+    }
+    return VK_SUCCESS;
+}
+
+MOCK_ICD_EXPORT VKAPI_ATTR PFN_vkVoidFunction VKAPI_CALL vk_icdGetPhysicalDeviceProcAddr(VkInstance instance,
+                                                                                       const char *pName) {
+    (void)instance;
+    return MOCK_LOOKUP(mock_physical_device_entry_points, pName);
+}
+
+MOCK_ICD_EXPORT VKAPI_ATTR PFN_vkVoidFunction VKAPI_CALL vk_icdGetInstanceProcAddr(VkInstance instance,
+                                                                                 const char *pName) {
+    PFN_vkVoidFunction function = MOCK_LOOKUP(mock_global_entry_points, pName);
+    if (function || !instance) {
+        return function;
+    }
+    if ((function = MOCK_LOOKUP(mock_instance_entry_points, pName))) {
+        return function;
+    }
+    if ((function = MOCK_LOOKUP(mock_physical_device_entry_points, pName))) {
+        return function;
+    }
+    return MOCK_LOOKUP(mock_device_entry_points, pName);
+}
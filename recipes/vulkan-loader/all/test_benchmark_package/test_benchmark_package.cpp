@@ -0,0 +1,227 @@
+// Measures the cost of going through the Vulkan loader against a null ICD:
+// instance/device creation and per-call trampoline overhead compared to
+// calling the driver entry points returned by vkGetDeviceProcAddr directly.
+//
+// In "startup" mode the host's own drivers and layers are used instead, so the
+// numbers include the loader's manifest scanning as seen by a freshly started
+// player process.
+
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+
+#include <vulkan/vulkan.h>
+
+namespace {
+
+using Clock = std::chrono::steady_clock;
+
+double elapsed_ns(Clock::time_point start, long iterations) {
+    return std::chrono::duration<double, std::nano>(Clock::now() - start).count() / iterations;
+}
+
+bool check(VkResult result, const char* what) {
+    if (result != VK_SUCCESS) {
+        std::fprintf(stderr, "%s failed: %d\n", what, static_cast<int>(result));
+        return false;
+    }
+    return true;
+}
+
+int startup_benchmark(long iterations) {
+    // The first global call makes the loader scan ICD and implicit layer manifests.
+    uint32_t extension_count = 0;
+    auto start = Clock::now();
+    VkResult result = vkEnumerateInstanceExtensionProperties(nullptr, &extension_count, nullptr);
+    const double first_call_ns = elapsed_ns(start, 1);
+    if (!check(result, "vkEnumerateInstanceExtensionProperties")) {
+        return 1;
+    }
+
+    VkApplicationInfo app_info = {};
+    app_info.sType = VK_STRUCTURE_TYPE_APPLICATION_INFO;
+    app_info.pApplicationName = "test_benchmark_package";
+    app_info.apiVersion = VK_API_VERSION_1_0;
+    VkInstanceCreateInfo instance_info = {};
+    instance_info.sType = VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO;
+    instance_info.pApplicationInfo = &app_info;
+
+    // Every vkCreateInstance rescans the manifests, so it is the per-launch cost.
+    long created = 0;
+    start = Clock::now();
+    for (long i = 0; i < iterations; ++i) {
+        VkInstance instance = VK_NULL_HANDLE;
+        result = vkCreateInstance(&instance_info, nullptr, &instance);
+        if (result == VK_SUCCESS) {
+            vkDestroyInstance(instance, nullptr);
+            ++created;
+        } else if (result != VK_ERROR_INCOMPATIBLE_DRIVER) {
+            check(result, "vkCreateInstance");
+            return 1;
+        }
+    }
+    const double instance_ns = elapsed_ns(start, iterations);
+
+    std::printf("first vkEnumerateInstanceExtensionProperties: %10.1f us\n", first_call_ns / 1000.0);
+    std::printf("vkCreateInstance+vkDestroyInstance:           %10.1f us (%s)\n", instance_ns / 1000.0,
+                created ? "driver found" : "no driver, scan only");
+    return 0;
+}
+
+} // namespace
+
+int main(int argc, char** argv) {
+    if (argc > 1 && std::strcmp(argv[1], "startup") == 0) {
+        return startup_benchmark(argc > 2 ? std::strtol(argv[2], nullptr, 10) : 50);
+    }
+
+    const long create_iterations = argc > 1 ? std::strtol(argv[1], nullptr, 10) : 200;
+    const long call_iterations = argc > 2 ? std::strtol(argv[2], nullptr, 10) : 10000000;
+
+    VkApplicationInfo app_info = {};
+    app_info.sType = VK_STRUCTURE_TYPE_APPLICATION_INFO;
+    app_info.pApplicationName = "test_benchmark_package";
+    app_info.apiVersion = VK_API_VERSION_1_0;
+    VkInstanceCreateInfo instance_info = {};
+    instance_info.sType = VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO;
+    instance_info.pApplicationInfo = &app_info;
+
+    VkInstance instance = VK_NULL_HANDLE;
+    auto start = Clock::now();
+    if (!check(vkCreateInstance(&instance_info, nullptr, &instance), "vkCreateInstance")) {
+        return 1;
+    }
+    const double first_instance_ns = elapsed_ns(start, 1);
+    vkDestroyInstance(instance, nullptr);
+
+    start = Clock::now();
+    for (long i = 0; i < create_iterations; ++i) {
+        if (!check(vkCreateInstance(&instance_info, nullptr, &instance), "vkCreateInstance")) {
+            return 1;
+        }
+        vkDestroyInstance(instance, nullptr);
+    }
+    const double instance_ns = elapsed_ns(start, create_iterations);
+
+    if (!check(vkCreateInstance(&instance_info, nullptr, &instance), "vkCreateInstance")) {
+        return 1;
+    }
+    uint32_t device_count = 1;
+    VkPhysicalDevice physical_device = VK_NULL_HANDLE;
+    VkResult result = vkEnumeratePhysicalDevices(instance, &device_count, &physical_device);
+    if ((result != VK_SUCCESS && result != VK_INCOMPLETE) || device_count == 0) {
+        std::fprintf(stderr, "no physical device exposed by the null ICD\n");
+        return 1;
+    }
+
+    const float priority = 1.0f;
+    VkDeviceQueueCreateInfo queue_info = {};
+    queue_info.sType = VK_STRUCTURE_TYPE_DEVICE_QUEUE_CREATE_INFO;
+    queue_info.queueFamilyIndex = 0;
+    queue_info.queueCount = 1;
+    queue_info.pQueuePriorities = &priority;
+    VkDeviceCreateInfo device_info = {};
+    device_info.sType = VK_STRUCTURE_TYPE_DEVICE_CREATE_INFO;
+    device_info.queueCreateInfoCount = 1;
+    device_info.pQueueCreateInfos = &queue_info;
+
+    VkDevice device = VK_NULL_HANDLE;
+    start = Clock::now();
+    for (long i = 0; i < create_iterations; ++i) {
+        if (!check(vkCreateDevice(physical_device, &device_info, nullptr, &device), "vkCreateDevice")) {
+            return 1;
+        }
+        vkDestroyDevice(device, nullptr);
+    }
+    const double device_ns = elapsed_ns(start, create_iterations);
+
+    if (!check(vkCreateDevice(physical_device, &device_info, nullptr, &device), "vkCreateDevice")) {
+        return 1;
+    }
+
+    VkFenceCreateInfo fence_info = {};
+    fence_info.sType = VK_STRUCTURE_TYPE_FENCE_CREATE_INFO;
+    VkFence fence = VK_NULL_HANDLE;
+    VkCommandPoolCreateInfo pool_info = {};
+    pool_info.sType = VK_STRUCTURE_TYPE_COMMAND_POOL_CREATE_INFO;
+    VkCommandPool pool = VK_NULL_HANDLE;
+    VkCommandBufferAllocateInfo cmd_info = {};
+    cmd_info.sType = VK_STRUCTURE_TYPE_COMMAND_BUFFER_ALLOCATE_INFO;
+    cmd_info.level = VK_COMMAND_BUFFER_LEVEL_PRIMARY;
+    cmd_info.commandBufferCount = 1;
+    VkCommandBuffer cmd = VK_NULL_HANDLE;
+    if (!check(vkCreateFence(device, &fence_info, nullptr, &fence), "vkCreateFence") ||
+        !check(vkCreateCommandPool(device, &pool_info, nullptr, &pool), "vkCreateCommandPool")) {
+        return 1;
+    }
+    cmd_info.commandPool = pool;
+    if (!check(vkAllocateCommandBuffers(device, &cmd_info, &cmd), "vkAllocateCommandBuffers")) {
+        return 1;
+    }
+
+    // Entry points resolved the way libplacebo does with vk_proc_addr: straight into the driver.
+    auto direct_GetFenceStatus = reinterpret_cast<PFN_vkGetFenceStatus>(vkGetDeviceProcAddr(device, "vkGetFenceStatus"));
+    auto direct_GetDeviceQueue = reinterpret_cast<PFN_vkGetDeviceQueue>(vkGetDeviceProcAddr(device, "vkGetDeviceQueue"));
+    auto direct_CmdDraw = reinterpret_cast<PFN_vkCmdDraw>(vkGetDeviceProcAddr(device, "vkCmdDraw"));
+    if (!direct_GetFenceStatus || !direct_GetDeviceQueue || !direct_CmdDraw) {
+        std::fprintf(stderr, "vkGetDeviceProcAddr returned NULL\n");
+        return 1;
+    }
+
+    VkQueue queue = VK_NULL_HANDLE;
+    struct Measurement {
+        const char* name;
+        double trampoline_ns;
+        double direct_ns;
+    } measurements[3];
+
+    start = Clock::now();
+    for (long i = 0; i < call_iterations; ++i) {
+        vkGetFenceStatus(device, fence);
+    }
+    measurements[0] = {"vkGetFenceStatus", elapsed_ns(start, call_iterations), 0.0};
+    start = Clock::now();
+    for (long i = 0; i < call_iterations; ++i) {
+        direct_GetFenceStatus(device, fence);
+    }
+    measurements[0].direct_ns = elapsed_ns(start, call_iterations);
+
+    start = Clock::now();
+    for (long i = 0; i < call_iterations; ++i) {
+        vkGetDeviceQueue(device, 0, 0, &queue);
+    }
+    measurements[1] = {"vkGetDeviceQueue", elapsed_ns(start, call_iterations), 0.0};
+    start = Clock::now();
+    for (long i = 0; i < call_iterations; ++i) {
+        direct_GetDeviceQueue(device, 0, 0, &queue);
+    }
+    measurements[1].direct_ns = elapsed_ns(start, call_iterations);
+
+    start = Clock::now();
+    for (long i = 0; i < call_iterations; ++i) {
+        vkCmdDraw(cmd, 3, 1, 0, 0);
+    }
+    measurements[2] = {"vkCmdDraw", elapsed_ns(start, call_iterations), 0.0};
+    start = Clock::now();
+    for (long i = 0; i < call_iterations; ++i) {
+        direct_CmdDraw(cmd, 3, 1, 0, 0);
+    }
+    measurements[2].direct_ns = elapsed_ns(start, call_iterations);
+
+    vkFreeCommandBuffers(device, pool, 1, &cmd);
+    vkDestroyCommandPool(device, pool, nullptr);
+    vkDestroyFence(device, fence, nullptr);
+    vkDestroyDevice(device, nullptr);
+    vkDestroyInstance(instance, nullptr);
+
+    std::printf("first vkCreateInstance:          %10.1f us\n", first_instance_ns / 1000.0);
+    std::printf("vkCreateInstance+vkDestroyInstance: %7.1f us\n", instance_ns / 1000.0);
+    std::printf("vkCreateDevice+vkDestroyDevice:  %10.1f us\n", device_ns / 1000.0);
+    std::printf("%-20s %14s %12s %12s\n", "command", "trampoline ns", "direct ns", "overhead ns");
+    for (const Measurement& m : measurements) {
+        std::printf("%-20s %14.2f %12.2f %12.2f\n", m.name, m.trampoline_ns, m.direct_ns,
+                    m.trampoline_ns - m.direct_ns);
+    }
+    return 0;
+}
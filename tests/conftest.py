@@ -0,0 +1,50 @@
+import os
+
+import pytest
+from conan.api.conan_api import ConanAPI
+from conans.client.conanfile.configure import run_configure_method
+from conans.model.options import Options
+
+RECIPES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "recipes")
+
+# Host settings of every os the recipes have platform specific options for
+OS_SETTINGS = {
+    "Linux": ["os=Linux"],
+    "FreeBSD": ["os=FreeBSD"],
+    "Windows": ["os=Windows"],
+    "Macos": ["os=Macos"],
+    "iOS": ["os=iOS", "os.version=15.0"],
+    "Android": ["os=Android", "os.api_level=24"],
+}
+_COMMON_SETTINGS = ["arch=x86_64", "compiler=gcc", "compiler.version=13", "compiler.libcxx=libstdc++11",
+                    "build_type=Release"]
+
+
+@pytest.fixture(scope="session")
+def conan_api(tmp_path_factory):
+    api = ConanAPI(cache_folder=str(tmp_path_factory.mktemp("conan_home")))
+    # python_requires of the recipes, resolved from the cache
+    api.export.export(os.path.join(RECIPES_FOLDER, "mpv-helpers", "all", "conanfile.py"),
+                      "mpv-helpers", "1.0", None, None)
+    return api
+
+
+@pytest.fixture(scope="session")
+def configure_recipe(conan_api):
+    """ Loads a recipe as the root of a graph and runs config_options(), configure(),
+    requirements() and build_requirements() for an os and options, like 'conan graph info'
+    does before it resolves anything. Works offline, the requirements are not resolved.
+    """
+    profile_build = conan_api.profiles.get_profile([], settings=OS_SETTINGS["Linux"] + _COMMON_SETTINGS)
+
+    def configure(recipe, version, os_name, **options):
+        path = os.path.join(RECIPES_FOLDER, recipe, "all", "conanfile.py")
+        profile_host = conan_api.profiles.get_profile(
+            [], settings=OS_SETTINGS[os_name] + _COMMON_SETTINGS,
+            options=[f"{recipe}/*:{option}={value}" for option, value in options.items()])
+        node = conan_api.graph._load_root_consumer_conanfile(path, profile_host, profile_build,
+                                                               name=recipe, version=version)
+        run_configure_method(node.conanfile, Options(), profile_host.options, node.ref)
+        return node.conanfile
+
+    return configure
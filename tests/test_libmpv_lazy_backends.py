@@ -0,0 +1,79 @@
+""" The dlopen() stubs of lazy_backends, built with the C compiler of the machine for a small
+shared library and called from a program that does not link it.
+"""
+import os
+import platform
+import shutil
+import subprocess
+
+import pytest
+
+_LIBRARY = """
+#include <stdarg.h>
+
+int lazy_counter = 0;
+
+int lazy_add(int a, int b) { return a + b + lazy_counter; }
+
+double lazy_scale(double value, int factor) { return value * factor; }
+
+double lazy_sum(int count, ...)
+{
+    va_list args;
+    double sum = 0;
+    va_start(args, count);
+    for (int i = 0; i < count; i++)
+        sum += va_arg(args, double);
+    va_end(args);
+    return sum;
+}
+
+static int lazy_hidden(void) { return 0; }
+int (*lazy_hidden_pointer)(void) = lazy_hidden;
+"""
+
+_PROGRAM = """
+#include <dlfcn.h>
+#include <stdio.h>
+
+int lazy_add(int a, int b);
+double lazy_scale(double value, int factor);
+double lazy_sum(int count, ...);
+
+int main(void)
+{
+    if (dlopen("liblazy.so.1", RTLD_NOW | RTLD_NOLOAD))
+        return 1;
+    printf("%d %g %g\\n", lazy_add(2, 3), lazy_scale(1.5, 4), lazy_sum(3, 0.5, 1.0, 2.0));
+    printf("%d\\n", dlopen("liblazy.so.1", RTLD_NOW | RTLD_NOLOAD) != NULL);
+    return 0;
+}
+"""
+
+
+@pytest.mark.skipif(platform.machine() != "x86_64" or not shutil.which("cc"),
+                    reason="needs a C compiler for x86_64")
+def test_lazy_stubs(configure_recipe, tmp_path):
+    def cc(*args):
+        subprocess.run(["cc", *args], check=True, cwd=tmp_path)
+
+    (tmp_path / "lazy.c").write_text(_LIBRARY)
+    cc("-shared", "-fPIC", "-Wl,-soname,liblazy.so.1", "lazy.c", "-o", "liblazy.so.1")
+
+    conanfile = configure_recipe("libmpv", "0.39.0", "Linux", lazy_backends=True)
+    soname, functions = conanfile._elf_functions(str(tmp_path / "liblazy.so.1"))
+    assert soname == "liblazy.so.1"
+    assert functions == ["lazy_add", "lazy_scale", "lazy_sum"]
+
+    assembly, loader = conanfile._lazy_stub_sources("lazy", str(tmp_path / "liblazy.so.1"))
+    (tmp_path / "stub.S").write_text(assembly)
+    (tmp_path / "stub.c").write_text(loader)
+    (tmp_path / "main.c").write_text(_PROGRAM)
+    cc("-fPIC", "-c", "stub.S", "-o", "stub.tramp.o")
+    cc("-fPIC", "-c", "stub.c", "-o", "stub.init.o")
+    cc("main.c", "stub.tramp.o", "stub.init.o", "-ldl", "-o", "main")
+
+    output = subprocess.run([str(tmp_path / "main")], check=True, capture_output=True, text=True,
+                            env={**os.environ, "LD_LIBRARY_PATH": str(tmp_path)}).stdout
+    # Not loaded before the first call, loaded after it
+    assert output.split() == ["5", "6", "3.5", "1"]
@@ -0,0 +1,98 @@
+""" The libmpv option rules: validate() rejects what mpv's meson.build cannot build, while the
+defaults configure() picks always follow the options they build on.
+"""
+import pytest
+from conan.errors import ConanInvalidConfiguration
+
+from conftest import OS_SETTINGS
+
+
+def _configure(configure_recipe, os_name, **options):
+    return configure_recipe("libmpv", "0.39.0", os_name, **options)
+
+
+def _rules(configure_recipe, os_name):
+    """ The rules of 'os_name' whose options all exist there, as (option, need) pairs.
+    """
+    conanfile = _configure(configure_recipe, os_name)
+    return [(option, need) for option, needs in conanfile._option_rules.items()
+            for need in needs if option in conanfile.options and need in conanfile.options]
+
+
+@pytest.mark.parametrize("os_name", OS_SETTINGS)
+def test_defaults_validate(configure_recipe, os_name):
+    conanfile = _configure(configure_recipe, os_name)
+    assert conanfile._missing_option_requirements() == {}
+    conanfile.validate()
+
+
+@pytest.mark.parametrize("os_name", OS_SETTINGS)
+def test_explicit_conflicts_are_rejected(configure_recipe, os_name):
+    rules = _rules(configure_recipe, os_name)
+    assert rules
+    for option, need in rules:
+        conanfile = _configure(configure_recipe, os_name, **{option: True, need: False})
+        with pytest.raises(ConanInvalidConfiguration, match=f"{option} requires [^;]*{need}"):
+            conanfile.validate()
+
+
+@pytest.mark.parametrize("os_name, egl", [
+    # egl/system is packaged for these, so egl is on like in mpv's meson.build
+    ("Linux", True),
+    ("FreeBSD", True),
+    ("Android", True),
+    ("Windows", False),
+    ("Macos", False),
+    ("iOS", False),
+])
+def test_egl_default(configure_recipe, os_name, egl):
+    assert bool(_configure(configure_recipe, os_name).options.egl) is egl
+
+
+@pytest.mark.parametrize("os_name", ["Linux", "FreeBSD"])
+@pytest.mark.parametrize("disabled, following", [
+    ("x11", ["egl_x11", "gl_x11", "vaapi_x11", "vdpau_gl_x11"]),
+    ("wayland", ["dmabuf_wayland", "egl_wayland", "vaapi_wayland"]),
+    ("egl", ["egl_drm", "egl_wayland", "egl_x11"]),
+    ("drm", ["dmabuf_wayland", "egl_drm", "vaapi_drm"]),
+    ("gl", ["gl_x11", "plain_gl", "vdpau_gl_x11"]),
+    ("vaapi", ["vaapi_drm", "vaapi_wayland", "vaapi_x11"]),
+    ("sdl2", ["sdl2_audio", "sdl2_gamepad", "sdl2_video"]),
+])
+def test_defaults_follow_unix(configure_recipe, os_name, disabled, following):
+    conanfile = _configure(configure_recipe, os_name, **{disabled: False})
+    assert {option: bool(conanfile.options.get_safe(option)) for option in following} == \
+        {option: False for option in following}
+    conanfile.validate()
+
+
+@pytest.mark.parametrize("os_name, disabled, following", [
+    ("Windows", "gl", ["gl_win32", "gl_dxinterop", "gl_dxinterop_d3d9", "plain_gl"]),
+    ("Windows", "d3d_hwaccel", ["d3d9_hwaccel", "gl_dxinterop_d3d9"]),
+    ("Macos", "gl", ["plain_gl"]),
+    ("iOS", "gl", ["plain_gl"]),
+    ("Android", "egl", ["egl_android"]),
+    ("Android", "sdl2", ["sdl2_audio", "sdl2_gamepad", "sdl2_video"]),
+])
+def test_defaults_follow(configure_recipe, os_name, disabled, following):
+    conanfile = _configure(configure_recipe, os_name, **{disabled: False})
+    assert {option: bool(conanfile.options.get_safe(option)) for option in following} == \
+        {option: False for option in following}
+    conanfile.validate()
+
+
+@pytest.mark.parametrize("os_name", OS_SETTINGS)
+def test_explicit_options_do_not_follow(configure_recipe, os_name):
+    """ Only defaults follow, an explicitly enabled option is kept and rejected in validate().
+    """
+    conanfile = _configure(configure_recipe, os_name, gl=False, plain_gl=True)
+    assert conanfile.options.plain_gl
+    with pytest.raises(ConanInvalidConfiguration, match="plain_gl requires gl"):
+        conanfile.validate()
+
+
+@pytest.mark.parametrize("bundle", ["archive", "object"])
+def test_bundle_rejected_on_windows(configure_recipe, bundle):
+    conanfile = _configure(configure_recipe, "Windows", bundle=bundle)
+    with pytest.raises(ConanInvalidConfiguration, match="bundle is not supported on Windows"):
+        conanfile.validate()
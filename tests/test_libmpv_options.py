@@ -0,0 +1,277 @@
+""" The options, defaults, requirements and Meson options libmpv derives from its _features
+table, per os. The expectations are those of the recipe before the table, except for the
+fixes the table brought, which are named where they show.
+"""
+import pytest
+
+from conftest import OS_SETTINGS
+
+# Feature options on every os: enabled, disabled, and available without a value. Any other
+# feature must not exist on that os.
+_EXPECTED_FEATURES = {
+    "Linux": {
+        "enabled": """
+            alsa build_date cplugins dmabuf_wayland drm egl egl_drm egl_wayland egl_x11 gbm gl
+            gl_x11 gpl iconv jack javascript jpeg lcms2 libarchive libavdevice lua openal
+            oss_audio pipewire plain_gl pulse sdl2 sdl2_audio sdl2_gamepad sdl2_video sndio
+            uchardet vaapi vaapi_drm vaapi_wayland vaapi_x11 vdpau vdpau_gl_x11 vector vulkan
+            wayland x11 xv zimg zlib
+        """,
+        "disabled": """
+            caca cdda cplayer cuda_hwaccel cuda_interop dvbin dvdnav fuzzers html_build
+            libbluray manpage_build pdf_build pthread_debug rubberband sixel ta_leak_report
+            tests vapoursynth
+        """,
+        "unset": "",
+    },
+    "Windows": {
+        "enabled": """
+            build_date cplugins d3d11 d3d9_hwaccel d3d_hwaccel direct3d gl gl_dxinterop
+            gl_dxinterop_d3d9 gl_win32 gpl iconv javascript jpeg lcms2 libarchive libavdevice
+            lua openal plain_gl sdl2 sdl2_audio sdl2_gamepad sdl2_video shaderc uchardet vector
+            vulkan wasapi win32_smtc win32_threads zimg zlib
+        """,
+        "disabled": """
+            caca cdda cplayer cuda_hwaccel cuda_interop dvbin dvdnav egl egl_angle egl_angle_lib
+            egl_angle_win32 fuzzers html_build libbluray manpage_build pdf_build pthread_debug
+            rubberband sixel spirv_cross ta_leak_report tests uwp vaapi_win32 vapoursynth
+        """,
+        "unset": "vaapi",
+    },
+    "Macos": {
+        "enabled": """
+            audiounit avfoundation build_date coreaudio cplugins gl gpl iconv javascript jpeg
+            lcms2 libarchive libavdevice lua openal plain_gl sdl2 sdl2_audio sdl2_gamepad
+            sdl2_video uchardet vector videotoolbox_gl videotoolbox_pl vulkan zimg zlib
+        """,
+        "disabled": """
+            caca cdda cplayer cuda_hwaccel cuda_interop dvbin dvdnav egl fuzzers html_build
+            libbluray manpage_build pdf_build pthread_debug rubberband sixel ta_leak_report
+            tests vapoursynth
+        """,
+        # Opt-in, as before the table
+        "unset": """
+            cocoa gl_cocoa macos_10_15_4_features macos_11_features macos_11_3_features
+            macos_12_features macos_cocoa_cb macos_media_player macos_touchbar swift_build
+        """,
+    },
+    "iOS": {
+        "enabled": """
+            audiounit avfoundation build_date coreaudio cplugins gl gpl iconv javascript jpeg
+            lcms2 libarchive libavdevice lua openal plain_gl sdl2 sdl2_audio sdl2_gamepad
+            sdl2_video uchardet vector videotoolbox_gl videotoolbox_pl vulkan zimg zlib
+        """,
+        "disabled": """
+            caca cdda cplayer cuda_hwaccel cuda_interop dvbin dvdnav egl fuzzers html_build
+            libbluray manpage_build pdf_build pthread_debug rubberband sixel ta_leak_report
+            tests vapoursynth
+        """,
+        "unset": "ios_gl swift_build",
+    },
+    "Android": {
+        "enabled": """
+            android_media_ndk build_date cplugins egl egl_android gl gpl iconv javascript jpeg
+            lcms2 libarchive libavdevice lua opensles plain_gl sdl2 sdl2_audio sdl2_gamepad
+            sdl2_video uchardet vector vulkan zimg zlib
+        """,
+        "disabled": """
+            caca cdda cplayer cuda_hwaccel cuda_interop dvbin dvdnav fuzzers html_build
+            libbluray manpage_build openal pdf_build pthread_debug rubberband sixel
+            ta_leak_report tests vapoursynth
+        """,
+        "unset": "",
+    },
+}
+_EXPECTED_FEATURES["FreeBSD"] = _EXPECTED_FEATURES["Linux"]
+
+# Host requirements of the default configuration on every os
+_CORE = ["ffmpeg/[>=6.0.0]", "libass/[>=0.12.2]", "libplacebo/[>=6.338.2]"]
+_COMMON = ["lcms/[>=2.6]", "libarchive/[>=3.4.0]", "libjpeg/[>=9]", "lua/[>=5.2.0 <5.3.0]", "mujs/[>=1.0.0]",
+           "opengl/system", "sdl/[>=2.0.14 <3]", "uchardet/[>=0.0.1]", "vulkan-loader/[>=1.3.238]",
+           "zimg/[>=2.9]", "zlib/[>=1.2.11]"]
+_LINUX = ["egl/system", "jack2/[>=0.0.1]", "libalsa/[>=1.0.18]", "libdisplay-info/[>=0.1.1]",
+          "libdrm/[>=2.4.105]", "libpipewire/[>=0.3.57]", "libva/[>=1.1.0]", "libvdpau/[>=0.2]",
+          "openal-soft/[>=1.22.0]", "pulseaudio/[>=1.0]", "sndio/[>=1.9.0]", "wayland-protocols/[>=1.31]",
+          "wayland/[>=1.21.0]",
+          # Required once for x11 and wayland, which used to ask for xorg/system and xorg/[>=0.3.0]
+          "xorg/system"]
+_EXPECTED_REQUIRES = {
+    "Linux": _CORE + _COMMON + _LINUX,
+    "FreeBSD": _CORE + _COMMON + _LINUX + ["libiconv/[>=1.17]"],
+    "Windows": _CORE + _COMMON + ["libiconv/[>=1.17]", "openal-soft/[>=1.22.0]", "shaderc/[>=2023.7]"],
+    "Macos": _CORE + _COMMON + ["libiconv/[>=1.17]", "openal-soft/[>=1.22.0]"],
+    "iOS": _CORE + _COMMON + ["libiconv/[>=1.17]", "openal-soft/[>=1.22.0]"],
+    "Android": _CORE + _COMMON + ["egl/system"],
+}
+
+
+def _configure(configure_recipe, os_name, **options):
+    return configure_recipe("libmpv", "0.39.0", os_name, **options)
+
+
+def _host_requires(conanfile):
+    return sorted(str(requirement.ref) for requirement in conanfile.requires.values()
+                  if not requirement.build)
+
+
+@pytest.mark.parametrize("os_name", OS_SETTINGS)
+def test_default_features(configure_recipe, os_name):
+    conanfile = _configure(configure_recipe, os_name)
+    expected = {kind: set(names.split()) for kind, names in _EXPECTED_FEATURES[os_name].items()}
+    actual = {"enabled": set(), "disabled": set(), "unset": set()}
+    for option in conanfile._features:
+        if option not in conanfile.options:
+            continue
+        value = conanfile.options.get_safe(option)
+        kind = "unset" if value == None else "disabled" if value == False else "enabled"
+        actual[kind].add(option)
+    assert actual == expected
+    assert conanfile.options.lua == "lua-5.2"
+
+
+@pytest.mark.parametrize("os_name", OS_SETTINGS)
+def test_default_requirements(configure_recipe, os_name):
+    conanfile = _configure(configure_recipe, os_name)
+    assert _host_requires(conanfile) == sorted(_EXPECTED_REQUIRES[os_name])
+
+
+@pytest.mark.parametrize("lua, requirement", [
+    ("lua-5.1", "lua/[>=5.1.0 <5.2.0]"),
+    ("lua-5.2", "lua/[>=5.2.0 <5.3.0]"),
+    # Used to be a plain 'luajit', which Conan 2 rejects
+    ("luajit", "luajit/[>=2.1]"),
+    ("True", "lua/[>=5.1.0 <=5.2.0]"),
+    ("False", None),
+])
+def test_lua_requirement(configure_recipe, lua, requirement):
+    requires = _host_requires(_configure(configure_recipe, "Linux", lua=lua))
+    assert [ref for ref in requires if ref.startswith(("lua/", "luajit/"))] == ([requirement] if requirement else [])
+
+
+@pytest.mark.parametrize("options, xorg", [
+    ({}, ["xorg/system"]),
+    ({"x11": False}, ["xorg/system"]),
+    ({"wayland": False}, ["xorg/system"]),
+    ({"x11": False, "wayland": False}, []),
+])
+def test_xorg_requirement(configure_recipe, options, xorg):
+    requires = _host_requires(_configure(configure_recipe, "Linux", **options))
+    assert [ref for ref in requires if ref.startswith("xorg/")] == xorg
+
+
+def test_disabled_feature_drops_its_requirements(configure_recipe):
+    requires = _host_requires(_configure(configure_recipe, "Linux", drm=False, gbm=False, vulkan=False))
+    assert not [ref for ref in requires if ref.startswith(("libdrm/", "libdisplay-info/", "vulkan-loader/"))]
+    assert "opengl/system" in requires  # still required by gl
+
+
+class _Toolchain:
+    """ Records the project options instead of writing a machine file.
+    """
+    instance = None
+
+    def __init__(self, conanfile):
+        self.project_options, self.properties = {}, {}
+        self.extra_cflags, self.extra_cxxflags, self.extra_ldflags = [], [], []
+        _Toolchain.instance = self
+
+    def generate(self):
+        pass
+
+
+class _PkgConfigDeps:
+    def __init__(self, conanfile):
+        pass
+
+    def generate(self):
+        pass
+
+
+# Meson option -> recipe option, as generate() passed them before the table. Every one is passed
+# on every os, those an os does not have as disabled.
+_MESON_BOOLEANS = {
+    "cplayer": "cplayer", "tests": "tests", "fuzzers": "fuzzers", "build-date": "build_date",
+    "gpl": "gpl", "ta-leak-report": "ta_leak_report",
+}
+_MESON_FEATURES = {
+    "cdda": "cdda", "cplugins": "cplugins", "dvbin": "dvbin", "dvdnav": "dvdnav", "iconv": "iconv",
+    "javascript": "javascript", "jpeg": "jpeg", "lcms2": "lcms2", "libarchive": "libarchive",
+    "libavdevice": "libavdevice", "libbluray": "libbluray", "lua": "lua", "pthread-debug": "pthread_debug",
+    "rubberband": "rubberband", "sdl2": "sdl2", "sdl2-gamepad": "sdl2_gamepad", "uchardet": "uchardet",
+    "uwp": "uwp", "vapoursynth": "vapoursynth", "vector": "vector", "win32-threads": "win32_threads",
+    "zimg": "zimg", "zlib": "zlib",
+    # Audio outputs
+    "alsa": "alsa", "audiounit": "audiounit", "coreaudio": "coreaudio", "avfoundation": "avfoundation",
+    "jack": "jack", "openal": "openal", "opensles": "opensles", "oss-audio": "oss_audio",
+    "pipewire": "pipewire", "pulse": "pulse", "sdl2-audio": "sdl2_audio", "sndio": "sndio",
+    "wasapi": "wasapi",
+    # Video outputs and features
+    "caca": "caca", "cocoa": "cocoa", "d3d11": "d3d11", "direct3d": "direct3d",
+    "dmabuf-wayland": "dmabuf_wayland", "drm": "drm", "egl": "egl", "egl-android": "egl_android",
+    "egl-angle": "egl_angle", "egl-angle-lib": "egl_angle_lib", "egl-angle-win32": "egl_angle_win32",
+    "egl-drm": "egl_drm", "egl-wayland": "egl_wayland", "egl-x11": "egl_x11", "gbm": "gbm", "gl": "gl",
+    "gl-cocoa": "gl_cocoa", "gl-dxinterop": "gl_dxinterop", "gl-win32": "gl_win32", "gl-x11": "gl_x11",
+    "plain-gl": "plain_gl", "sdl2-video": "sdl2_video", "shaderc": "shaderc", "sixel": "sixel",
+    "spirv-cross": "spirv_cross", "vaapi": "vaapi", "vdpau": "vdpau", "vdpau-gl-x11": "vdpau_gl_x11",
+    "vulkan": "vulkan", "wayland": "wayland", "x11": "x11", "xv": "xv",
+    # Hardware acceleration
+    "android-media-ndk": "android_media_ndk", "cuda-hwaccel": "cuda_hwaccel",
+    "cuda-interop": "cuda_interop", "d3d-hwaccel": "d3d_hwaccel", "d3d9-hwaccel": "d3d9_hwaccel",
+    "gl-dxinterop-d3d9": "gl_dxinterop_d3d9", "ios-gl": "ios_gl", "videotoolbox-gl": "videotoolbox_gl",
+    "videotoolbox-pl": "videotoolbox_pl",
+    # macOS features
+    "macos-10-15-4-features": "macos_10_15_4_features", "macos-11-features": "macos_11_features",
+    "macos-11-3-features": "macos_11_3_features", "macos-12-features": "macos_12_features",
+    "macos-cocoa-cb": "macos_cocoa_cb", "macos-media-player": "macos_media_player",
+    "macos-touchbar": "macos_touchbar", "swift-build": "swift_build",
+    # Windows features
+    "win32-smtc": "win32_smtc",
+    # Documentation
+    "html-build": "html_build", "manpage-build": "manpage_build", "pdf-build": "pdf_build",
+}
+
+
+@pytest.mark.parametrize("os_name", OS_SETTINGS)
+def test_meson_options(configure_recipe, monkeypatch, tmp_path, os_name):
+    conanfile = _configure(configure_recipe, os_name)
+    # Conan loads recipes as modules outside of sys.modules
+    module_globals = type(conanfile).generate.__globals__
+    monkeypatch.setitem(module_globals, "MesonToolchain", _Toolchain)
+    monkeypatch.setitem(module_globals, "PkgConfigDeps", _PkgConfigDeps)
+    conanfile.folders.set_base_generators(str(tmp_path))
+    conanfile.folders.set_base_build(str(tmp_path))
+    conanfile.generate()
+
+    expected = {"libmpv": "true"}
+    for meson, option in _MESON_BOOLEANS.items():
+        expected[meson] = "true" if conanfile.options.get_safe(option) else "false"
+    for meson, option in _MESON_FEATURES.items():
+        expected[meson] = "enabled" if conanfile.options.get_safe(option) else "disabled"
+    # Nothing else, the vaapi backends Meson detects by itself included
+    assert _Toolchain.instance.project_options == expected
+
+
+# ffmpeg options that only exist on Linux and FreeBSD
+_FFMPEG_UNIX_OPTIONS = {"with_xcb", "with_xlib", "with_libalsa", "with_pulse", "with_vaapi", "with_vdpau"}
+
+
+def _ffmpeg_options(conanfile):
+    return next(requirement.options for requirement in conanfile.requires.values()
+                if requirement.ref.name == "ffmpeg") or {}
+
+
+@pytest.mark.parametrize("os_name", OS_SETTINGS)
+def test_headless_ffmpeg_options(configure_recipe, os_name):
+    options = _ffmpeg_options(_configure(configure_recipe, os_name, headless=True))
+    unix = os_name in ("Linux", "FreeBSD")
+    assert _FFMPEG_UNIX_OPTIONS & set(options) == (_FFMPEG_UNIX_OPTIONS if unix else set())
+    # The lavfi input of the bolt workload and the memory benchmark needs libavdevice
+    assert options["avdevice"] is True
+
+
+@pytest.mark.parametrize("os_name", OS_SETTINGS)
+def test_software_decode_ffmpeg_options(configure_recipe, os_name):
+    options = _ffmpeg_options(_configure(configure_recipe, os_name, software_decode=True))
+    unix = os_name in ("Linux", "FreeBSD")
+    assert {"with_vaapi", "with_vdpau"} & set(options) == ({"with_vaapi", "with_vdpau"} if unix else set())
+    assert options["disable_all_hardware_accelerators"] is True